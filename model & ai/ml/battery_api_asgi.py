@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Battery Twin ML API - ASGI Server
+Serves the BatteryMLAPI routes from an asyncio event loop (Starlette/uvicorn)
+
+/health is answered on the event loop itself, so it never waits for a model.
+Every other route runs its Flask view through a small WSGI bridge in a thread
+pool: /predict/* and /simulate/* in a bounded inference pool (requests beyond
+``max_pending`` get 503 instead of queueing without limit), the rest (history
+queries, reloads, state resets) in a separate I/O pool. The Flask server in
+battery_api_server.py stays the default.
+
+Usage:
+    python battery_api_asgi.py --port 5001 --inference-workers 4
+    python battery_api_server.py --server asgi
+    uvicorn --factory battery_api_asgi:create_app --port 5001
+"""
+
+import os
+import sys
+import asyncio
+import logging
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+logger = logging.getLogger(__name__)
+
+# Routes whose views run models; everything else goes to the I/O pool
+INFERENCE_PREFIXES = ('/predict', '/simulate')
+
+class ASGIInput:
+    """File-like WSGI request body, pulled from ASGI ``receive`` by a worker thread"""
+
+    def __init__(self, receive, loop):
+        self.receive = receive
+        self.loop = loop
+        self.buffer = bytearray()
+        self.more_body = True
+
+    def _fill(self):
+        """Append the next body chunk from the event loop"""
+        message = asyncio.run_coroutine_threadsafe(self.receive(), self.loop).result()
+        if message['type'] == 'http.disconnect':
+            self.more_body = False
+            return
+        self.buffer.extend(message.get('body', b''))
+        self.more_body = message.get('more_body', False)
+
+    def _take(self, size):
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def read(self, size=-1):
+        while self.more_body and (size is None or size < 0 or len(self.buffer) < size):
+            self._fill()
+        return self._take(len(self.buffer) if size is None or size < 0 else size)
+
+    def readline(self, size=-1):
+        while self.more_body and b'\n' not in self.buffer and (size is None or size < 0 or len(self.buffer) < size):
+            self._fill()
+        end = self.buffer.find(b'\n') + 1 or len(self.buffer)
+        if size is not None and size >= 0:
+            end = min(end, size)
+        return self._take(end)
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+class WSGIBridge:
+    """ASGI app that runs a WSGI app in a thread pool chosen by request path
+
+    Body chunks are read from and response chunks written to the event loop
+    from the worker thread, so streaming routes (NDJSON in and out) keep
+    their backpressure.
+    """
+
+    def __init__(self, wsgi_app, inference_executor, io_executor, max_pending):
+        self.wsgi_app = wsgi_app
+        self.inference_executor = inference_executor
+        self.io_executor = io_executor
+        self.max_pending = max_pending
+
+        # Only touched on the event loop thread
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+
+        inference = scope['path'].startswith(INFERENCE_PREFIXES)
+        if inference:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                response = JSONResponse({'error': 'Inference queue full, retry later'},
+                                        status_code=503, headers={'Retry-After': '1'})
+                await response(scope, receive, send)
+                return
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+        loop = asyncio.get_running_loop()
+        executor = self.inference_executor if inference else self.io_executor
+        try:
+            await loop.run_in_executor(executor, self.handle, scope, receive, send, loop)
+        finally:
+            if inference:
+                self.pending -= 1
+                self.completed += 1
+
+    def environ(self, scope, body):
+        """WSGI environ for an ASGI HTTP scope"""
+        root_path = scope.get('root_path', '')
+        path = scope['path']
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+            'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+            # The body ends where the ASGI stream ends (chunked uploads have no length)
+            'wsgi.input_terminated': True
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = f"HTTP_{name}"
+            environ[name] = f"{environ[name]},{value}" if name in environ else value
+        return environ
+
+    def handle(self, scope, receive, send, loop):
+        """Run one request through the WSGI app (worker thread)"""
+        def post(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        start = {}
+
+        def start_response(status, headers, exc_info=None):
+            start['message'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            }
+            return lambda data: None
+
+        result = self.wsgi_app(self.environ(scope, ASGIInput(receive, loop)), start_response)
+        try:
+            started = False
+            for chunk in result:
+                if not chunk:
+                    continue
+                if not started:
+                    post(start['message'])
+                    started = True
+                post({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not started:
+                post(start['message'])
+            post({'type': 'http.response.body', 'body': b''})
+        except Exception as e:
+            logger.warning(f"Response to {scope['path']} aborted: {e}")
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    def stats(self):
+        """Inference pool queue counters for /health"""
+        return {
+            'inference_workers': self.inference_executor._max_workers,
+            'io_workers': self.io_executor._max_workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'peak_pending': self.peak_pending,
+            'completed': self.completed,
+            'rejected': self.rejected
+        }
+
+def create_app(api=None, inference_workers=None, max_pending=None, io_workers=None):
+    """Starlette app serving a BatteryMLAPI (a new one by default)"""
+    if api is None:
+        from battery_api_server import BatteryMLAPI
+        api = BatteryMLAPI()
+    if inference_workers is None:
+        inference_workers = int(os.environ.get('BATTERY_API_ASGI_WORKERS', os.cpu_count() or 1))
+    if max_pending is None:
+        max_pending = int(os.environ.get('BATTERY_API_ASGI_MAX_PENDING', inference_workers * 8))
+    if io_workers is None:
+        io_workers = int(os.environ.get('BATTERY_API_ASGI_IO_WORKERS', 8))
+
+    inference_executor = ThreadPoolExecutor(inference_workers, thread_name_prefix='inference')
+    io_executor = ThreadPoolExecutor(io_workers, thread_name_prefix='io')
+    bridge = WSGIBridge(api.app.wsgi_app, inference_executor, io_executor, max_pending)
+    api.server_info = lambda: dict(bridge.stats(), mode='asgi')
+
+    async def health(request):
+        """Health check, answered on the event loop"""
+        return JSONResponse(api.health_status())
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        inference_executor.shutdown(wait=False)
+        io_executor.shutdown(wait=False)
+
+    app = Starlette(routes=[
+        Route('/health', health, methods=['GET']),
+        Mount('/', app=bridge)
+    ], lifespan=lifespan)
+    app.state.api = api
+    app.state.bridge = bridge
+    return app
+
+def run_asgi(api, host='127.0.0.1', port=5001, inference_workers=None, max_pending=None):
+    """Serve ``api`` with uvicorn"""
+    import uvicorn
+
+    app = create_app(api, inference_workers, max_pending)
+    stats = app.state.bridge.stats()
+    logger.info(f"⚡ ASGI mode: {stats['inference_workers']} inference threads, "
+                f"up to {stats['max_pending']} pending inference requests")
+    uvicorn.run(app, host=host, port=port, log_level='info')
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Battery Twin ML API Server (ASGI)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--inference-workers', type=int, default=None,
+                        help='threads running model inference (default: CPU count)')
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help='inference requests admitted before answering 503 (default 8 per worker)')
+    args = parser.parse_args()
+
+    from battery_api_server import BatteryMLAPI
+    api = BatteryMLAPI()
+    api.run(host=args.host, port=args.port, server='asgi',
+            inference_workers=args.inference_workers, max_pending=args.max_pending)
+
+if __name__ == "__main__":
+    main()
@@ -5,73 +5,578 @@ Flask API to serve SOH and RUL models for Express.js integration
 """
 
 from flask import Flask, request, jsonify, Response
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-import torch
-import joblib
 import numpy as np
-import pandas as pd
 import json
 import os
+import time
 import logging
+import argparse
+import threading
+import math
 import traceback
 from datetime import datetime
+from concurrent.futures.process import BrokenProcessPool
 import warnings
 
+from micro_batcher import MicroBatcher
+from model_registry import ModelRegistry
+from battery_store import BatteryStore, default_store_dir
+from prediction_cache import PredictionCache
+from rul_state import RULStateStore
+from ndjson_stream import NDJSONStreamReader
+from metrics import Metrics, server_timing
+from profiling import install_profiling
+import trip_simulation
+
+# Numeric reading fields checked before a batch is vectorized
+READING_FIELDS = ('voltage', 'current', 'temperature', 'capacity', 'cycle_count', 'soc', 'soh')
+READING_TYPES = ('battery', 'soh', 'rul')
+
 # Suppress sklearn version warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that times response serialization as the 'serialize' stage"""
+    
+    metrics = None
+    
+    def dumps(self, obj, **kwargs):
+        if self.metrics is None or not self.metrics.timing_request():
+            return super().dumps(obj, **kwargs)
+        with self.metrics.stage('serialize'):
+            return super().dumps(obj, **kwargs)
+
 class BatteryMLAPI:
-    def __init__(self):
+    def __init__(self, micro_batching=None, batch_window_ms=None, batch_max_size=None,
+                 warmup_models=None, cache_size=None, cache_ttl=None, cache_resolution=None,
+                 rul_state_size=None, rul_state_idle=None):
         """Initialize the Battery ML API"""
         self.app = Flask(__name__)
         CORS(self.app)  # Enable CORS for Express.js communication
         
-        # Model storage
+        # Per-route/per-stage latency histograms and counters for /metrics
+        self.metrics = Metrics.from_env()
+        self.debug_timing = os.environ.get('BATTERY_API_DEBUG_TIMING', '0') == '1'
+        self.app.json = TimedJSONProvider(self.app)
+        self.app.json.metrics = self.metrics
+        
+        # (worker, snapshot) list rendered by /metrics instead of this process's values (pre-fork mode)
+        self.metrics_snapshots = None
+        
+        # Prediction cache hits/misses already added to the metrics counters
+        self.reported_cache_counts = (0, 0)
+        self.reported_cache_lock = threading.Lock()
+        
+        # Model storage (a lazy ModelRegistry once load_models() runs)
         self.models = {}
-        self.scaler = None
+        if warmup_models is None:
+            warmup_models = os.environ.get('BATTERY_API_WARMUP', 'soh,rul_gru,rul_scaler').split(',')
+        self.warmup_models = [key.strip() for key in warmup_models if key.strip()]
+        
+        # Upper bound on readings accepted by /predict/batch
+        self.max_batch_size = int(os.environ.get('BATTERY_API_MAX_BATCH', 10000))
+        
+        # Micro-batches and read-ahead limit of /predict/stream uploads
+        self.stream_batch_size = int(os.environ.get('BATTERY_API_STREAM_BATCH', 256))
+        self.stream_window_ms = float(os.environ.get('BATTERY_API_STREAM_WINDOW_MS', 5.0))
+        self.stream_max_pending = int(os.environ.get('BATTERY_API_STREAM_MAX_PENDING', 1024))
+        self.stream_stall_timeout = float(os.environ.get('BATTERY_API_STREAM_STALL_SECONDS', 60.0))
+        
+        # Opt-in micro-batching of concurrent single-reading requests
+        if micro_batching is None:
+            micro_batching = os.environ.get('BATTERY_API_MICRO_BATCHING', '0') == '1'
+        if batch_window_ms is None:
+            batch_window_ms = float(os.environ.get('BATTERY_API_BATCH_WINDOW_MS', 3.0))
+        if batch_max_size is None:
+            batch_max_size = int(os.environ.get('BATTERY_API_BATCH_MAX_SIZE', 64))
+        self.micro_batching = micro_batching
+        self.batch_window_ms = batch_window_ms
+        self.batch_max_size = batch_max_size
+        self.batchers = {}
+        
+        # Cache of model outputs for repeated (quantized) readings; None when disabled
+        self.prediction_cache = PredictionCache.from_env(cache_size, cache_ttl, cache_resolution)
         
-        # Load models on startup
+        # Per-battery recurrent state for stateful RUL inference
+        self.rul_states = RULStateStore.from_env(rul_state_size, rul_state_idle)
+        
+        # Process pool of large /simulate/fleet runs, started on first use
+        self.fleet_pool = None
+        self.fleet_pool_lock = threading.Lock()
+        
+        # Register models and warm up the ones used by default
         self.load_models()
         
+        if self.micro_batching:
+            self.setup_batchers()
+        
+        # Monte-Carlo fleet simulation limits
+        self.max_fleet_trips = int(os.environ.get('BATTERY_API_MAX_FLEET_TRIPS', 1000000))
+        self.fleet_workers = int(os.environ.get('BATTERY_API_FLEET_WORKERS', os.cpu_count() or 1))
+        self.fleet_pool_threshold = int(os.environ.get('BATTERY_API_FLEET_POOL_THRESHOLD', 20000))
+        
+        # Columnar battery history (opened on first query)
+        self.history_store_dir = default_store_dir()
+        self.history_store = None
+        self.history_store_mtime = None
+        
+        # Serving mode details for /health, set by the ASGI and pre-fork servers
+        self.server_info = None
+        
         # Setup routes
+        self.setup_metrics()
         self.setup_routes()
+        self.setup_fleet_routes()
+        self.setup_history_routes()
+        
+        # /admin/profile and ?profile=1, only with $BATTERY_PROFILING=1
+        self.profiling = install_profiling(self.app)
     
     def load_models(self):
-        """Load all ML models"""
+        """Register all ML models and warm up the configured ones in parallel"""
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        models_dir = os.environ.get('BATTERY_MODELS_DIR', os.path.join(script_dir, 'models'))
+        
+        # Models load lazily on first use; only the warm-up set loads now
+        self.models = ModelRegistry(models_dir)
+        
+        # Cached predictions must not outlive the models that made them
+        if self.prediction_cache is not None:
+            self.prediction_cache.invalidate()
+            self.models.add_unload_listener(self.invalidate_predictions)
+        self.rul_states.reset()
+        self.models.add_unload_listener(self.reset_rul_states)
+        self.models.add_unload_listener(self.shutdown_fleet_pool)
+        
+        logger.info(f"Warming up ML models: {', '.join(self.warmup_models) or 'none'}")
+        start = time.perf_counter()
+        self.models.warm_up(self.warmup_models)
+        logger.info(f"🎉 Warm-up finished in {(time.perf_counter() - start) * 1000:.0f} ms "
+                    f"({len(self.models)}/{len(self.models.keys())} models loaded)")
+    
+    def invalidate_predictions(self, key):
+        """Drop cached predictions of an unloaded model (all RUL ones for the scaler)"""
+        if key == 'rul_scaler':
+            for rul_key in ('rul_gru', 'rul_gru_norm', 'rul_lstm'):
+                self.prediction_cache.invalidate(rul_key)
+        else:
+            self.prediction_cache.invalidate(key)
+    
+    def reset_rul_states(self, key):
+        """Drop hidden states built by an unloaded model (all of them for the scaler)"""
+        if key == 'rul_scaler':
+            self.rul_states.reset()
+        else:
+            self.rul_states.reset(model_key=key)
+    
+    def get_fleet_pool(self):
+        """Shared process pool for Monte-Carlo chunks; workers load the SOH model themselves"""
+        with self.fleet_pool_lock:
+            if self.fleet_pool is None:
+                self.fleet_pool = trip_simulation.simulation_pool(self.fleet_workers, self.models.models_dir)
+            return self.fleet_pool
+    
+    def shutdown_fleet_pool(self, key=None):
+        """Stop the fleet pool so the next run starts workers with the reloaded SOH model"""
+        if key not in (None, 'soh'):
+            return
+        with self.fleet_pool_lock:
+            pool, self.fleet_pool = self.fleet_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    @property
+    def scaler(self):
+        """RUL feature scaler (loaded on first use)"""
+        return self.models['rul_scaler']
+    
+    def soh_features(self, data):
+        """Build the SOH feature row: voltage, current, temperature, capacity, cycle_count"""
+        return [
+            data.get('voltage', 3.7),
+            data.get('current', 2.0),
+            data.get('temperature', 25.0),
+            data.get('capacity', 2.5),
+            data.get('cycle_count', 100)
+        ]
+    
+    def rul_features(self, data, soh):
+        """Build the RUL feature row: voltage, current, temperature, soc, soh"""
+        return [
+            data.get('voltage', 3.7),
+            data.get('current', 2.0),
+            data.get('temperature', 25.0),
+            data.get('soc', 80.0),
+            soh
+        ]
+    
+    def reading_error(self, data):
+        """Why one batch reading cannot be predicted, or None if it is valid"""
+        if not isinstance(data, dict):
+            return f"Reading must be an object, got {type(data).__name__}"
+        kind = data.get('type', 'battery')
+        if kind not in READING_TYPES:
+            return f"Unknown reading type: {kind}"
+        for field in READING_FIELDS:
+            value = data.get(field)
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                return f"'{field}' must be a finite number, got {value!r}"
+        return None
+    
+    def rul_model_key(self, model_type):
+        """Map a request model name to its key in self.models"""
+        if model_type == 'gru_norm':
+            return 'rul_gru_norm'
+        elif model_type == 'lstm':
+            return 'rul_lstm'
+        return 'rul_gru'
+    
+    def count_model_call(self, key, rows):
+        """Count one model invocation over ``rows`` readings for /metrics"""
+        labels = (('model', key),)
+        self.metrics.inc('battery_api_model_calls_total', labels)
+        self.metrics.inc('battery_api_model_rows_total', labels, rows)
+    
+    def predict_soh_rows(self, features):
+        """SOH random-forest predictions for a feature matrix"""
+        model = self.models['soh']
+        self.count_model_call('soh', len(features))
+        with self.metrics.stage('soh_predict'):
+            return model.predict(features)
+    
+    def scale_rul_rows(self, rows):
+        """Scale a RUL feature matrix with the fitted scaler"""
+        with self.metrics.stage('scaler_transform'):
+            return self.scaler.transform(rows)
+    
+    def run_rul_model(self, model, scaled_features, key=None):
+        """Run one forward pass of a RUL model over a scaled feature matrix"""
+        # Deferred so the server starts (and /health answers) without loading torch
+        import torch
+        
+        if key is not None:
+            self.count_model_call(key, len(scaled_features))
+        with self.metrics.stage('tensor'):
+            tensor_features = torch.tensor(scaled_features, dtype=torch.float32)
+        
+        # Set model to evaluation mode
+        model.eval()
+        
+        with torch.no_grad(), self.metrics.stage('rnn_forward'):
+            if hasattr(model, 'predict'):
+                rul_prediction = model.predict(tensor_features)
+            else:
+                rul_prediction = model(tensor_features)
+        
+        if isinstance(rul_prediction, torch.Tensor):
+            rul_prediction = rul_prediction.numpy()
+        return np.asarray(rul_prediction, dtype=np.float64).reshape(-1)
+    
+    def soh_result(self, soh_prediction):
+        """Format an SOH prediction like /predict/soh"""
+        soh_percentage = max(0, min(100, float(soh_prediction)))
+        
+        # Health status classification
+        if soh_percentage >= 90:
+            health_status = 'excellent'
+        elif soh_percentage >= 80:
+            health_status = 'good'
+        elif soh_percentage >= 70:
+            health_status = 'fair'
+        elif soh_percentage >= 60:
+            health_status = 'poor'
+        else:
+            health_status = 'critical'
+        
+        return {
+            'soh_percentage': round(soh_percentage, 2),
+            'health_status': health_status,
+            'model_used': 'random_forest',
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def rul_result(self, rul_prediction, model_type):
+        """Format a RUL prediction like /predict/rul"""
+        # Ensure reasonable bounds
+        rul_cycles = max(0, min(2000, float(rul_prediction)))
+        
+        # Convert to time estimates
+        rul_days = rul_cycles / 1.5  # Assuming ~1.5 cycles per day
+        rul_months = rul_days / 30
+        
+        return {
+            'rul_cycles': round(rul_cycles, 0),
+            'rul_days': round(rul_days, 0),
+            'rul_months': round(rul_months, 1),
+            'model_used': model_type,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def battery_result(self, data, soh_percentage, rul_prediction):
+        """Format a complete SOH + RUL analysis like /predict/battery"""
+        rul_cycles = max(0, min(2000, float(rul_prediction)))
+        
+        # Health status
+        if soh_percentage >= 90:
+            health_status = 'excellent'
+        elif soh_percentage >= 80:
+            health_status = 'good'
+        elif soh_percentage >= 70:
+            health_status = 'fair'
+        else:
+            health_status = 'poor'
+        
+        # Calculate range estimate (simplified)
+        range_km = (data.get('soc', 80) / 100) * 400 * (soh_percentage / 100)
+        
+        return {
+            'battery_analysis': {
+                'soh': {
+                    'percentage': round(soh_percentage, 2),
+                    'status': health_status
+                },
+                'rul': {
+                    'cycles': round(rul_cycles, 0),
+                    'days': round(rul_cycles / 1.5, 0),
+                    'months': round(rul_cycles / 45, 1)
+                },
+                'current_metrics': {
+                    'voltage': data.get('voltage', 3.7),
+                    'current': data.get('current', 2.0),
+                    'temperature': data.get('temperature', 25.0),
+                    'soc': data.get('soc', 80.0),
+                    'estimated_range_km': round(range_km, 1)
+                },
+                'timestamp': datetime.now().isoformat()
+            }
+        }
+    
+    def trip_duration(self, data):
+        """Trip length in minutes; duration_days / duration_hours replace duration_minutes"""
+        if 'duration_days' in data or 'duration_hours' in data:
+            return data.get('duration_days', 0) * 24 * 60 + data.get('duration_hours', 0) * 60
+        return data.get('duration_minutes', 60)
+    
+    def predict_batch(self, readings):
+        """Vectorized predictions for a list of readings of mixed kinds
+        
+        Each reading has a 'type' of 'soh', 'rul' or 'battery' (default). All
+        SOH rows go through one RF predict, all RUL rows through one scaler
+        transform and one forward pass per RUL model. Results keep input order;
+        invalid readings get an {'error': ...} result and are left out of the
+        vectorized calls.
+        """
+        results = [None] * len(readings)
+        for i, data in enumerate(readings):
+            error = self.reading_error(data)
+            if error is not None:
+                results[i] = {'error': error}
+        valid = [(i, data) for i, data in enumerate(readings) if results[i] is None]
+        
+        soh_rows, soh_index = [], []
+        for i, data in valid:
+            if data.get('type', 'battery') in ('soh', 'battery'):
+                soh_rows.append(self.soh_features(data))
+                soh_index.append(i)
+        
+        # One SOH prediction over every row that needs it
+        soh_values = {}
+        if soh_rows:
+            soh_predictions = self.predict_soh_rows(np.array(soh_rows, dtype=np.float64))
+            for i, soh_prediction in zip(soh_index, soh_predictions):
+                soh_values[i] = max(0, min(100, float(soh_prediction)))
+        
+        # Group RUL rows by model
+        rul_rows, rul_index, rul_keys = [], [], []
+        for i, data in valid:
+            kind = data.get('type', 'battery')
+            if kind == 'rul':
+                rul_rows.append(self.rul_features(data, data.get('soh', 85.0)))
+                rul_keys.append(self.rul_model_key(data.get('model', 'gru')))
+            elif kind == 'battery':
+                rul_rows.append(self.rul_features(data, soh_values[i]))
+                rul_keys.append('rul_gru')
+            else:
+                continue
+            rul_index.append(i)
+        
+        # One scaler transform, then one forward pass per model
+        rul_values = {}
+        if rul_rows:
+            scaled_features = self.scale_rul_rows(np.array(rul_rows, dtype=np.float64))
+            rul_keys = np.array(rul_keys)
+            rul_index = np.array(rul_index)
+            for key in np.unique(rul_keys):
+                mask = rul_keys == key
+                predictions = self.run_rul_model(self.models[key], scaled_features[mask], key)
+                for i, rul_prediction in zip(rul_index[mask], predictions):
+                    rul_values[int(i)] = rul_prediction
+        
+        for i, data in valid:
+            kind = data.get('type', 'battery')
+            if kind == 'soh':
+                results[i] = self.soh_result(soh_values[i])
+            elif kind == 'rul':
+                results[i] = self.rul_result(rul_values[i], data.get('model', 'gru'))
+            else:
+                results[i] = self.battery_result(data, soh_values[i], rul_values[i])
+        
+        return results
+    
+    def predict_stream_batch(self, items):
+        """Results for one micro-batch of streamed (line number, reading or error) items, in order"""
+        readings = [reading for _, reading in items if isinstance(reading, dict)]
         try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            models_dir = os.path.join(script_dir, 'models')
-            
-            logger.info("Loading ML models...")
-            
-            # Load SOH Random Forest model
-            soh_path = os.path.join(models_dir, 'soh_rf_model.pkl')
-            self.models['soh'] = joblib.load(soh_path)
-            logger.info("✅ SOH Random Forest model loaded")
-            
-            # Load RUL models
-            rul_gru_path = os.path.join(models_dir, 'rul_gru.pth')
-            rul_gru_norm_path = os.path.join(models_dir, 'rul_gru_normalized.pth')
-            rul_lstm_path = os.path.join(models_dir, 'rul_lstm_model.pth')
-            
-            self.models['rul_gru'] = torch.load(rul_gru_path, map_location='cpu')
-            self.models['rul_gru_norm'] = torch.load(rul_gru_norm_path, map_location='cpu')
-            self.models['rul_lstm'] = torch.load(rul_lstm_path, map_location='cpu')
-            
-            logger.info("✅ RUL models loaded (GRU, GRU_norm, LSTM)")
-            
-            # Load scaler
-            scaler_path = os.path.join(models_dir, 'rul_scaler.pkl')
-            self.scaler = joblib.load(scaler_path)
-            logger.info("✅ RUL scaler loaded")
-            
-            logger.info("🎉 All models loaded successfully!")
-            
+            predictions = iter(self.predict_batch(readings))
         except Exception as e:
-            logger.error(f"❌ Error loading models: {e}")
-            raise
+            logger.error(f"Stream batch prediction error: {e}")
+            predictions = iter([{'error': str(e)} for _ in readings])
+        
+        results = []
+        for line, reading in items:
+            if isinstance(reading, dict):
+                result = next(predictions)
+                if 'id' in reading:
+                    result['id'] = reading['id']
+            else:
+                result = {'error': reading}
+            if 'error' in result:
+                result['line'] = line
+            results.append(result)
+        return results
+    
+    def setup_batchers(self):
+        """Create one micro-batcher per model used by the single-reading routes"""
+        self.batchers['soh'] = MicroBatcher(
+            self.predict_soh_rows,
+            window_ms=self.batch_window_ms,
+            max_batch_size=self.batch_max_size,
+            name='soh'
+        )
+        for key in ('rul_gru', 'rul_gru_norm', 'rul_lstm'):
+            self.batchers[key] = MicroBatcher(
+                lambda features, key=key: self.run_rul_model(self.models[key], self.scale_rul_rows(features), key),
+                window_ms=self.batch_window_ms,
+                max_batch_size=self.batch_max_size,
+                name=key
+            )
+        logger.info(f"⏱️ Micro-batching enabled ({self.batch_window_ms} ms window, max {self.batch_max_size})")
+    
+    def infer_soh(self, row):
+        """Predict SOH for one feature row (cached), through the micro-batcher when enabled"""
+        def compute():
+            if 'soh' in self.batchers:
+                with self.metrics.stage('micro_batch'):
+                    return float(self.batchers['soh'].submit(row))
+            return float(self.predict_soh_rows(np.array([row]))[0])
+        
+        if self.prediction_cache is None:
+            return compute()
+        return self.prediction_cache.get_or_compute('soh', row, compute)
+    
+    def infer_rul(self, key, row):
+        """Predict RUL for one unscaled feature row (cached), through the micro-batcher when enabled"""
+        def compute():
+            if key in self.batchers:
+                with self.metrics.stage('micro_batch'):
+                    return float(self.batchers[key].submit(row))
+            scaled_features = self.scale_rul_rows(np.array([row]))
+            return float(self.run_rul_model(self.models[key], scaled_features, key)[0])
+        
+        if self.prediction_cache is None:
+            return compute()
+        return self.prediction_cache.get_or_compute(key, row, compute)
+    
+    def infer_rul_stateful(self, key, battery_ids, rows):
+        """Advance each battery's RUL hidden state by one reading; returns (RUL values, steps)"""
+        eager_key = f"{key}_eager"
+        scaled_features = self.scale_rul_rows(np.array(rows))
+        self.count_model_call(eager_key, len(rows))
+        with self.metrics.stage('rnn_step'):
+            return self.rul_states.step(eager_key, self.models[eager_key], battery_ids, scaled_features)
+    
+    def setup_metrics(self):
+        """Time every request, count requests/errors per route and serve /metrics"""
+        metrics = self.metrics
+        metrics.describe('battery_api_request_seconds', 'histogram', 'Request latency by route, method and status')
+        metrics.describe('battery_api_stage_seconds', 'histogram', 'Latency of request stages by route')
+        metrics.describe('battery_api_requests_total', 'counter', 'Requests by route, method and status')
+        metrics.describe('battery_api_errors_total', 'counter', 'Requests answered with a 5xx status by route')
+        metrics.describe('battery_api_model_calls_total', 'counter', 'Model invocations (batched calls count once)')
+        metrics.describe('battery_api_model_rows_total', 'counter', 'Readings passed to each model')
+        metrics.describe('battery_api_models_loaded', 'gauge', 'Models currently in memory')
+        metrics.describe('battery_api_prediction_cache_hits_total', 'counter', 'Prediction cache hits')
+        metrics.describe('battery_api_prediction_cache_misses_total', 'counter', 'Prediction cache misses')
+        metrics.describe('battery_api_micro_batch_queued', 'gauge', 'Readings waiting in each micro-batcher')
+        
+        @self.app.before_request
+        def start_timing():
+            if not metrics.enabled:
+                return
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            metrics.begin_request(route)
+            # Parse JSON bodies up front so parsing is its own stage (Flask caches the result);
+            # chunked uploads such as /predict/stream have no length and are left alone
+            if request.content_length and request.is_json:
+                with metrics.stage('parse'):
+                    request.get_json(silent=True)
+        
+        @self.app.after_request
+        def record_timing(response):
+            if not metrics.enabled:
+                return response
+            total, timings = metrics.end_request()
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            labels = (('route', route), ('method', request.method), ('status', str(response.status_code)))
+            metrics.observe('battery_api_request_seconds', total, labels)
+            metrics.inc('battery_api_requests_total', labels)
+            if response.status_code >= 500:
+                metrics.inc('battery_api_errors_total', (('route', route),))
+            if self.debug_timing or request.headers.get('X-Debug-Timing') == '1':
+                response.headers['Server-Timing'] = server_timing(total, timings)
+            return response
+        
+        @self.app.route('/metrics', methods=['GET'])
+        def prometheus_metrics():
+            """Counters and latency histograms in the Prometheus text format (all workers in pre-fork mode)"""
+            self.refresh_metrics()
+            snapshots = self.metrics_snapshots() if self.metrics_snapshots is not None else None
+            return Response(metrics.render(snapshots), mimetype='text/plain; version=0.0.4')
+    
+    def refresh_metrics(self):
+        """Bring in values kept outside the metrics: model and queue gauges, prediction cache counters"""
+        metrics = self.metrics
+        metrics.set_gauge('battery_api_models_loaded', len(self.models))
+        if self.prediction_cache is not None:
+            # Counters grow by what the cache counted since the last refresh
+            with self.reported_cache_lock:
+                hits, misses = self.prediction_cache.hits, self.prediction_cache.misses
+                reported_hits, reported_misses = self.reported_cache_counts
+                metrics.inc('battery_api_prediction_cache_hits_total', value=hits - reported_hits)
+                metrics.inc('battery_api_prediction_cache_misses_total', value=misses - reported_misses)
+                self.reported_cache_counts = (hits, misses)
+        for key, batcher in self.batchers.items():
+            metrics.set_gauge('battery_api_micro_batch_queued', batcher.queue.qsize(), (('model', key),))
+    
+    def health_status(self):
+        """Body of /health: model status and cache/batching counters (no inference)"""
+        return {
+            'status': 'healthy',
+            'timestamp': datetime.now().isoformat(),
+            'models_loaded': len(self.models),
+            'available_models': list(self.models.keys()),
+            'models': self.models.stats(),
+            'micro_batching': {key: batcher.stats() for key, batcher in self.batchers.items()},
+            'prediction_cache': self.prediction_cache.stats() if self.prediction_cache else None,
+            'rul_state': self.rul_states.stats(),
+            'server': self.server_info() if self.server_info else {'mode': 'flask'}
+        }
     
     def setup_routes(self):
         """Setup Flask routes"""
@@ -79,12 +584,29 @@ class BatteryMLAPI:
         @self.app.route('/health', methods=['GET'])
         def health_check():
             """Health check endpoint"""
-            return jsonify({
-                'status': 'healthy',
-                'timestamp': datetime.now().isoformat(),
-                'models_loaded': len(self.models),
-                'available_models': list(self.models.keys())
-            })
+            return jsonify(self.health_status())
+        
+        @self.app.route('/models/reload', methods=['POST'])
+        def reload_models():
+            """Unload one model (or all) so it is read again from disk; drops its cached predictions"""
+            try:
+                data = request.get_json(silent=True) or {}
+                key = data.get('model')
+                if key is not None and key not in self.models:
+                    return jsonify({'error': f"Unknown model: {key}"}), 400
+                
+                self.models.unload(key)
+                self.models.warm_up([key] if key is not None else self.warmup_models)
+                
+                return jsonify({
+                    'reloaded': key or 'all',
+                    'models': self.models.stats(),
+                    'prediction_cache': self.prediction_cache.stats() if self.prediction_cache else None
+                })
+                
+            except Exception as e:
+                logger.error(f"Model reload error: {e}")
+                return jsonify({'error': str(e)}), 500
         
         @self.app.route('/predict/soh', methods=['POST'])
         def predict_soh():
@@ -94,36 +616,12 @@ class BatteryMLAPI:
                 
                 # Extract features for SOH prediction
                 # Typical features: voltage, current, temperature, capacity, cycle_count
-                features = np.array([[
-                    data.get('voltage', 3.7),
-                    data.get('current', 2.0),
-                    data.get('temperature', 25.0),
-                    data.get('capacity', 2.5),
-                    data.get('cycle_count', 100)
-                ]])
+                features = self.soh_features(data)
                 
                 # Predict SOH
-                soh_prediction = self.models['soh'].predict(features)[0]
-                soh_percentage = max(0, min(100, float(soh_prediction)))
-                
-                # Health status classification
-                if soh_percentage >= 90:
-                    health_status = 'excellent'
-                elif soh_percentage >= 80:
-                    health_status = 'good'
-                elif soh_percentage >= 70:
-                    health_status = 'fair'
-                elif soh_percentage >= 60:
-                    health_status = 'poor'
-                else:
-                    health_status = 'critical'
+                soh_prediction = self.infer_soh(features)
                 
-                return jsonify({
-                    'soh_percentage': round(soh_percentage, 2),
-                    'health_status': health_status,
-                    'model_used': 'random_forest',
-                    'timestamp': datetime.now().isoformat()
-                })
+                return jsonify(self.soh_result(soh_prediction))
                 
             except Exception as e:
                 logger.error(f"SOH prediction error: {e}")
@@ -137,62 +635,61 @@ class BatteryMLAPI:
                 model_type = data.get('model', 'gru')  # default to GRU
                 
                 # Extract features for RUL prediction
-                features = np.array([[
-                    data.get('voltage', 3.7),
-                    data.get('current', 2.0),
-                    data.get('temperature', 25.0),
-                    data.get('soc', 80.0),
-                    data.get('soh', 85.0)
-                ]])
-                
-                # Scale features
-                scaled_features = self.scaler.transform(features)
-                
-                # Convert to tensor for PyTorch models
-                tensor_features = torch.tensor(scaled_features, dtype=torch.float32)
-                
-                # Select model and predict
-                if model_type == 'gru_norm':
-                    model = self.models['rul_gru_norm']
-                elif model_type == 'lstm':
-                    model = self.models['rul_lstm']
-                else:
-                    model = self.models['rul_gru']
-                
-                # Set model to evaluation mode
-                model.eval()
-                
-                with torch.no_grad():
-                    if hasattr(model, 'predict'):
-                        rul_prediction = model.predict(tensor_features)
-                    else:
-                        rul_prediction = model(tensor_features)
-                    
-                    if isinstance(rul_prediction, torch.Tensor):
-                        rul_cycles = float(rul_prediction.item())
-                    else:
-                        rul_cycles = float(rul_prediction)
-                
-                # Ensure reasonable bounds
-                rul_cycles = max(0, min(2000, rul_cycles))
-                
-                # Convert to time estimates
-                rul_days = rul_cycles / 1.5  # Assuming ~1.5 cycles per day
-                rul_months = rul_days / 30
+                features = self.rul_features(data, data.get('soh', 85.0))
                 
-                return jsonify({
-                    'rul_cycles': round(rul_cycles, 0),
-                    'rul_days': round(rul_days, 0),
-                    'rul_months': round(rul_months, 1),
-                    'model_used': model_type,
-                    'timestamp': datetime.now().isoformat()
-                })
+                # Select model, scale features and predict
+                rul_prediction = self.infer_rul(self.rul_model_key(model_type), features)
+                
+                return jsonify(self.rul_result(rul_prediction, model_type))
                 
             except Exception as e:
                 logger.error(f"RUL prediction error: {e}")
                 traceback.print_exc()
                 return jsonify({'error': str(e)}), 500
         
+        @self.app.route('/predict/rul/stateful', methods=['POST'])
+        def predict_rul_stateful():
+            """Predict RUL from a battery's reading history, one recurrent step per reading"""
+            try:
+                data = request.get_json()
+                battery_id = data.get('battery_id', data.get('vehicle_id'))
+                if battery_id is None:
+                    return jsonify({'error': "'battery_id' is required"}), 400
+                model_type = data.get('model', 'gru')
+                
+                features = self.rul_features(data, data.get('soh', 85.0))
+                rul_values, steps = self.infer_rul_stateful(self.rul_model_key(model_type), [str(battery_id)], [features])
+                
+                result = self.rul_result(rul_values[0], model_type)
+                result['battery_id'] = battery_id
+                result['sequence_step'] = int(steps[0])
+                return jsonify(result)
+                
+            except Exception as e:
+                logger.error(f"Stateful RUL prediction error: {e}")
+                traceback.print_exc()
+                return jsonify({'error': str(e)}), 500
+        
+        @self.app.route('/state/rul/reset', methods=['POST'])
+        def reset_rul_state():
+            """Forget the RUL hidden state of one battery (or of all batteries)"""
+            try:
+                data = request.get_json(silent=True) or {}
+                battery_id = data.get('battery_id', data.get('vehicle_id'))
+                model_key = f"{self.rul_model_key(data['model'])}_eager" if 'model' in data else None
+                
+                reset = self.rul_states.reset(str(battery_id) if battery_id is not None else None, model_key)
+                
+                return jsonify({
+                    'battery_id': battery_id,
+                    'states_reset': reset,
+                    'rul_state': self.rul_states.stats()
+                })
+                
+            except Exception as e:
+                logger.error(f"RUL state reset error: {e}")
+                return jsonify({'error': str(e)}), 500
+        
         @self.app.route('/predict/battery', methods=['POST'])
         def predict_battery_complete():
             """Complete battery analysis - SOH + RUL"""
@@ -200,129 +697,112 @@ class BatteryMLAPI:
                 data = request.get_json()
                 
                 # Get SOH prediction
-                soh_features = np.array([[
-                    data.get('voltage', 3.7),
-                    data.get('current', 2.0),
-                    data.get('temperature', 25.0),
-                    data.get('capacity', 2.5),
-                    data.get('cycle_count', 100)
-                ]])
-                
-                soh_prediction = self.models['soh'].predict(soh_features)[0]
+                soh_prediction = self.infer_soh(self.soh_features(data))
                 soh_percentage = max(0, min(100, float(soh_prediction)))
                 
                 # Get RUL prediction
-                rul_features = np.array([[
-                    data.get('voltage', 3.7),
-                    data.get('current', 2.0),
-                    data.get('temperature', 25.0),
-                    data.get('soc', 80.0),
-                    soh_percentage
-                ]])
-                
-                scaled_rul_features = self.scaler.transform(rul_features)
-                tensor_features = torch.tensor(scaled_rul_features, dtype=torch.float32)
-                
-                model = self.models['rul_gru']
-                model.eval()
-                
-                with torch.no_grad():
-                    rul_prediction = model(tensor_features)
-                    rul_cycles = max(0, min(2000, float(rul_prediction.item())))
-                
-                # Health status
-                if soh_percentage >= 90:
-                    health_status = 'excellent'
-                elif soh_percentage >= 80:
-                    health_status = 'good'
-                elif soh_percentage >= 70:
-                    health_status = 'fair'
-                else:
-                    health_status = 'poor'
-                
-                # Calculate range estimate (simplified)
-                range_km = (data.get('soc', 80) / 100) * 400 * (soh_percentage / 100)
+                rul_prediction = self.infer_rul('rul_gru', self.rul_features(data, soh_percentage))
+                
+                return jsonify(self.battery_result(data, soh_percentage, rul_prediction))
+                
+            except Exception as e:
+                logger.error(f"Complete battery prediction error: {e}")
+                return jsonify({'error': str(e)}), 500
+        
+        @self.app.route('/predict/batch', methods=['POST'])
+        def predict_batch():
+            """Vectorized predictions for many readings in one request"""
+            try:
+                data = request.get_json()
+                readings = data.get('readings', [])
+                
+                if not isinstance(readings, list):
+                    return jsonify({'error': "'readings' must be a list"}), 400
+                if len(readings) > self.max_batch_size:
+                    return jsonify({
+                        'error': f"Batch too large: {len(readings)} readings (max {self.max_batch_size})"
+                    }), 413
+                
+                results = self.predict_batch(readings)
                 
                 return jsonify({
-                    'battery_analysis': {
-                        'soh': {
-                            'percentage': round(soh_percentage, 2),
-                            'status': health_status
-                        },
-                        'rul': {
-                            'cycles': round(rul_cycles, 0),
-                            'days': round(rul_cycles / 1.5, 0),
-                            'months': round(rul_cycles / 45, 1)
-                        },
-                        'current_metrics': {
-                            'voltage': data.get('voltage', 3.7),
-                            'current': data.get('current', 2.0),
-                            'temperature': data.get('temperature', 25.0),
-                            'soc': data.get('soc', 80.0),
-                            'estimated_range_km': round(range_km, 1)
-                        },
-                        'timestamp': datetime.now().isoformat()
-                    }
+                    'results': results,
+                    'count': len(results),
+                    'timestamp': datetime.now().isoformat()
                 })
                 
             except Exception as e:
-                logger.error(f"Complete battery prediction error: {e}")
+                logger.error(f"Batch prediction error: {e}")
+                traceback.print_exc()
                 return jsonify({'error': str(e)}), 500
         
+        @self.app.route('/predict/stream', methods=['POST'])
+        def predict_stream():
+            """Stream NDJSON predictions back for a (chunked) NDJSON upload of readings"""
+            reader = NDJSONStreamReader(
+                request.stream,
+                max_batch_size=self.stream_batch_size,
+                window_ms=self.stream_window_ms,
+                max_pending=self.stream_max_pending,
+                stall_timeout=self.stream_stall_timeout
+            )
+            
+            def generate():
+                start = time.perf_counter()
+                try:
+                    for batch in reader.batches():
+                        yield ''.join(json.dumps(result) + '\n' for result in self.predict_stream_batch(batch))
+                finally:
+                    reader.close()
+                    stats = reader.stats()
+                    logger.info(f"📥 Stream finished: {stats['lines']} readings in {stats['batches']} batches, "
+                                f"{(time.perf_counter() - start):.1f} s, {stats['backpressure_waits']} backpressure waits"
+                                f"{' (stalled: client stopped reading results)' if stats['stalled'] else ''}")
+            
+            response = Response(generate(), mimetype='application/x-ndjson')
+            # Also stops the reader when the response is closed before the body is iterated
+            response.call_on_close(reader.close)
+            return response
+        
         @self.app.route('/simulate/trip', methods=['POST'])
         def simulate_trip():
             """Simulate a battery trip with predictions"""
             try:
                 data = request.get_json()
-                trip_duration = data.get('duration_minutes', 60)
+                trip_duration = self.trip_duration(data)
                 trip_type = data.get('type', 'city')  # city, highway, mixed
+                step_minutes = data.get('step_minutes', 5)
+                seed = data.get('seed')  # set for reproducible trips
+                
+                if trip_duration <= 0 or step_minutes <= 0:
+                    return jsonify({'error': 'Trip duration and step_minutes must be positive'}), 400
                 
-                # Generate trip simulation data
-                trip_data = []
                 base_soc = data.get('initial_soc', 90)
                 
-                for minute in range(0, trip_duration, 5):  # Every 5 minutes
-                    # Simulate battery degradation during trip
-                    current_soc = base_soc - (minute / trip_duration) * 30  # Consume ~30% over trip
-                    
-                    if trip_type == 'highway':
-                        voltage = 3.6 + np.random.normal(0, 0.1)
-                        current = 3.0 + np.random.normal(0, 0.3)
-                        temp = 28 + minute * 0.1  # Temperature increases
-                    elif trip_type == 'city':
-                        voltage = 3.7 + np.random.normal(0, 0.05)
-                        current = 2.2 + np.random.normal(0, 0.5)
-                        temp = 25 + minute * 0.05
-                    else:  # mixed
-                        voltage = 3.65 + np.random.normal(0, 0.08)
-                        current = 2.6 + np.random.normal(0, 0.4)
-                        temp = 26 + minute * 0.08
-                    
-                    # Get real-time predictions
-                    soh_features = np.array([[voltage, current, temp, 2.5, 150]])
-                    soh = float(self.models['soh'].predict(soh_features)[0])
-                    
-                    trip_data.append({
-                        'time_minutes': minute,
-                        'voltage': round(voltage, 2),
-                        'current': round(current, 2),
-                        'temperature': round(temp, 1),
-                        'soc': round(current_soc, 1),
-                        'soh': round(soh, 1),
-                        'phase': trip_type
-                    })
+                # Generate the whole trip as arrays with one SOH prediction
+                trip = trip_simulation.simulate_trip(
+                    self.models['soh'],
+                    duration_minutes=trip_duration,
+                    trip_type=trip_type,
+                    initial_soc=base_soc,
+                    step_minutes=step_minutes,
+                    seed=seed
+                )
+                trip_data = trip_simulation.trip_readings(trip, trip_type)
                 
                 return jsonify({
                     'trip_simulation': {
                         'duration_minutes': trip_duration,
                         'trip_type': trip_type,
+                        'step_minutes': step_minutes,
+                        'seed': seed,
                         'data_points': len(trip_data),
                         'readings': trip_data,
                         'summary': {
                             'initial_soc': base_soc,
                             'final_soc': trip_data[-1]['soc'],
                             'energy_consumed': base_soc - trip_data[-1]['soc'],
-                            'avg_temperature': round(np.mean([d['temperature'] for d in trip_data]), 1)
+                            'avg_temperature': round(float(np.mean([d['temperature'] for d in trip_data])), 1)
                         }
                     }
                 })
@@ -331,24 +811,257 @@ class BatteryMLAPI:
                 logger.error(f"Trip simulation error: {e}")
                 return jsonify({'error': str(e)}), 500
     
-    def run(self, host='127.0.0.1', port=5001, debug=False):
-        """Run the Flask API server"""
-        logger.info(f"🚀 Starting Battery ML API Server on {host}:{port}")
+    def setup_fleet_routes(self):
+        """Setup Monte-Carlo fleet simulation routes"""
+        
+        @self.app.route('/simulate/fleet', methods=['POST'])
+        def simulate_fleet():
+            """Monte-Carlo simulation of many trips with the same parameters"""
+            try:
+                data = request.get_json()
+                n_trips = int(data.get('trips', 1000))
+                trip_duration = self.trip_duration(data)
+                trip_type = data.get('type', 'city')
+                step_minutes = data.get('step_minutes', 5)
+                percentiles = data.get('percentiles', [5, 25, 50, 75, 95])
+                
+                if n_trips <= 0 or trip_duration <= 0 or step_minutes <= 0:
+                    return jsonify({'error': 'trips, trip duration and step_minutes must be positive'}), 400
+                if n_trips > self.max_fleet_trips:
+                    return jsonify({'error': f"Too many trips: {n_trips} (max {self.max_fleet_trips})"}), 413
+                percentiles_error = trip_simulation.percentiles_error(percentiles)
+                if percentiles_error is not None:
+                    return jsonify({'error': percentiles_error}), 400
+                
+                # Large runs fan out across the shared process pool
+                workers = self.fleet_workers if n_trips >= self.fleet_pool_threshold else 1
+                pool = self.get_fleet_pool() if workers > 1 else None
+                start = time.perf_counter()
+                try:
+                    histogram, minutes = trip_simulation.monte_carlo_trips(
+                        self.models['soh'],
+                        n_trips=n_trips,
+                        duration_minutes=trip_duration,
+                        trip_type=trip_type,
+                        initial_soc=data.get('initial_soc', 90),
+                        step_minutes=step_minutes,
+                        seed=data.get('seed'),
+                        pool=pool
+                    )
+                except BrokenProcessPool:
+                    # A worker died; start a fresh pool for the next request
+                    self.shutdown_fleet_pool()
+                    raise
+                elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+                
+                parameters = {
+                    'trips': n_trips,
+                    'duration_minutes': trip_duration,
+                    'trip_type': trip_type,
+                    'step_minutes': step_minutes,
+                    'seed': data.get('seed'),
+                    'workers': workers,
+                    'elapsed_ms': elapsed_ms
+                }
+                
+                if data.get('stream'):
+                    # NDJSON: parameters first, then one band row per time step
+                    def generate():
+                        yield json.dumps({'fleet_simulation': parameters}) + '\n'
+                        for row in trip_simulation.percentile_rows(histogram, minutes, percentiles):
+                            yield json.dumps(row) + '\n'
+                    return Response(generate(), mimetype='application/x-ndjson')
+                
+                summary = trip_simulation.monte_carlo_summary(histogram, minutes, percentiles)
+                return jsonify({'fleet_simulation': dict(parameters, **summary)})
+                
+            except Exception as e:
+                logger.error(f"Fleet simulation error: {e}")
+                traceback.print_exc()
+                return jsonify({'error': str(e)}), 500
+    
+    def get_history_store(self):
+        """Columnar history store, reopened when it was re-ingested"""
+        manifest_path = os.path.join(self.history_store_dir, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return None
+        mtime = os.path.getmtime(manifest_path)
+        if self.history_store is None or self.history_store_mtime != mtime:
+            self.history_store = BatteryStore(self.history_store_dir)
+            self.history_store_mtime = mtime
+        return self.history_store
+    
+    def setup_history_routes(self):
+        """Setup battery history query routes over the columnar store"""
+        
+        def cycle_arg(name):
+            value = request.args.get(name)
+            if value in (None, ''):
+                return None
+            try:
+                return int(value)
+            except ValueError:
+                raise ValueError(f"{name} must be an integer, got {value!r}")
+        
+        def percentiles_arg():
+            value = request.args.get('percentiles', '5,25,50,75,95')
+            try:
+                return [float(p) for p in value.split(',')]
+            except ValueError:
+                raise ValueError(f"percentiles must be comma-separated numbers, got {value!r}")
+        
+        def store_missing():
+            return jsonify({
+                'error': f"Battery history store not found at {self.history_store_dir}",
+                'hint': 'python battery_store.py data/synthetic_battery_data_medium.csv'
+            }), 503
+        
+        @self.app.route('/history/battery/<int:battery_id>', methods=['GET'])
+        def battery_history(battery_id):
+            """One battery's readings for cycles start..end (inclusive)"""
+            try:
+                store = self.get_history_store()
+                if store is None:
+                    return store_missing()
+                if store.partition(battery_id) is None:
+                    return jsonify({'error': f"Battery {battery_id} not found"}), 404
+                
+                columns = request.args.get('columns')
+                columns = [name.strip() for name in columns.split(',')] if columns else None
+                history = store.history(battery_id, cycle_arg('start'), cycle_arg('end'), columns)
+                
+                return jsonify({
+                    'battery_id': battery_id,
+                    'cycle_start': cycle_arg('start'),
+                    'cycle_end': cycle_arg('end'),
+                    'rows': len(next(iter(history.values()), [])),
+                    'columns': {name: values.tolist() for name, values in history.items()}
+                })
+                
+            except (KeyError, ValueError) as e:
+                return jsonify({'error': str(e)}), 400
+            except Exception as e:
+                logger.error(f"History query error: {e}")
+                return jsonify({'error': str(e)}), 500
+        
+        @self.app.route('/history/fleet/soh', methods=['GET'])
+        def fleet_soh():
+            """Fleet SOH percentiles at one cycle"""
+            try:
+                store = self.get_history_store()
+                if store is None:
+                    return store_missing()
+                cycle = cycle_arg('cycle')
+                if cycle is None:
+                    return jsonify({'error': 'cycle is required'}), 400
+                
+                percentiles = percentiles_arg()
+                return jsonify({'fleet_soh': store.percentiles_at_cycle('soh', cycle, percentiles)})
+                
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            except Exception as e:
+                logger.error(f"Fleet SOH query error: {e}")
+                return jsonify({'error': str(e)}), 500
+        
+        @self.app.route('/history/anomalies', methods=['GET'])
+        def anomaly_counts():
+            """Anomaly counts per battery for cycles start..end"""
+            try:
+                store = self.get_history_store()
+                if store is None:
+                    return store_missing()
+                
+                counts = store.anomaly_counts(cycle_arg('start'), cycle_arg('end'))
+                return jsonify({
+                    'cycle_start': cycle_arg('start'),
+                    'cycle_end': cycle_arg('end'),
+                    'total_anomalies': sum(count['anomalies'] for count in counts.values()),
+                    'batteries': {str(battery_id): count for battery_id, count in counts.items()}
+                })
+                
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            except Exception as e:
+                logger.error(f"Anomaly query error: {e}")
+                return jsonify({'error': str(e)}), 500
+    
+    def run(self, host='127.0.0.1', port=5001, debug=False, server='flask', workers=None, **asgi_options):
+        """Run the API server: Flask's threaded server, uvicorn (server='asgi') or pre-forked workers"""
+        logger.info(f"🚀 Starting Battery ML API Server on {host}:{port} ({server})")
         logger.info("📋 Available endpoints:")
         logger.info("  GET  /health - Health check")
+        logger.info("  GET  /metrics - Prometheus latency histograms and counters")
         logger.info("  POST /predict/soh - SOH prediction")
         logger.info("  POST /predict/rul - RUL prediction") 
+        logger.info("  POST /predict/rul/stateful - RUL from a battery's reading history")
+        logger.info("  POST /state/rul/reset - Reset a battery's RUL state")
         logger.info("  POST /predict/battery - Complete battery analysis")
+        logger.info("  POST /predict/batch - Vectorized predictions for many readings")
+        logger.info("  POST /predict/stream - NDJSON readings in, NDJSON predictions out")
+        logger.info("  POST /models/reload - Reload models from disk")
         logger.info("  POST /simulate/trip - Trip simulation")
+        logger.info("  POST /simulate/fleet - Monte-Carlo fleet trip simulation")
+        logger.info("  GET  /history/battery/<id> - Battery history for a cycle range")
+        logger.info("  GET  /history/fleet/soh - Fleet SOH percentiles at a cycle")
+        logger.info("  GET  /history/anomalies - Anomaly counts per battery")
+        if self.profiling:
+            logger.info("  GET  /admin/profile?seconds=N - Sample all threads (profiling enabled)")
         logger.info("="*50)
         
-        self.app.run(host=host, port=port, debug=debug, threaded=True)
+        if server == 'asgi':
+            from battery_api_asgi import run_asgi
+            run_asgi(self, host=host, port=port, **asgi_options)
+        elif server == 'prefork':
+            from prefork_server import PreforkServer
+            PreforkServer(self, host=host, port=port, workers=workers).serve()
+        else:
+            self.app.run(host=host, port=port, debug=debug, threaded=True)
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description='Battery Twin ML API Server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--server', choices=['flask', 'asgi', 'prefork'],
+                        default=os.environ.get('BATTERY_API_SERVER', 'flask'),
+                        help='flask (threaded dev server, default), asgi (uvicorn, see battery_api_asgi.py) '
+                             'or prefork (worker processes sharing the loaded models, see prefork_server.py)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes for --server prefork (default: CPU count)')
+    parser.add_argument('--micro-batching', action='store_true', default=None,
+                        help='batch concurrent single-reading requests into one model call')
+    parser.add_argument('--batch-window-ms', type=float, default=None,
+                        help='how long to collect requests before running a batch (default 3)')
+    parser.add_argument('--batch-max-size', type=int, default=None,
+                        help='largest micro-batch to run at once (default 64)')
+    parser.add_argument('--warmup', default=None,
+                        help='comma-separated models to load at startup (default soh,rul_gru,rul_scaler)')
+    parser.add_argument('--cache-size', type=int, default=None,
+                        help='cached predictions kept (default 10000, 0 disables the cache)')
+    parser.add_argument('--cache-ttl', type=float, default=None,
+                        help='seconds a cached prediction stays valid (default 300)')
+    parser.add_argument('--cache-resolution', type=float, default=None,
+                        help='feature rounding step for cache keys (default 0.001)')
+    parser.add_argument('--rul-state-size', type=int, default=None,
+                        help='batteries whose RUL hidden state is kept (default 10000)')
+    parser.add_argument('--rul-state-idle', type=float, default=None,
+                        help='seconds without readings before a battery state is dropped (default 3600)')
+    args = parser.parse_args()
+    
     try:
-        api = BatteryMLAPI()
-        api.run(debug=False)
+        api = BatteryMLAPI(
+            micro_batching=args.micro_batching,
+            batch_window_ms=args.batch_window_ms,
+            batch_max_size=args.batch_max_size,
+            warmup_models=args.warmup.split(',') if args.warmup is not None else None,
+            cache_size=args.cache_size,
+            cache_ttl=args.cache_ttl,
+            cache_resolution=args.cache_resolution,
+            rul_state_size=args.rul_state_size,
+            rul_state_idle=args.rul_state_idle
+        )
+        api.run(host=args.host, port=args.port, debug=False, server=args.server, workers=args.workers)
     except Exception as e:
         logger.error(f"Failed to start API server: {e}")
 
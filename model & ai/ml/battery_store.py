@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Columnar Battery History Store
+Typed, memory-mapped per-column .npy files partitioned by battery_id
+
+Layout:
+    <store>/manifest.json                 columns, dtypes and per-battery row
+                                          count and cycle range
+    <store>/battery_<id>/<column>.npy     one array per column, rows sorted by
+                                          cycle (the cycle column is the index)
+
+Usage:
+    python battery_store.py data/synthetic_battery_data_medium.csv   # writes data/battery_store
+"""
+
+import os
+import json
+import shutil
+import argparse
+import threading
+
+import numpy as np
+
+# Column -> dtype; battery_id is implied by the partition
+COLUMNS = {
+    'cycle': np.int32,
+    'voltage': np.float64,
+    'current': np.float64,
+    'temperature': np.float64,
+    'soc': np.float64,
+    'soh': np.float64,
+    'rul': np.int32,
+    'anomaly': np.bool_,
+    'carbon_footprint': np.float64
+}
+
+MANIFEST_VERSION = 1
+
+def default_store_dir():
+    """$BATTERY_STORE_DIR or data/battery_store next to this script"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.environ.get('BATTERY_STORE_DIR', os.path.join(script_dir, 'data', 'battery_store'))
+
+class BatteryStore:
+    """Read and append battery history in the columnar layout
+
+    Columns are opened with ``np.load(mmap_mode='r')`` on first use, so
+    queries only page in the partitions and cycle ranges they touch.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_store_dir()
+        self._columns = {}
+        self._lock = threading.Lock()
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        manifest_path = os.path.join(self.path, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return {'version': MANIFEST_VERSION, 'columns': {}, 'partitions': {}}
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported battery store version {manifest.get('version')}")
+        return manifest
+
+    def _write_manifest(self):
+        manifest_path = os.path.join(self.path, 'manifest.json')
+        with open(f"{manifest_path}.tmp", 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    @property
+    def battery_ids(self):
+        """Battery ids in the store, ascending"""
+        return sorted(int(battery_id) for battery_id in self.manifest['partitions'])
+
+    def partition(self, battery_id):
+        """Manifest entry (rows, cycle_min, cycle_max) of one battery, or None"""
+        return self.manifest['partitions'].get(str(battery_id))
+
+    def column(self, battery_id, name):
+        """Memory-mapped column of one battery"""
+        key = (battery_id, name)
+        if key not in self._columns:
+            if self.partition(battery_id) is None:
+                raise KeyError(f"Battery {battery_id} not in store")
+            if name not in self.manifest['columns']:
+                raise KeyError(f"Unknown column '{name}'")
+            partition_dir = os.path.join(self.path, f"battery_{battery_id}")
+            if not os.path.exists(partition_dir) and os.path.exists(f"{partition_dir}.old"):
+                # A partition swap is between its two renames; the old copy is complete
+                partition_dir = f"{partition_dir}.old"
+            self._columns[key] = np.load(os.path.join(partition_dir, f"{name}.npy"), mmap_mode='r')
+        return self._columns[key]
+
+    def cycle_slice(self, battery_id, cycle_start=None, cycle_end=None):
+        """Row range of one battery with cycle_start <= cycle <= cycle_end"""
+        cycles = self.column(battery_id, 'cycle')
+        lo = 0 if cycle_start is None else int(np.searchsorted(cycles, cycle_start, side='left'))
+        hi = len(cycles) if cycle_end is None else int(np.searchsorted(cycles, cycle_end, side='right'))
+        return slice(lo, max(lo, hi))
+
+    def history(self, battery_id, cycle_start=None, cycle_end=None, columns=None):
+        """Columns of one battery over a cycle range, as array views"""
+        rows = self.cycle_slice(battery_id, cycle_start, cycle_end)
+        names = columns or list(self.manifest['columns'])
+        return {name: self.column(battery_id, name)[rows] for name in names}
+
+    def values_at_cycle(self, name, cycle):
+        """One column's values at a cycle across the fleet: (battery_ids, values)"""
+        battery_ids, values = [], []
+        for battery_id in self.battery_ids:
+            partition = self.partition(battery_id)
+            if not partition['cycle_min'] <= cycle <= partition['cycle_max']:
+                continue
+            rows = self.cycle_slice(battery_id, cycle, cycle)
+            column = self.column(battery_id, name)[rows]
+            battery_ids.extend([battery_id] * len(column))
+            values.append(column)
+        values = np.concatenate(values) if values else np.empty(0)
+        return np.array(battery_ids, dtype=np.int64), values
+
+    def percentiles_at_cycle(self, name, cycle, percentiles=(5, 25, 50, 75, 95)):
+        """Fleet percentiles of a column at one cycle"""
+        battery_ids, values = self.values_at_cycle(name, cycle)
+        result = {'cycle': cycle, 'batteries': int(len(np.unique(battery_ids))), 'samples': int(len(values))}
+        if len(values):
+            result['percentiles'] = {f"{p:g}": float(v) for p, v in zip(percentiles, np.percentile(values, percentiles))}
+            result['mean'] = float(values.mean())
+        return result
+
+    def anomaly_counts(self, cycle_start=None, cycle_end=None):
+        """Anomalous readings per battery over a cycle range"""
+        counts = {}
+        for battery_id in self.battery_ids:
+            rows = self.cycle_slice(battery_id, cycle_start, cycle_end)
+            anomaly = self.column(battery_id, 'anomaly')[rows]
+            counts[battery_id] = {'anomalies': int(np.count_nonzero(anomaly)), 'readings': int(len(anomaly))}
+        return counts
+
+    def append(self, columns):
+        """Add rows given as {column: array} with a 'battery_id' column
+
+        Each touched partition is merged with its existing rows, sorted by
+        cycle and written to a new directory that replaces the old one. A cycle
+        already stored (or repeated in ``columns``) keeps only its newest row,
+        so ingesting the same data twice leaves the store unchanged.
+        """
+        battery_ids = np.asarray(columns['battery_id'])
+        missing = [name for name in COLUMNS if name not in columns]
+        if missing:
+            raise ValueError(f"Missing columns: {missing}")
+
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            self.manifest['columns'] = {name: np.dtype(dtype).str for name, dtype in COLUMNS.items()}
+
+            for battery_id in np.unique(battery_ids):
+                battery_id = int(battery_id)
+                mask = battery_ids == battery_id
+                new = {name: np.asarray(columns[name])[mask].astype(dtype) for name, dtype in COLUMNS.items()}
+                if self.partition(battery_id) is not None:
+                    old = self.history(battery_id)
+                    new = {name: np.concatenate([old[name], new[name]]) for name in COLUMNS}
+
+                # Stable sort keeps arrival order within a cycle; keep the last row of each
+                order = np.argsort(new['cycle'], kind='stable')
+                cycles = new['cycle'][order]
+                order = order[np.append(cycles[1:] != cycles[:-1], True)]
+                self._write_partition(battery_id, {name: values[order] for name, values in new.items()})
+
+            self._write_manifest()
+
+    def _write_partition(self, battery_id, columns):
+        partition_dir = os.path.join(self.path, f"battery_{battery_id}")
+        tmp_dir = f"{partition_dir}.tmp"
+        old_dir = f"{partition_dir}.old"
+        if not os.path.exists(partition_dir) and os.path.exists(old_dir):
+            # An earlier swap stopped between its two renames
+            os.replace(old_dir, partition_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name, values in columns.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(values))
+
+        # Drop mapped views of the old files before swapping directories
+        for key in [key for key in self._columns if key[0] == battery_id]:
+            del self._columns[key]
+        # Move the complete old partition aside rather than deleting it first, so
+        # a failure never leaves the battery without one
+        if os.path.exists(partition_dir):
+            os.replace(partition_dir, old_dir)
+        os.replace(tmp_dir, partition_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        cycles = columns['cycle']
+        self.manifest['partitions'][str(battery_id)] = {
+            'rows': int(len(cycles)),
+            'cycle_min': int(cycles[0]) if len(cycles) else None,
+            'cycle_max': int(cycles[-1]) if len(cycles) else None
+        }
+
+    def summary(self):
+        """Store location, row count and per-battery cycle ranges"""
+        partitions = self.manifest['partitions']
+        return {
+            'path': self.path,
+            'batteries': len(partitions),
+            'rows': sum(partition['rows'] for partition in partitions.values()),
+            'columns': list(self.manifest['columns']),
+            'partitions': partitions
+        }
+
+def ingest_csv(csv_path, store, chunksize=100000):
+    """Append a battery CSV (battery_id, cycle, voltage, ...) to the store in chunks"""
+    import pandas as pd
+
+    rows = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        store.append({name: chunk[name].to_numpy() for name in ['battery_id', *COLUMNS]})
+        rows += len(chunk)
+    return rows
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Ingest battery CSV data into the columnar store')
+    parser.add_argument('csv', nargs='+', help='CSV files with battery_id, cycle, voltage, ... columns')
+    parser.add_argument('--store', default=default_store_dir(), help='store directory (default: data/battery_store)')
+    parser.add_argument('--replace', action='store_true', help='delete the existing store first')
+    args = parser.parse_args()
+
+    if args.replace:
+        shutil.rmtree(args.store, ignore_errors=True)
+
+    store = BatteryStore(args.store)
+    for csv_path in args.csv:
+        rows = ingest_csv(csv_path, store)
+        print(f"✅ {os.path.basename(csv_path)}: {rows} rows")
+
+    summary = store.summary()
+    print(f"📦 {summary['path']}: {summary['batteries']} batteries, {summary['rows']} rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Batch vs Single-Reading Throughput Benchmark
+Compares N calls to /predict/battery with one /predict/batch call
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battery_api_server import BatteryMLAPI
+
+def make_readings(count, seed=0):
+    """Generate random fleet readings"""
+    rng = np.random.default_rng(seed)
+    return [{
+        'type': 'battery',
+        'voltage': float(rng.uniform(3.4, 4.1)),
+        'current': float(rng.uniform(0.5, 3.5)),
+        'temperature': float(rng.uniform(18, 40)),
+        'soc': float(rng.uniform(20, 100)),
+        'cycle_count': int(rng.integers(50, 900))
+    } for _ in range(count)]
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Benchmark /predict/batch against /predict/battery')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+    
+    api = BatteryMLAPI()
+    client = api.app.test_client()
+    
+    print(f"{'readings':>10} {'single (ms)':>12} {'batch (ms)':>12} {'speedup':>9}")
+    for size in args.sizes:
+        readings = make_readings(size)
+        
+        start = time.perf_counter()
+        for reading in readings:
+            client.post('/predict/battery', json=reading)
+        single_ms = (time.perf_counter() - start) * 1000
+        
+        start = time.perf_counter()
+        response = client.post('/predict/batch', json={'readings': readings})
+        batch_ms = (time.perf_counter() - start) * 1000
+        assert response.status_code == 200, response.get_json()
+        
+        print(f"{size:>10} {single_ms:>12.1f} {batch_ms:>12.1f} {single_ms / batch_ms:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Dashboard Chart Construction Benchmark
+CPU time to build and serialize the four live charts, per callback
+
+Compares the previous create_line_chart (a new validated go.Figure per chart)
+with the cached dict templates that only patch trace x/y.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flexi_ev_dashboard import FlexiEVDashboard
+
+def legacy_line_chart(dashboard, readings, field, title, color):
+    """create_line_chart before figure templates"""
+    colors = dashboard.colors
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=list(range(len(readings))),
+        y=[r.get(field, 0) for r in readings],
+        mode='lines+markers',
+        line=dict(color=color, width=3, shape='linear'),
+        marker=dict(color=color, size=6, line=dict(color='white', width=1)),
+        fill='tozeroy',
+        fillcolor=f'rgba({int(color[1:3], 16)}, {int(color[3:5], 16)}, {int(color[5:7], 16)}, 0.1)',
+        name=title,
+        hovertemplate=f'<b>{title}</b><br>Reading: %{{x}}<br>Value: %{{y}}<extra></extra>'
+    ))
+    fig.update_layout(
+        title=dict(text=title, font=dict(color=colors['text_primary'], size=16, family='Inter'), x=0.5),
+        paper_bgcolor=colors['bg_secondary'],
+        plot_bgcolor=colors['bg_secondary'],
+        font=dict(color=colors['text_secondary'], family='Inter'),
+        xaxis=dict(gridcolor=colors['primary_light'], zerolinecolor=colors['primary_light'],
+                   color=colors['text_muted'], title=dict(text="Reading", font=dict(size=12))),
+        yaxis=dict(gridcolor=colors['primary_light'], zerolinecolor=colors['primary_light'],
+                   color=colors['text_muted'], title=dict(text=title.split('(')[0].strip(), font=dict(size=12))),
+        margin=dict(l=50, r=30, t=50, b=40),
+        showlegend=False,
+        height=300
+    )
+    return fig
+
+def make_readings(count):
+    """Synthetic live readings"""
+    return [{
+        'reading_number': i + 1,
+        'voltage': 3.7 + (i % 50) * 0.001,
+        'current': 2.0 + (i % 7) * 0.1,
+        'temperature': 25.0 + (i % 30) * 0.1,
+        'soc': 90.0 - (i % 80) * 0.5
+    } for i in range(count)]
+
+def callback_cpu_ms(build, readings, charts, min_seconds):
+    """Mean CPU time to build and serialize all charts once"""
+    runs = 0
+    start = time.process_time()
+    while True:
+        for field, title, color in charts:
+            to_json_plotly(build(readings, field, title, color))
+        runs += 1
+        elapsed = time.process_time() - start
+        if elapsed >= min_seconds:
+            return elapsed / runs * 1000
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Benchmark dashboard chart construction')
+    parser.add_argument('--points', type=int, nargs='+', default=[10, 1000, 100000])
+    parser.add_argument('--min-seconds', type=float, default=1.0, help='CPU time spent per measurement')
+    args = parser.parse_args()
+
+    dashboard = FlexiEVDashboard()
+    dashboard.live_cache.stop()
+    colors = dashboard.colors
+    charts = [
+        ('voltage', 'Voltage (V)', colors['accent']),
+        ('current', 'Current (A)', colors['accent_light']),
+        ('temperature', 'Temperature (°C)', colors['accent_dark']),
+        ('soc', 'State of Charge (%)', colors['accent'])
+    ]
+
+    def legacy(readings, field, title, color):
+        return legacy_line_chart(dashboard, readings, field, title, color)
+
+    print(f"{'points':>8} {'go.Figure (ms)':>15} {'template (ms)':>14} {'speedup':>9}")
+    for points in args.points:
+        readings = make_readings(points)
+        before = callback_cpu_ms(legacy, readings, charts, args.min_seconds)
+        after = callback_cpu_ms(dashboard.create_line_chart, readings, charts, args.min_seconds)
+        print(f"{points:>8} {before:>15.2f} {after:>14.2f} {before / after:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
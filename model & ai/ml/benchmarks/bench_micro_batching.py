@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Micro-Batching Latency/Throughput Benchmark
+Fires concurrent /predict/rul requests with and without micro-batching
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battery_api_server import BatteryMLAPI
+
+def run_load(api, threads, requests_per_thread, route='/predict/rul'):
+    """Return per-request latencies (ms) and total wall time (s)"""
+    latencies = []
+    lock = threading.Lock()
+    
+    def worker(seed):
+        client = api.app.test_client()
+        rng = np.random.default_rng(seed)
+        local = []
+        for _ in range(requests_per_thread):
+            reading = {
+                'voltage': float(rng.uniform(3.4, 4.1)),
+                'temperature': float(rng.uniform(18, 40)),
+                'soc': float(rng.uniform(20, 100)),
+                'soh': float(rng.uniform(70, 100))
+            }
+            start = time.perf_counter()
+            client.post(route, json=reading)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+    
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return np.array(latencies), time.perf_counter() - start
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Benchmark micro-batching on /predict/rul')
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=50, help='requests per thread')
+    parser.add_argument('--windows', type=float, nargs='+', default=[1.0, 3.0, 5.0])
+    parser.add_argument('--batch-max-size', type=int, default=64)
+    args = parser.parse_args()
+    
+    configs = [('direct', BatteryMLAPI(micro_batching=False))]
+    for window in args.windows:
+        configs.append((f"batched {window}ms", BatteryMLAPI(
+            micro_batching=True, batch_window_ms=window, batch_max_size=args.batch_max_size)))
+    
+    print(f"{'mode':>16} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, api in configs:
+        latencies, elapsed = run_load(api, args.threads, args.requests)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"{name:>16} {len(latencies) / elapsed:>9.0f} {p50:>8.2f} {p95:>8.2f} {p99:>8.2f}")
+
+if __name__ == "__main__":
+    main()
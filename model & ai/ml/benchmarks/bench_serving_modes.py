@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Flask vs ASGI vs Pre-fork Serving Benchmark
+Concurrent prediction load against each server mode, with /health probed alongside
+
+Each mode runs battery_api_server.py in a subprocess. Reports successful
+prediction throughput and latency, requests turned away (ASGI answers 503 once
+its inference queue is full), and /health latency while the inference load
+runs (with ASGI it is answered on the event loop instead of behind model calls).
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+import numpy as np
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(mode, port, workers=None, timeout=120):
+    """Start battery_api_server.py in ``mode`` and wait until /health answers"""
+    command = [sys.executable, os.path.join(ML_DIR, 'battery_api_server.py'), '--server', mode, '--port', str(port)]
+    if workers:
+        command += ['--workers', str(workers)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{mode} server did not start on port {port}")
+
+def request(connection, method, path, body=None):
+    """One request on a keep-alive connection; returns the status code"""
+    headers = {'Content-Type': 'application/json'} if body is not None else {}
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    return response.status
+
+def run_load(port, route, threads, duration):
+    """Successful prediction latencies, status counts and /health latencies over ``duration`` seconds"""
+    latencies, health_latencies, statuses = [], [], {}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def client(seed):
+        rng = np.random.default_rng(seed)
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local, local_statuses = [], {}
+        while not stop.is_set():
+            body = json.dumps({
+                'voltage': float(rng.uniform(3.4, 4.1)),
+                'current': float(rng.uniform(-10, 10)),
+                'temperature': float(rng.uniform(18, 40)),
+                'soc': float(rng.uniform(20, 100)),
+                'cycle_count': int(rng.integers(0, 1500))
+            })
+            start = time.perf_counter()
+            try:
+                status = request(connection, 'POST', route, body)
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                status = 'error'
+            if status == 200:
+                local.append((time.perf_counter() - start) * 1000)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    def health_probe():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                request(connection, 'GET', '/health')
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            health_latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.02)
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    workers.append(threading.Thread(target=health_probe))
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in workers:
+        t.join()
+    return np.array(latencies), statuses, np.array(health_latencies), time.perf_counter() - start
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Compare the API server modes under load')
+    parser.add_argument('--modes', nargs='+', default=['flask', 'asgi', 'prefork'], choices=['flask', 'asgi', 'prefork'])
+    parser.add_argument('--workers', type=int, default=None, help='worker processes for prefork (default: CPU count)')
+    parser.add_argument('--route', default='/predict/battery')
+    parser.add_argument('--threads', type=int, nargs='+', default=[8, 64])
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per measurement')
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'clients':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'health p50':>11} {'health p99':>11} {'rejected':>9}")
+    for mode in args.modes:
+        port = free_port()
+        server = start_server(mode, port, args.workers)
+        try:
+            for threads in args.threads:
+                latencies, statuses, health, elapsed = run_load(port, args.route, threads, args.duration)
+                failed = sum(count for status, count in statuses.items() if status != 200)
+                print(f"{mode:>8} {threads:>8} {len(latencies) / elapsed:>9.0f} "
+                      f"{np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 99):>8.1f} "
+                      f"{np.percentile(health, 50):>11.1f} {np.percentile(health, 99):>11.1f} {failed:>9}")
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Inference Benchmark Suite
+Cold start, per-route latency percentiles, throughput under concurrency and
+peak RSS for the ML API and quick_predict, written as JSON
+
+Targets (each measured in a fresh process):
+    api       BatteryMLAPI in-process through the Flask test client
+    socket    battery_api_server.py over a local TCP socket
+    quick     quick_predict.predict_battery
+
+Usage:
+    python benchmarks/bench_suite.py --output results.json
+    python benchmarks/bench_suite.py --save-baseline               # writes benchmarks/baseline.json
+    python benchmarks/bench_suite.py --baseline benchmarks/baseline.json --fail-on-regression
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import resource
+import threading
+import subprocess
+import http.client
+from datetime import datetime
+
+import numpy as np
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_DIR)
+
+TARGETS = ['api', 'socket', 'quick']
+ROUTES = ['/health', '/predict/soh', '/predict/rul', '/predict/battery', '/predict/batch']
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Lower is better for these metrics, higher for throughput
+LATENCY_KEYS = ['p50_ms', 'p95_ms', 'p99_ms']
+
+def make_reading(rng):
+    """One random battery reading"""
+    return {
+        'voltage': float(rng.uniform(3.4, 4.1)),
+        'current': float(rng.uniform(0.5, 3.5)),
+        'temperature': float(rng.uniform(18, 40)),
+        'soc': float(rng.uniform(20, 100)),
+        'soh': float(rng.uniform(70, 100)),
+        'cycle_count': int(rng.integers(50, 900))
+    }
+
+def request_body(route, rng, batch_size):
+    """JSON body for a route (None for GET)"""
+    if route == '/health':
+        return None
+    if route == '/predict/batch':
+        return {'readings': [make_reading(rng) for _ in range(batch_size)]}
+    return make_reading(rng)
+
+def percentiles(latencies):
+    """p50/p95/p99/mean of a list of latencies in ms"""
+    latencies = np.asarray(latencies)
+    if len(latencies) == 0:
+        return {'n': 0}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'n': int(len(latencies)),
+        'mean_ms': round(float(latencies.mean()), 3),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3)
+    }
+
+def measure_latency(call, route, requests, batch_size, seed=0):
+    """Sequential latency of one route"""
+    rng = np.random.default_rng(seed)
+    latencies, errors = [], 0
+    for _ in range(requests):
+        body = request_body(route, rng, batch_size)
+        start = time.perf_counter()
+        ok = call(route, body)
+        latencies.append((time.perf_counter() - start) * 1000)
+        errors += not ok
+    return dict(percentiles(latencies), errors=errors)
+
+def measure_throughput(make_call, route, concurrency, duration, batch_size):
+    """Requests/s and latency with ``concurrency`` threads calling a route for ``duration`` seconds"""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def worker(seed):
+        call = make_call()
+        rng = np.random.default_rng(seed)
+        local, local_errors = [], 0
+        while not stop.is_set():
+            body = request_body(route, rng, batch_size)
+            start = time.perf_counter()
+            ok = call(route, body)
+            local.append((time.perf_counter() - start) * 1000)
+            local_errors += not ok
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return dict(percentiles(latencies), errors=errors[0], rps=round(len(latencies) / elapsed, 1))
+
+def peak_rss_mb(pid=None):
+    """Peak resident memory of this process, or of ``pid`` via /proc (Linux)"""
+    if pid is None:
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def client_call(client):
+    """Route caller for the Flask test client"""
+    def call(route, body):
+        response = client.get(route) if body is None else client.post(route, json=body)
+        return response.status_code == 200
+    return call
+
+def socket_call(port):
+    """Route caller over one keep-alive HTTP connection"""
+    connection = [http.client.HTTPConnection('127.0.0.1', port, timeout=30)]
+
+    def call(route, body):
+        try:
+            if body is None:
+                connection[0].request('GET', route)
+            else:
+                connection[0].request('POST', route, body=json.dumps(body),
+                                      headers={'Content-Type': 'application/json'})
+            response = connection[0].getresponse()
+            response.read()
+            return response.status == 200
+        except (OSError, http.client.HTTPException):
+            connection[0].close()
+            connection[0] = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            return False
+    return call
+
+def quick_call():
+    """Caller for quick_predict.predict_battery (route name is ignored)"""
+    import quick_predict
+
+    def call(route, body):
+        return quick_predict.predict_battery(body['voltage'], body['current'],
+                                             body['temperature'], body['soc'])['success']
+    return call
+
+def run_target(target, args):
+    """Measure one target in this process and return its result dict"""
+    rng = np.random.default_rng(1234)
+    result = {'target': target}
+    server = None
+
+    start = time.perf_counter()
+    if target == 'api':
+        from battery_api_server import BatteryMLAPI
+        api = BatteryMLAPI()
+        make_call = lambda: client_call(api.app.test_client())
+        routes = args.routes
+    elif target == 'socket':
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ML_DIR, 'battery_api_server.py'), '--port', str(port)] +
+            (['--server', args.server] if args.server else []),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        health = socket_call(port)
+        deadline = time.time() + 120
+        while not health('/health', None):
+            if time.time() > deadline or server.poll() is not None:
+                server.kill()
+                raise RuntimeError('API server did not start')
+            time.sleep(0.05)
+        make_call = lambda: socket_call(port)
+        routes = args.routes
+    else:
+        make_call = quick_call
+        routes = ['predict_battery']
+
+    # Cold start: imports, model loading and the first answered prediction
+    first_route = routes[1] if len(routes) > 1 else routes[0]
+    result['first_request_ok'] = bool(make_call()(first_route, request_body(first_route, rng, args.batch_size)))
+    result['cold_start_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+    try:
+        result['routes'] = {}
+        for route in routes:
+            call = make_call()
+            for _ in range(args.warmup):
+                call(route, request_body(route, rng, args.batch_size))
+            result['routes'][route] = measure_latency(call, route, args.requests, args.batch_size)
+
+        result['throughput'] = {}
+        for route in args.throughput_routes if target != 'quick' else routes:
+            result['throughput'][route] = {
+                str(concurrency): measure_throughput(make_call, route, concurrency, args.duration, args.batch_size)
+                for concurrency in args.concurrency
+            }
+        result['peak_rss_mb'] = peak_rss_mb(server.pid if server else None)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+    return result
+
+def metadata():
+    """Environment of a run, so results from different machines are not mixed up"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ML_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'models_dir': os.environ.get('BATTERY_MODELS_DIR', os.path.join(ML_DIR, 'models'))
+    }
+
+def compare(results, baseline, tolerance):
+    """Metrics that got worse than the baseline by more than ``tolerance`` (a fraction)"""
+    regressions = []
+
+    def check(name, current, previous, higher_is_better=False):
+        if current is None or not previous:
+            return
+        change = (current - previous) / previous
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append({'metric': name, 'baseline': previous, 'current': current,
+                                'change_pct': round(change * 100, 1)})
+
+    for target, result in results['results'].items():
+        before = baseline.get('results', {}).get(target)
+        if not before:
+            continue
+        check(f"{target}.cold_start_ms", result.get('cold_start_ms'), before.get('cold_start_ms'))
+        check(f"{target}.peak_rss_mb", result.get('peak_rss_mb'), before.get('peak_rss_mb'))
+        for route, stats in result.get('routes', {}).items():
+            for key in LATENCY_KEYS:
+                check(f"{target}.{route}.{key}", stats.get(key), before.get('routes', {}).get(route, {}).get(key))
+        for route, levels in result.get('throughput', {}).items():
+            for concurrency, stats in levels.items():
+                previous = before.get('throughput', {}).get(route, {}).get(concurrency, {})
+                check(f"{target}.{route}.c{concurrency}.rps", stats.get('rps'), previous.get('rps'), higher_is_better=True)
+    return regressions
+
+def print_summary(results):
+    print(f"{'target':>7} {'route':>18} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  throughput req/s by concurrency")
+    for target, result in results['results'].items():
+        if 'error' in result:
+            print(f"{target:>7} failed: {result['error']}")
+            continue
+        print(f"{target:>7} {'cold start':>18} {result['cold_start_ms']:>8.0f} ms, peak RSS {result['peak_rss_mb']} MB")
+        for route, stats in result['routes'].items():
+            levels = result['throughput'].get(route, {})
+            throughput = '  '.join(f"c{c}={s['rps']:.0f}" for c, s in levels.items())
+            print(f"{target:>7} {route:>18} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}  {throughput}")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Benchmark the battery ML API and quick_predict')
+    parser.add_argument('--targets', nargs='+', default=TARGETS, choices=TARGETS)
+    parser.add_argument('--routes', nargs='+', default=ROUTES)
+    parser.add_argument('--throughput-routes', nargs='+', default=['/predict/battery'])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=200, help='sequential requests per route')
+    parser.add_argument('--warmup', type=int, default=20, help='untimed requests per route first')
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds per throughput level')
+    parser.add_argument('--batch-size', type=int, default=100, help='readings per /predict/batch request')
+    parser.add_argument('--server', choices=['flask', 'asgi', 'prefork'], help='server mode for the socket target')
+    parser.add_argument('--prediction-cache', action='store_true',
+                        help='keep the prediction cache on (off by default so every request runs the models)')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='compare against this results JSON')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, help='write results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before flagging (default 20%%)')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 on regressions')
+    parser.add_argument('--child', choices=TARGETS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_target(args.child, args)))
+        return
+
+    # Each target runs in a fresh process so cold start and peak RSS are its own
+    child_args = [arg for arg in sys.argv[1:] if arg != '--fail-on-regression']
+    env = dict(os.environ) if args.prediction_cache else dict(os.environ, BATTERY_CACHE_SIZE='0')
+    results = {'meta': metadata(), 'config': {key: value for key, value in vars(args).items()
+                                               if key not in ('child', 'output', 'baseline', 'save_baseline')},
+               'results': {}}
+    for target in args.targets:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), *child_args, '--child', target],
+                                capture_output=True, text=True, env=env)
+        try:
+            results['results'][target] = json.loads(output.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            results['results'][target] = {'error': (output.stderr.strip().splitlines() or ['no output'])[-1]}
+
+    print_summary(results)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        results['baseline'] = {'path': args.baseline, 'meta': baseline.get('meta'),
+                               'regressions': compare(results, baseline, args.tolerance)}
+        regressions = results['baseline']['regressions']
+        print(f"\n{len(regressions)} regressions beyond {args.tolerance:.0%} vs {args.baseline}")
+        for regression in regressions:
+            print(f"  ❌ {regression['metric']}: {regression['baseline']} -> {regression['current']} "
+                  f"({regression['change_pct']:+.1f}%)")
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"📄 Results written to {path}")
+
+    if args.fail_on_regression and results.get('baseline', {}).get('regressions'):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
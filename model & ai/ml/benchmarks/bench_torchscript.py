@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Eager vs TorchScript RUL Inference Benchmark
+Reports CPU latency and peak RSS for each model variant
+
+Run export_torchscript.py (optionally with --quantize) first.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_DIR)
+
+VARIANTS = ['off', 'auto', 'int8']
+LABELS = {'off': 'eager', 'auto': 'torchscript', 'int8': 'torchscript-int8'}
+
+def measure(checkpoint, variant, batch_sizes, iterations):
+    """Load one variant in this process and time its forward pass"""
+    import torch
+    from rul_network import load_rul_model
+    from export_torchscript import input_size
+    
+    model = load_rul_model(checkpoint, torchscript=variant)
+    model.eval()
+    
+    # Scripted models no longer expose their submodules' attributes reliably
+    eager = load_rul_model(checkpoint, torchscript='off')
+    n_features = input_size(eager)
+    del eager
+    
+    latencies = {}
+    with torch.no_grad():
+        for batch in batch_sizes:
+            features = torch.rand(batch, n_features)
+            for _ in range(10):
+                model(features)
+            start = time.perf_counter()
+            for _ in range(iterations):
+                model(features)
+            latencies[str(batch)] = (time.perf_counter() - start) / iterations * 1000
+    
+    return {
+        'model_type': type(model).__name__,
+        'latency_ms': latencies,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Benchmark eager vs TorchScript RUL inference')
+    parser.add_argument('--checkpoint', default=os.path.join(
+        os.environ.get('BATTERY_MODELS_DIR', os.path.join(ML_DIR, 'models')), 'rul_gru.pth'))
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64])
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=1, help='torch intra-op threads')
+    parser.add_argument('--child', choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        import torch
+        torch.set_num_threads(args.threads)
+        result = measure(args.checkpoint, args.child, args.batch_sizes, args.iterations)
+        print(json.dumps(result))
+        return
+    
+    # Each variant runs in a fresh process so RSS numbers do not mix
+    print(f"{'variant':>18} {'type':>22} " + ' '.join(f"{'b=' + str(b) + ' ms':>10}" for b in args.batch_sizes) + f" {'peak RSS MB':>12}")
+    for variant in VARIANTS:
+        command = [sys.executable, os.path.abspath(__file__), '--child', variant,
+                   '--checkpoint', args.checkpoint, '--iterations', str(args.iterations),
+                   '--threads', str(args.threads), '--batch-sizes'] + [str(b) for b in args.batch_sizes]
+        output = subprocess.run(command, capture_output=True, text=True)
+        if output.returncode != 0:
+            print(f"{LABELS[variant]:>18} failed: {output.stderr.strip().splitlines()[-1:]}")
+            continue
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        latencies = ' '.join(f"{result['latency_ms'][str(b)]:>10.3f}" for b in args.batch_sizes)
+        print(f"{LABELS[variant]:>18} {result['model_type']:>22} {latencies} {result['peak_rss_mb']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
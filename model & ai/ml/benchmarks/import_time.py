@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Import-time Report
+Per-module import cost of each entry point (``python -X importtime``, summarized)
+
+Each entry point runs in fresh processes; the median over ``--repeat`` runs is
+reported as the total, the cost per top-level package, and the slowest modules.
+Modules an entry point must not import at all (e.g. torch before the first
+RUL prediction) are checked on every run, and totals can be compared against
+a saved baseline as a startup-time regression guard.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --save-baseline             # writes benchmarks/import_baseline.json
+    python benchmarks/import_time.py --baseline benchmarks/import_baseline.json --fail-on-regression
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'import_baseline.json')
+
+# name -> interpreter arguments
+ENTRY_POINTS = {
+    'quick_predict': ['-c', 'import quick_predict'],
+    'quick_predict_oneshot': ['quick_predict.py', '{}'],
+    'battery_api_server': ['-c', 'import battery_api_server']
+}
+
+# Heavy packages an entry point must not pull in while importing
+FORBIDDEN = {
+    'quick_predict': ['numpy', 'torch', 'joblib', 'sklearn', 'pandas'],
+    'battery_api_server': ['torch', 'sklearn', 'pandas']
+}
+
+def parse_importtime(stderr):
+    """Modules in import order as (name, self ms, cumulative ms, depth)"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, depth))
+    return modules
+
+def measure(args):
+    """Import timings of one fresh interpreter run"""
+    output = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=ML_DIR,
+                            capture_output=True, text=True)
+    return parse_importtime(output.stderr)
+
+def summarize(runs, top):
+    """Median total, per-package and slowest-module cost over several runs"""
+    totals, packages, cumulative = [], {}, {}
+    for modules in runs:
+        totals.append(sum(ms for _, _, ms, depth in modules if depth == 0))
+        run_packages = {}
+        for name, self_ms, cumulative_ms, _ in modules:
+            package = name.split('.')[0]
+            run_packages[package] = run_packages.get(package, 0) + self_ms
+            cumulative.setdefault(name, []).append(cumulative_ms)
+        for package, ms in run_packages.items():
+            packages.setdefault(package, []).append(ms)
+
+    packages = {package: round(statistics.median(values), 2) for package, values in packages.items()}
+    slowest = sorted(((name, statistics.median(values)) for name, values in cumulative.items()),
+                     key=lambda item: -item[1])[:top]
+    return {
+        'total_ms': round(statistics.median(totals), 2),
+        'modules': len(runs[-1]),
+        'packages': dict(sorted(packages.items(), key=lambda item: -item[1])),
+        'slowest': {name: round(ms, 2) for name, ms in slowest},
+        'imported': sorted({name.split('.')[0] for name, _, _, _ in runs[-1]})
+    }
+
+def compare(results, baseline, tolerance, min_ms):
+    """Totals and packages slower than the baseline by more than ``tolerance`` and ``min_ms``"""
+    regressions = []
+
+    def check(name, current, previous):
+        if current is None or not previous or current - previous < min_ms:
+            return
+        change = (current - previous) / previous
+        if change > tolerance:
+            regressions.append({'metric': name, 'baseline': previous, 'current': current,
+                                'change_pct': round(change * 100, 1)})
+
+    for entry, result in results['results'].items():
+        before = baseline.get('results', {}).get(entry)
+        if not before:
+            continue
+        check(f"{entry}.total_ms", result['total_ms'], before.get('total_ms'))
+        for package, ms in result['packages'].items():
+            check(f"{entry}.{package}", ms, before.get('packages', {}).get(package, 0))
+    return regressions
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Summarize the import time of the ML entry points')
+    parser.add_argument('--entries', nargs='+', default=list(ENTRY_POINTS), choices=list(ENTRY_POINTS))
+    parser.add_argument('--repeat', type=int, default=3, help='fresh runs per entry point (median is kept)')
+    parser.add_argument('--top', type=int, default=10, help='slowest modules to list')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='compare against this results JSON')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, help='write results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown before flagging (default 25%%)')
+    parser.add_argument('--min-ms', type=float, default=5.0, help='ignore slowdowns smaller than this')
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help='exit with status 1 on regressions or forbidden imports')
+    args = parser.parse_args()
+
+    results = {'meta': {'timestamp': datetime.now().isoformat(), 'python': sys.version.split()[0]}, 'results': {}}
+    failures = []
+    for entry in args.entries:
+        summary = summarize([measure(ENTRY_POINTS[entry]) for _ in range(args.repeat)], args.top)
+        results['results'][entry] = summary
+
+        print(f"\n{entry}: {summary['total_ms']:.0f} ms, {summary['modules']} modules")
+        for package, ms in list(summary['packages'].items())[:args.top]:
+            print(f"  {ms:>9.1f} ms  {package}")
+        print("  slowest (cumulative):")
+        for name, ms in summary['slowest'].items():
+            print(f"  {ms:>9.1f} ms  {name}")
+
+        forbidden = sorted(set(FORBIDDEN.get(entry, [])) & set(summary['imported']))
+        for package in forbidden:
+            failures.append(f"{entry} imports {package}")
+            print(f"  ❌ imports {package} at startup")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_ms)
+        results['baseline'] = {'path': args.baseline, 'meta': baseline.get('meta'), 'regressions': regressions}
+        print(f"\n{len(regressions)} regressions beyond {args.tolerance:.0%} vs {args.baseline}")
+        for regression in regressions:
+            failures.append(regression['metric'])
+            print(f"  ❌ {regression['metric']}: {regression['baseline']} -> {regression['current']} ms "
+                  f"({regression['change_pct']:+.1f}%)")
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {path}")
+
+    if args.fail_on_regression and failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Compiled Random Forest for SOH Prediction
+Flattens a fitted sklearn forest into NumPy arrays for fast predict()
+
+Usage:
+    python compiled_forest.py models/soh_rf_model.pkl   # writes models/soh_rf_model.forest.npz
+"""
+
+import os
+import sys
+import json
+import argparse
+import logging
+
+import numpy as np
+
+from model_sources import source_info, export_is_stale
+
+logger = logging.getLogger(__name__)
+
+class CompiledForest:
+    """Random forest regressor evaluated with vectorized NumPy traversal
+
+    All trees are concatenated into flat node arrays. Leaves point to
+    themselves, so every (row, tree) pair can take ``max_depth`` steps
+    together with no per-row branching. Inputs are rounded to float32 before
+    comparison, like sklearn does, so predictions match
+    ``RandomForestRegressor.predict``.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, max_depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features)
+
+        # Traversal tables indexed by 2 * node + branch: per-node fields are
+        # repeated twice, children are stored as 2 * child id
+        self._feature2 = np.repeat(feature.astype(np.int64), 2)
+        self._threshold2 = np.repeat(threshold, 2)
+        self._missing_left2 = np.repeat(missing_left, 2)
+        self._children2 = 2 * np.column_stack([left, right]).astype(np.int64).ravel()
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Compile a fitted RandomForestRegressor / ExtraTreesRegressor"""
+        if hasattr(forest, 'classes_') or not hasattr(forest, 'estimators_'):
+            raise ValueError(f"Only averaged regression forests can be compiled, got {type(forest).__name__}")
+
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            if tree.n_outputs != 1:
+                raise ValueError("Multi-output forests are not supported")
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes, dtype=np.int64)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back to themselves
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            missing.append(getattr(tree, 'missing_go_to_left', np.zeros(n_nodes, dtype=np.uint8)).astype(bool))
+            values.append(tree.value[:, 0, 0])
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            missing_left=np.concatenate(missing),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.array(roots, dtype=np.int32),
+            max_depth=max_depth,
+            n_features=forest.n_features_in_
+        )
+
+    def predict(self, X):
+        """Predict one value per row, identical to the source forest's predict()"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the forest expects {self.n_features_in_}")
+        X = X.astype(np.float64)
+
+        # One flat slot per (row, tree) pair. A slot holds 2 * node id, so
+        # adding the branch bit (0 left, 1 right) indexes the children array
+        n_rows, n_trees = X.shape[0], len(self.roots)
+        slots = np.tile(2 * self.roots.astype(np.int64), n_rows)
+        x_flat = X.ravel()
+        if n_rows > 1:
+            row_offsets = np.repeat(np.arange(n_rows, dtype=np.int64) * self.n_features_in_, n_trees)
+        has_nan = np.isnan(x_flat).any()
+
+        for depth in range(self.max_depth):
+            feature_index = self._feature2.take(slots)
+            if n_rows > 1:
+                feature_index += row_offsets
+            x = x_flat.take(feature_index)
+            threshold = self._threshold2.take(slots)
+            if has_nan:
+                go_right = ~((x <= threshold) | (np.isnan(x) & self._missing_left2.take(slots)))
+            else:
+                go_right = x > threshold
+            next_slots = self._children2.take(slots + go_right)
+
+            # Every slot sitting on a leaf means the walk is done
+            if depth % 4 == 3 and np.array_equal(next_slots, slots):
+                break
+            slots = next_slots
+
+        nodes = slots // 2
+
+        # Sum trees in order (like sklearn) before averaging
+        leaf_values = self.value.take(nodes).reshape(n_rows, n_trees)
+        return np.cumsum(leaf_values, axis=1)[:, -1] / n_trees
+
+    def to_arrays(self):
+        """Flat arrays describing the forest"""
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self.left,
+            'right': self.right,
+            'missing_left': self.missing_left,
+            'value': self.value,
+            'roots': self.roots,
+            'max_depth': np.array(self.max_depth),
+            'n_features': np.array(self.n_features_in_)
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a forest from to_arrays() output"""
+        return cls(**{name: arrays[name] for name in (
+            'feature', 'threshold', 'left', 'right', 'missing_left', 'value', 'roots', 'max_depth', 'n_features')})
+
+    def save(self, path, source=None):
+        """Write the forest arrays to an .npz file, with the ``source_info`` of the pickle if given"""
+        arrays = self.to_arrays()
+        if source is not None:
+            arrays['source'] = np.array(json.dumps(source))
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Read a forest written by save()"""
+        with np.load(path) as arrays:
+            return cls.from_arrays(arrays)
+
+def compiled_forest_path(path):
+    """Path of the compiled forest written next to a .pkl model"""
+    return os.path.splitext(path)[0] + '.forest.npz'
+
+def compiled_source(path):
+    """``source_info`` of the pickle a compiled forest was built from, or None for older files"""
+    with np.load(path) as arrays:
+        return json.loads(str(arrays['source'])) if 'source' in arrays else None
+
+def load_soh_model(path, compiled=None):
+    """Load the SOH model, preferring the compiled NumPy forest
+
+    ``compiled`` (default: $BATTERY_COMPILED_FOREST or '1') set to '0' keeps
+    the sklearn model. Otherwise a ``.forest.npz`` next to the pickle is used
+    when present and built from the current pickle, or the pickle is compiled
+    after loading.
+    """
+    if compiled is None:
+        compiled = os.environ.get('BATTERY_COMPILED_FOREST', '1')
+
+    compiled_path = compiled_forest_path(path)
+    if compiled != '0' and os.path.exists(compiled_path):
+        if not export_is_stale(compiled_path, path, compiled_source(compiled_path)):
+            return CompiledForest.load(compiled_path)
+        logger.warning(f"⚠️ {os.path.basename(compiled_path)} is older than {os.path.basename(path)}, "
+                       f"recompiling (re-run compiled_forest.py to update it)")
+
+    import joblib
+    model = joblib.load(path)
+    if compiled == '0':
+        return model
+
+    try:
+        return CompiledForest.from_sklearn(model)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not compile {os.path.basename(path)}, using sklearn predict: {e}")
+        return model
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Compile a sklearn random forest to NumPy arrays')
+    parser.add_argument('model', help='path to the pickled forest (e.g. models/soh_rf_model.pkl)')
+    parser.add_argument('--output', help='output .npz path (default: <model>.forest.npz)')
+    args = parser.parse_args()
+
+    import joblib
+    forest = joblib.load(args.model)
+    compiled = CompiledForest.from_sklearn(forest)
+
+    # Check the compiled forest against sklearn before writing it
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(1000, compiled.n_features_in_)) * 50
+    if not np.array_equal(compiled.predict(X), forest.predict(X)):
+        print("❌ Compiled predictions differ from sklearn, not saved")
+        sys.exit(1)
+
+    output = args.output or compiled_forest_path(args.model)
+    compiled.save(output, source=source_info(args.model))
+    print(f"✅ Compiled {len(compiled.roots)} trees ({len(compiled.value)} nodes) to {output}")
+
+if __name__ == "__main__":
+    main()
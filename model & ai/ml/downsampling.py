@@ -0,0 +1,173 @@
+"""
+Chart Series Downsampling
+Reduces long reading histories to a pixel-appropriate number of points
+
+- lttb(): Largest-Triangle-Three-Buckets, keeps the visual shape of a series
+- MinMaxPyramid: min and max of every bucket (keeps spikes), each level 2x
+  coarser than the one below
+- MultiResolutionHistory: raw series plus pyramids, so any time window is
+  served from the finest level that fits the point budget without touching
+  every raw reading
+"""
+
+import numpy as np
+
+# Each pyramid level aggregates this many buckets of the level below
+LEVEL_FACTOR = 2
+
+# Ranges up to this many times the point budget are reduced with LTTB on raw
+# points, longer ones are served from the min/max pyramid
+LTTB_MAX_RATIO = 8
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: pick ``n_out`` points of (x, y)"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+
+    # Boundaries of the n_out - 2 middle buckets; first and last points are kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Triangle area between the last selected point, each candidate and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+
+    return x[selected], y[selected]
+
+def _ordered_pairs(x_min, y_min, x_max, y_max):
+    """Interleave each bucket's min and max points in x order"""
+    min_first = x_min <= x_max
+    x = np.column_stack([np.where(min_first, x_min, x_max), np.where(min_first, x_max, x_min)]).ravel()
+    y = np.column_stack([np.where(min_first, y_min, y_max), np.where(min_first, y_max, y_min)]).ravel()
+    return x, y
+
+class MinMaxPyramid:
+    """Min/max aggregates of one series at 2x, 4x, 8x, ... coarser resolutions
+
+    Buckets are numbered by absolute reading index (``base`` is the index of
+    ``x[0]``), so ``update`` can append readings and drop old ones by
+    recomputing only the last bucket of each level and cutting whole buckets.
+    """
+
+    def __init__(self, x, y, min_buckets=64, base=0):
+        self.min_buckets = min_buckets
+        self.levels = []  # [bucket size, first bucket index, x_min, y_min, x_max, y_max]
+        self.update(x, y, base, base)
+
+    @staticmethod
+    def _coarsen(first, x_min, y_min, x_max, y_max):
+        """Merge every LEVEL_FACTOR buckets into one; ``first`` is the index of the first bucket given"""
+        front = first % LEVEL_FACTOR
+        back = -(front + len(y_min)) % LEVEL_FACTOR
+        if front or back:
+            x_min = np.concatenate([np.repeat(x_min[:1], front), x_min, np.repeat(x_min[-1:], back)])
+            x_max = np.concatenate([np.repeat(x_max[:1], front), x_max, np.repeat(x_max[-1:], back)])
+            y_min = np.concatenate([np.full(front, np.inf), y_min, np.full(back, np.inf)])
+            y_max = np.concatenate([np.full(front, -np.inf), y_max, np.full(back, -np.inf)])
+
+        rows = np.arange(len(y_min) // LEVEL_FACTOR)
+        i_min = y_min.reshape(-1, LEVEL_FACTOR).argmin(axis=1)
+        i_max = y_max.reshape(-1, LEVEL_FACTOR).argmax(axis=1)
+        return (first // LEVEL_FACTOR,
+                x_min.reshape(-1, LEVEL_FACTOR)[rows, i_min], y_min.reshape(-1, LEVEL_FACTOR)[rows, i_min],
+                x_max.reshape(-1, LEVEL_FACTOR)[rows, i_max], y_max.reshape(-1, LEVEL_FACTOR)[rows, i_max])
+
+    def update(self, x, y, base, old_end):
+        """Follow the series ``x``/``y`` now starting at reading ``base``; readings before ``old_end`` are unchanged"""
+        lower = (1, base, x, y, x, y)
+        depth = 0
+        while len(lower[3]) > self.min_buckets or depth < len(self.levels):
+            size, lower_first, lower_arrays = lower[0] * LEVEL_FACTOR, lower[1], lower[2:]
+            # Recompute from the bucket holding the first new reading
+            start = max((old_end // size) * LEVEL_FACTOR, lower_first)
+            first, *arrays = self._coarsen(start, *(values[start - lower_first:] for values in lower_arrays))
+
+            if depth < len(self.levels):
+                _, level_first, *level_arrays = self.levels[depth]
+                keep_from = max(0, base // size - level_first)
+                keep_to = max(keep_from, first - level_first)
+                if keep_to > keep_from:
+                    arrays = [np.concatenate([kept[keep_from:keep_to], new]) for kept, new in zip(level_arrays, arrays)]
+                    first = level_first + keep_from
+                self.levels[depth] = [size, first, *arrays]
+            else:
+                self.levels.append([size, first, *arrays])
+            lower = self.levels[depth]
+            depth += 1
+
+    def query(self, lo, hi, n_buckets):
+        """Min/max points for reading range [lo, hi) from the finest level with <= n_buckets buckets"""
+        for size, level_first, x_min, y_min, x_max, y_max in self.levels:
+            first, last = lo // size, -(-hi // size)
+            if last - first <= n_buckets or size == self.levels[-1][0]:
+                first, last = max(0, first - level_first), max(0, last - level_first)
+                return _ordered_pairs(x_min[first:last], y_min[first:last], x_max[first:last], y_max[first:last])
+        return None
+
+class MultiResolutionHistory:
+    """Reading history with per-field pyramids, queried by time window
+
+    ``timestamps`` (epoch seconds, ascending) select the window, ``x`` is the
+    plotted coordinate (reading number) and ``columns`` maps field names to
+    value arrays of the same length.
+    """
+
+    def __init__(self, timestamps, x, columns):
+        # Own copies, so the source (e.g. a mapped telemetry log) can be released
+        self.timestamps = np.array(timestamps, dtype=np.float64)
+        self.x = np.array(x, dtype=np.float64)
+        self.columns = {name: np.array(values, dtype=np.float64) for name, values in columns.items()}
+        self.pyramids = {}  # built on first use of a long range
+        self.start = 0  # readings dropped from the front; pyramids index readings from the first one added
+
+    def __len__(self):
+        return len(self.x)
+
+    def extend(self, timestamps, x, columns, max_length=None):
+        """Append newer readings, drop the oldest beyond ``max_length`` and update built pyramids in place"""
+        old_end = self.start + len(self.x)
+        self.timestamps = np.concatenate([self.timestamps, np.asarray(timestamps, dtype=np.float64)])
+        self.x = np.concatenate([self.x, np.asarray(x, dtype=np.float64)])
+        self.columns = {name: np.concatenate([values, np.asarray(columns[name], dtype=np.float64)])
+                        for name, values in self.columns.items()}
+
+        drop = len(self.x) - max_length if max_length is not None else 0
+        if drop > 0:
+            self.timestamps = self.timestamps[drop:]
+            self.x = self.x[drop:]
+            self.columns = {name: values[drop:] for name, values in self.columns.items()}
+            self.start += drop
+
+        for field, pyramid in self.pyramids.items():
+            pyramid.update(self.x, self.columns[field], self.start, old_end)
+
+    def window_range(self, seconds=None):
+        """Raw index range covering the last ``seconds`` (everything if None)"""
+        if seconds is None or len(self.timestamps) == 0:
+            return 0, len(self.x)
+        start = np.searchsorted(self.timestamps, self.timestamps[-1] - seconds, side='left')
+        return int(start), len(self.x)
+
+    def series(self, field, seconds=None, max_points=600):
+        """(x, y) of one field over a time window, reduced to about ``max_points`` points"""
+        lo, hi = self.window_range(seconds)
+        count = hi - lo
+        x, y = self.x[lo:hi], self.columns[field][lo:hi]
+        if count <= max_points:
+            return x, y
+        if count <= LTTB_MAX_RATIO * max_points:
+            return lttb(x, y, max_points)
+
+        if field not in self.pyramids:
+            self.pyramids[field] = MinMaxPyramid(self.x, self.columns[field], base=self.start)
+        return self.pyramids[field].query(self.start + lo, self.start + hi, max_points // 2)
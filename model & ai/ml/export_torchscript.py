@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+TorchScript Export for the RUL Models
+Compiles rul_*.pth ahead of time so the API can skip eager mode
+
+Usage:
+    python export_torchscript.py               # writes models/<name>.ts.pt
+    python export_torchscript.py --quantize    # also writes models/<name>.int8.ts.pt
+
+The API and quick_predict.py pick the compiled artifact automatically
+(BATTERY_TORCHSCRIPT=auto), prefer the int8 one with BATTERY_TORCHSCRIPT=int8,
+and run the eager checkpoint with BATTERY_TORCHSCRIPT=off.
+"""
+
+import os
+import sys
+import json
+import argparse
+import warnings
+
+import torch
+from torch import nn
+
+from rul_network import compiled_path, load_eager_model
+from model_sources import source_info
+
+warnings.filterwarnings("ignore")
+
+RUL_CHECKPOINTS = ['rul_gru.pth', 'rul_gru_normalized.pth', 'rul_lstm_model.pth']
+
+def input_size(model):
+    """Number of input features the recurrent layer expects"""
+    for module in model.modules():
+        if isinstance(module, (nn.GRU, nn.LSTM)):
+            return module.input_size
+    raise ValueError("No GRU/LSTM layer found in model")
+
+def quantize(model):
+    """Dynamic int8 quantization of the recurrent and linear layers"""
+    return torch.ao.quantization.quantize_dynamic(model, {nn.GRU, nn.LSTM, nn.Linear}, dtype=torch.qint8)
+
+def compile_model(model, example):
+    """Script (or trace, if scripting fails), freeze and optimize a model for inference"""
+    model.eval()
+    try:
+        compiled = torch.jit.script(model)
+    except Exception:
+        compiled = torch.jit.trace(model, example)
+
+    try:
+        return torch.jit.optimize_for_inference(compiled)
+    except Exception:
+        # Quantized modules do not support every optimization pass
+        return torch.jit.freeze(compiled)
+
+def max_difference(reference, compiled, n_features, rows=256):
+    """Largest absolute output difference on random batches"""
+    torch.manual_seed(0)
+    worst = 0.0
+    with torch.no_grad():
+        for batch in (1, rows):
+            features = torch.rand(batch, n_features)
+            worst = max(worst, float((reference(features) - compiled(features)).abs().max()))
+    return worst
+
+def export_checkpoint(path, quantized, tolerance):
+    """Export one checkpoint and check it against eager mode"""
+    model = load_eager_model(path).eval()
+    n_features = input_size(model)
+    example = torch.rand(1, n_features)
+
+    source = quantize(model) if quantized else model
+    compiled = compile_model(source, example)
+
+    difference = max_difference(model, compiled, n_features)
+    target = compiled_path(path, quantized=quantized)
+    name = os.path.basename(target)
+
+    if difference > tolerance:
+        print(f"❌ {name}: max |diff| {difference:.2e} exceeds tolerance {tolerance:.0e}, not saved")
+        return False
+
+    # The checkpoint's fingerprint lets loaders skip the export once it is retrained
+    torch.jit.save(compiled, target, _extra_files={'source.json': json.dumps(source_info(path))})
+    print(f"✅ {name}: max |diff| {difference:.2e} vs eager")
+    return True
+
+def main():
+    """Main function"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Export RUL models to TorchScript')
+    parser.add_argument('--models-dir', default=os.environ.get('BATTERY_MODELS_DIR', os.path.join(script_dir, 'models')))
+    parser.add_argument('--quantize', action='store_true', help='also export dynamic int8 variants')
+    parser.add_argument('--tolerance', type=float, default=1e-4,
+                        help='max allowed |compiled - eager| for fp32 exports')
+    parser.add_argument('--int8-tolerance', type=float, default=5.0,
+                        help='max allowed |compiled - eager| for int8 exports (RUL cycles)')
+    args = parser.parse_args()
+
+    ok = True
+    for checkpoint in RUL_CHECKPOINTS:
+        path = os.path.join(args.models_dir, checkpoint)
+        if not os.path.exists(path):
+            print(f"⚠️ {checkpoint} not found, skipped")
+            continue
+        try:
+            ok &= export_checkpoint(path, False, args.tolerance)
+            if args.quantize:
+                ok &= export_checkpoint(path, True, args.int8_tolerance)
+        except Exception as e:
+            print(f"❌ {checkpoint}: export failed: {e}")
+            ok = False
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
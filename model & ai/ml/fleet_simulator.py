@@ -0,0 +1,259 @@
+"""
+Fleet Battery Simulator
+Drives thousands of simulated vehicles with NumPy state arrays
+
+Every vehicle follows the same phase machine and per-phase dynamics as
+LiveBatterySimulator, but the whole fleet advances in one vectorized step per
+tick and each tick's readings go to a pluggable sink (file, socket or queue).
+
+Usage:
+    python live_simulator.py --vehicles 10000 --tick-rate 1 --sink file:fleet.ndjson
+"""
+
+import time
+import socket
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from telemetry_log import PHASES, CLASSIFICATIONS
+
+# Per-phase (low, high) uniform ranges, in PHASES order:
+# voltage/temperature/SOC change per reading and the current drawn
+VOLTAGE_DELTA = np.array([(-0.02, -0.01), (-0.01, 0.01), (-0.005, 0.005), (0.01, 0.02)])
+CURRENT = np.array([(2.5, 3.5), (1.0, 2.5), (0.1, 0.3), (-2.5, -1.5)])
+TEMPERATURE_DELTA = np.array([(0.1, 0.3), (0.0, 0.2), (-0.2, -0.1), (0.2, 0.4)])
+SOC_DELTA = np.array([(-1.5, -0.8), (-0.8, -0.3), (-0.3, -0.1), (2.0, 4.0)])
+
+# Readings spent in a phase before switching (inclusive)
+PHASE_DURATION = (8, 15)
+
+FLEET_DTYPE = np.dtype([
+    ('vehicle_id', '<u4'),
+    ('reading_number', '<u4'),
+    ('timestamp', '<f8'),
+    ('voltage', '<f4'),
+    ('current', '<f4'),
+    ('temperature', '<f4'),
+    ('cycle_count', '<u4'),
+    ('soc', '<f4'),
+    ('soh', '<f4'),
+    ('rul', '<f4'),
+    ('classification', 'u1'),
+    ('trip_phase', 'u1'),
+])
+
+NDJSON_TEMPLATE = ('{"vehicle_id": %d, "reading_number": %d, "timestamp": "%s", "voltage": %.2f, '
+                   '"current": %.1f, "temperature": %.1f, "cycle_count": %d, "soc": %.1f, "soh": %.1f, '
+                   '"rul": %.0f, "classification": "%s", "trip_phase": "%s"}')
+
+def batch_to_ndjson(batch):
+    """Format a FLEET_DTYPE batch as newline-delimited JSON readings"""
+    lines = []
+    iso_times = {}  # a tick shares one timestamp
+    for (vehicle_id, reading_number, timestamp, voltage, current, temperature,
+         cycle_count, soc, soh, rul, classification, phase) in batch.tolist():
+        if timestamp not in iso_times:
+            iso_times[timestamp] = datetime.fromtimestamp(timestamp).isoformat()
+        lines.append(NDJSON_TEMPLATE % (
+            vehicle_id, reading_number, iso_times[timestamp], voltage,
+            current, temperature, cycle_count, soc, soh, rul,
+            CLASSIFICATIONS[classification], PHASES[phase]))
+    return '\n'.join(lines) + '\n' if lines else ''
+
+class FileSink:
+    """Appends each batch to a file as NDJSON"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'a', buffering=1024 * 1024)
+
+    def write(self, batch):
+        self.file.write(batch_to_ndjson(batch))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class SocketSink:
+    """Streams each batch as NDJSON to a TCP (host, port) or Unix socket path"""
+
+    def __init__(self, address):
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.connect(address)
+
+    def write(self, batch):
+        self.sock.sendall(batch_to_ndjson(batch).encode('utf-8'))
+
+    def close(self):
+        self.sock.close()
+
+class QueueSink:
+    """Puts each batch, as a FLEET_DTYPE array, on an in-process queue"""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def write(self, batch):
+        self.queue.put(batch)
+
+    def close(self):
+        pass
+
+def make_sink(spec):
+    """Build a sink from 'file:PATH', 'tcp:HOST:PORT' or 'unix:PATH'"""
+    kind, _, target = spec.partition(':')
+    if kind == 'file' and target:
+        return FileSink(target)
+    if kind == 'unix' and target:
+        return SocketSink(target)
+    if kind == 'tcp' and target:
+        host, _, port = target.rpartition(':')
+        return SocketSink((host or 'localhost', int(port)))
+    raise ValueError(f"Unknown sink '{spec}' (use file:PATH, tcp:HOST:PORT or unix:PATH)")
+
+class FleetBatterySimulator:
+    """Vectorized LiveBatterySimulator for ``n_vehicles`` batteries
+
+    All state lives in arrays of length ``n_vehicles``; ``step()`` advances
+    every vehicle's phase machine and dynamics at once and returns the tick's
+    readings as a FLEET_DTYPE array. ``start()`` runs ticks in the background
+    at ``tick_rate`` per second and writes each batch to ``sink``.
+    """
+
+    def __init__(self, n_vehicles=1000, tick_rate=0.5, sink=None, seed=None):
+        self.n_vehicles = n_vehicles
+        self.tick_rate = tick_rate
+        self.sink = sink
+        self.rng = np.random.default_rng(seed)
+
+        # Same starting point as LiveBatterySimulator, for every vehicle
+        self.voltage = np.full(n_vehicles, 3.75)
+        self.current = np.full(n_vehicles, 1.8)
+        self.temperature = np.full(n_vehicles, 25.0)
+        self.cycle_count = np.full(n_vehicles, 450, dtype=np.uint32)
+        self.soc = np.full(n_vehicles, 85.0)
+        self.soh = np.full(n_vehicles, 78.5)
+        self.rul = self.soh * 15
+
+        self.vehicle_ids = np.arange(n_vehicles, dtype=np.uint32)
+        self.phase = self.rng.integers(0, len(PHASES), n_vehicles)
+        self.phase_duration = self.rng.integers(PHASE_DURATION[0], PHASE_DURATION[1] + 1, n_vehicles)
+        self.phase_timer = np.zeros(n_vehicles, dtype=np.int64)
+        self.reading_count = 0
+
+        self.is_running = False
+        self.simulation_thread = None
+        self.ticks = 0
+        self.late_ticks = 0
+
+    def change_trip_phases(self, mask):
+        """Move the masked vehicles to a different random phase"""
+        n = int(mask.sum())
+        if n == 0:
+            return
+        # An offset of 1..3 always lands on one of the other phases
+        self.phase[mask] = (self.phase[mask] + self.rng.integers(1, len(PHASES), n)) % len(PHASES)
+        self.phase_duration[mask] = self.rng.integers(PHASE_DURATION[0], PHASE_DURATION[1] + 1, n)
+        self.phase_timer[mask] = 0
+
+    def uniform(self, ranges):
+        """One draw per vehicle from its phase's (low, high) range"""
+        low, high = ranges[self.phase, 0], ranges[self.phase, 1]
+        return low + (high - low) * self.rng.random(self.n_vehicles)
+
+    def step(self, timestamp=None):
+        """Advance every vehicle by one reading and return the readings"""
+        self.phase_timer += 1
+        self.change_trip_phases(self.phase_timer >= self.phase_duration)
+
+        self.voltage += self.uniform(VOLTAGE_DELTA)
+        self.current = self.uniform(CURRENT)
+        self.temperature += self.uniform(TEMPERATURE_DELTA)
+        self.soc += self.uniform(SOC_DELTA)
+
+        # Apply realistic constraints
+        np.clip(self.voltage, 3.0, 4.2, out=self.voltage)
+        np.clip(self.temperature, 15.0, 45.0, out=self.temperature)
+        np.clip(self.soc, 10.0, 100.0, out=self.soc)
+        self.soh = np.clip(self.soh - self.rng.uniform(0, 0.001, self.n_vehicles), 70.0, 100.0)
+        self.rul = self.soh * 15
+
+        self.reading_count += 1
+        return self.readings(timestamp)
+
+    def readings(self, timestamp=None):
+        """Current state of the fleet as a FLEET_DTYPE array"""
+        batch = np.empty(self.n_vehicles, dtype=FLEET_DTYPE)
+        batch['vehicle_id'] = self.vehicle_ids
+        batch['reading_number'] = self.reading_count
+        batch['timestamp'] = time.time() if timestamp is None else timestamp
+        batch['voltage'] = self.voltage
+        batch['current'] = self.current
+        batch['temperature'] = self.temperature
+        batch['cycle_count'] = self.cycle_count
+        batch['soc'] = self.soc
+        batch['soh'] = self.soh
+        batch['rul'] = self.rul
+        # Excellent >= 90 > Good >= 80 > Fair >= 70 > Poor
+        batch['classification'] = 3 - np.searchsorted([70, 80, 90], self.soh, side='right')
+        batch['trip_phase'] = self.phase
+        return batch
+
+    def run_simulation(self, max_ticks=None):
+        """Tick at ``tick_rate`` until stopped (or ``max_ticks`` ticks)"""
+        period = 1.0 / self.tick_rate
+        next_tick = time.perf_counter()
+
+        while self.is_running and (max_ticks is None or self.ticks < max_ticks):
+            try:
+                batch = self.step()
+                if self.sink is not None:
+                    self.sink.write(batch)
+                self.ticks += 1
+            except Exception as e:
+                print(f"Fleet simulation error: {e}")
+
+            # Fixed schedule; a tick that overruns its slot starts the next one at once
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.late_ticks += 1
+                next_tick = time.perf_counter()
+
+        self.is_running = False
+
+    def start(self, max_ticks=None):
+        """Start the fleet simulation in background"""
+        if not self.is_running:
+            self.is_running = True
+            self.simulation_thread = threading.Thread(target=self.run_simulation, args=(max_ticks,))
+            self.simulation_thread.daemon = True
+            self.simulation_thread.start()
+            print(f"Fleet simulation started: {self.n_vehicles} vehicles at {self.tick_rate} ticks/s")
+
+    def stop(self):
+        """Stop the simulation and close the sink"""
+        self.is_running = False
+        if self.simulation_thread:
+            self.simulation_thread.join(timeout=5)
+        if self.sink is not None:
+            self.sink.close()
+        print(f"Fleet simulation stopped after {self.ticks} ticks ({self.late_ticks} late)")
+
+    def stats(self):
+        """Ticks run and readings emitted so far"""
+        return {
+            'vehicles': self.n_vehicles,
+            'tick_rate': self.tick_rate,
+            'ticks': self.ticks,
+            'late_ticks': self.late_ticks,
+            'readings': self.ticks * self.n_vehicles,
+            'phase_counts': dict(zip(PHASES, np.bincount(self.phase, minlength=len(PHASES)).tolist()))
+        }
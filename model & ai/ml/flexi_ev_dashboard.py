@@ -1,15 +1,62 @@
 import dash
-from dash import dcc, html, Input, Output
+from dash import dcc, html, Input, Output, State, no_update
+from dash.exceptions import PreventUpdate
 import plotly.graph_objects as go
 import pandas as pd
 import json
 import os
 from datetime import datetime
 import numpy as np
+import threading
+from flask import jsonify
+
+from telemetry_log import DEFAULT_LOG_FILE, TelemetryLog, load_trip_data, log_version
+from live_data_cache import LiveDataCache, SharedSnapshotCache
+from downsampling import MultiResolutionHistory
+from profiling import install_profiling
+
+# Chart time windows: 'live' follows the latest readings, others are seconds of history
+TIME_WINDOWS = [
+    ('Live', 'live'),
+    ('5 min', '300'),
+    ('30 min', '1800'),
+    ('2 h', '7200'),
+    ('12 h', '43200'),
+    ('All', 'all')
+]
 
 class FlexiEVDashboard:
-    def __init__(self):
-        """Initialize Flexi-EV themed dashboard with clean callbacks"""
+    def __init__(self, live_window=50, shared_cache=None):
+        """Initialize Flexi-EV themed dashboard with clean callbacks
+
+        shared_cache (default: $FLEXI_EV_SHARED_CACHE == '1') shares one parsed
+        snapshot between dashboard worker processes through a memory-mapped file
+        """
+        # Readings loaded from the telemetry log on each refresh
+        self.live_window = live_window
+        
+        # Live data sources, next to this script
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        self.log_path = os.path.join(script_dir, DEFAULT_LOG_FILE)
+        self.live_data_path = os.path.join(script_dir, "live_trip_data.json")
+        
+        # One parsed snapshot shared by all browser tabs, refreshed in the background
+        if shared_cache is None:
+            shared_cache = os.environ.get('FLEXI_EV_SHARED_CACHE', '0') == '1'
+        cache_class = SharedSnapshotCache if shared_cache else LiveDataCache
+        self.live_cache = cache_class(self.read_live_data, self.live_data_version).start()
+        
+        # Points kept on each chart
+        self.chart_points = 10
+        
+        # Themed figures as plain dicts, keyed by metric (see chart_template)
+        self.chart_templates = {}
+        
+        # History for the time-window charts: (data version, history, (log inode, next seq) it has read up to)
+        self.chart_max_points = 600  # about one point per horizontal pixel
+        self.history = (None, None, None)
+        self.history_lock = threading.Lock()
+        
         # Flexi-EV Color Scheme - Dark theme based on #00403C
         self.colors = {
             'primary': '#00403C',
@@ -36,21 +83,88 @@ class FlexiEVDashboard:
         # Setup layout and callbacks
         self.setup_layout()
         self.setup_callbacks()
+        self.setup_routes()
+    
+    def live_data_version(self):
+        """Cheap change key for the live data: log write count or JSON file mtime/size"""
+        if os.path.exists(self.log_path):
+            inode, count = log_version(self.log_path)
+            return f"evlog:{inode}:{count}"
+        if os.path.exists(self.live_data_path):
+            stat = os.stat(self.live_data_path)
+            return f"json:{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_size}"
+        return "sample"
     
     def load_live_data(self):
-        """Load live trip data - always reload from file for real-time updates"""
-        try:
-            # Get the directory where this script is located
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            live_data_path = os.path.join(script_dir, "live_trip_data.json")
+        """Latest live trip data from the shared snapshot (read-only)"""
+        return self.live_cache.snapshot().data
+    
+    def load_history(self, snapshot):
+        """Full retained reading history as a MultiResolutionHistory, cached per data version
+        
+        With the telemetry log, a new version only appends the records written
+        since the last one (the min/max pyramids are extended, not rebuilt); a
+        new log file or a gap the ring overwrote reads everything again.
+        """
+        with self.history_lock:
+            version, history, position = self.history
+            if history is not None and version == snapshot.version:
+                return history
+            
+            fields = ['voltage', 'current', 'temperature', 'soc']
+            if os.path.exists(self.log_path):
+                log = TelemetryLog(self.log_path)
+                try:
+                    inode = os.fstat(log.file.fileno()).st_ino
+                    records = None
+                    if history is not None and position is not None and position[0] == inode:
+                        next_seq = position[1]
+                        new = log.count - next_seq
+                        if 0 <= new <= log.capacity:
+                            records = log.read_latest(new)
+                            seqs = records['seq'].astype(np.int64)
+                            if len(records) and (seqs[0] != next_seq or np.any(np.diff(seqs) != 1)):
+                                records = None  # the writer lapped us; start over
+                    
+                    if records is not None:
+                        history.extend(records['timestamp'], records['reading_number'],
+                                       {field: records[field] for field in fields}, max_length=log.capacity)
+                    else:
+                        records = log.read_latest()
+                        history = MultiResolutionHistory(records['timestamp'], records['reading_number'],
+                                                         {field: records[field] for field in fields})
+                        next_seq = 0
+                    position = (inode, int(records['seq'][-1]) + 1 if len(records) else next_seq)
+                    del records
+                finally:
+                    log.close()
+            else:
+                readings = snapshot.data.get('readings', [])
+                try:
+                    timestamps = [datetime.fromisoformat(r['timestamp']).timestamp() for r in readings]
+                except (KeyError, TypeError, ValueError):
+                    timestamps = []  # no timestamps: every window shows all readings
+                history = MultiResolutionHistory(
+                    timestamps,
+                    [r.get('reading_number', i) for i, r in enumerate(readings)],
+                    {field: [r.get(field, 0) for r in readings] for field in fields})
+                position = None
             
-            if os.path.exists(live_data_path):
-                # Always reload the file to get the latest data
-                with open(live_data_path, 'r') as f:
+            self.history = (snapshot.version, history, position)
+            return history
+    
+    def read_live_data(self):
+        """Read live trip data from the telemetry log or JSON file"""
+        try:
+            if os.path.exists(self.log_path):
+                # Binary telemetry log: map it and read only the latest readings
+                return load_trip_data(self.log_path, self.live_window)
+            elif os.path.exists(self.live_data_path):
+                with open(self.live_data_path, 'r') as f:
                     data = json.load(f)
                 return data
             else:
-                print(f"Live data file not found at: {live_data_path}")
+                print(f"Live data file not found at: {self.live_data_path}")
                 return self.create_sample_data()
         except Exception as e:
             print(f"Error loading data: {e}")
@@ -230,6 +344,21 @@ class FlexiEVDashboard:
                     'marginBottom': '30px'
                 }),
                 
+                # Chart time window
+                html.Div([
+                    dcc.RadioItems(
+                        id='time-window',
+                        options=[{'label': label, 'value': value} for label, value in TIME_WINDOWS],
+                        value='live',
+                        inline=True,
+                        inputStyle={'marginRight': '6px', 'marginLeft': '14px'},
+                        style={'color': self.colors['text_secondary'], 'fontFamily': 'Inter, sans-serif'}
+                    )
+                ], style={
+                    'textAlign': 'center',
+                    'marginBottom': '20px'
+                }),
+                
                 # Charts Row
                 html.Div([
                     # Voltage Chart
@@ -292,12 +421,15 @@ class FlexiEVDashboard:
                 'margin': '0 auto'
             }),
             
-            # Auto-refresh component
+            # Change check: a tick with no new readings sends nothing
             dcc.Interval(
                 id='interval-component',
-                interval=3000,  # Update every 3 seconds
+                interval=1000,  # Check every second
                 n_intervals=0
-            )
+            ),
+            
+            # Data version and last reading drawn in this browser tab
+            dcc.Store(id='live-cursor')
         ], style={
             'background': f'linear-gradient(135deg, {self.colors["bg_primary"]} 0%, {self.colors["bg_secondary"]} 100%)',
             'minHeight': '100vh',
@@ -306,6 +438,13 @@ class FlexiEVDashboard:
 
     def setup_callbacks(self):
         """Setup dashboard callbacks for real-time updates - CLEAN VERSION"""
+        charts = [
+            ('voltage', 'Voltage (V)', self.colors['accent']),
+            ('current', 'Current (A)', self.colors['accent_light']),
+            ('temperature', 'Temperature (°C)', self.colors['accent_dark']),
+            ('soc', 'State of Charge (%)', self.colors['accent'])
+        ]
+        
         @self.app.callback(
             [Output('live-status', 'children'),
              Output('battery-level', 'children'),
@@ -315,20 +454,37 @@ class FlexiEVDashboard:
              Output('voltage-chart', 'figure'),
              Output('current-chart', 'figure'),
              Output('temperature-chart', 'figure'),
-             Output('soc-chart', 'figure')],
-            [Input('interval-component', 'n_intervals')]
+             Output('soc-chart', 'figure'),
+             Output('voltage-chart', 'extendData'),
+             Output('current-chart', 'extendData'),
+             Output('temperature-chart', 'extendData'),
+             Output('soc-chart', 'extendData'),
+             Output('live-cursor', 'data')],
+            [Input('interval-component', 'n_intervals'),
+             Input('time-window', 'value')],
+            [State('live-cursor', 'data')]
         )
-        def update_dashboard(n):
-            """Main callback to update all dashboard components"""
+        def update_dashboard(n, window, cursor):
+            """Update the dashboard when new readings arrived, appending only the new points"""
+            snapshot = self.live_cache.snapshot()
+            version = snapshot.version
+            window = window or 'live'
+            
+            # Nothing new since this tab's last update
+            if (version is not None and cursor and cursor.get('version') == version
+                    and cursor.get('window', 'live') == window):
+                raise PreventUpdate
+            
+            no_figures = [no_update] * len(charts)
             try:
-                # Load latest data
-                data = self.load_live_data()
+                # Parsed once per change by the cache, shared by all tabs
+                data = snapshot.data
                 readings = data.get('readings', [])
                 
                 if not readings:
                     empty_fig = self.create_empty_chart("No Data Available")
-                    return ("No data available", "N/A", "N/A", "N/A", "N/A", 
-                           empty_fig, empty_fig, empty_fig, empty_fig)
+                    return ("No data available", "N/A", "N/A", "N/A", "N/A",
+                           *[empty_fig] * len(charts), *no_figures, {'version': version})
                 
                 # Get latest reading
                 latest = readings[-1]
@@ -344,38 +500,78 @@ class FlexiEVDashboard:
                 current_phase = latest.get('trip_phase', 'unknown').title()
                 health_status = f"{latest.get('soh', 0):.1f}%"
                 
-                # Create charts with recent data (last 10 readings)
-                recent_readings = readings[-10:] if len(readings) > 10 else readings
+                # Charts show the most recent readings
+                recent_readings = readings[-self.chart_points:]
+                source = f"{data.get('name')}:{data.get('start_time')}"
+                last_reading = latest.get('reading_number', readings_count)
+                new_cursor = {'version': version, 'source': source, 'last_reading': last_reading, 'window': window}
+                
+                if window != 'live':
+                    # History window: downsampled series, redrawn on each change
+                    history = self.load_history(snapshot)
+                    seconds = None if window == 'all' else float(window)
+                    figures = []
+                    for field, title, color in charts:
+                        x_data, y_data = history.series(field, seconds, self.chart_max_points)
+                        figures.append(self.series_chart(x_data.tolist(), y_data.tolist(), field, title, color))
+                    return (status, battery_level, range_remaining, current_phase, health_status,
+                            *figures, *no_figures, new_cursor)
                 
-                voltage_fig = self.create_line_chart(recent_readings, 'voltage', 'Voltage (V)', self.colors['accent'])
-                current_fig = self.create_line_chart(recent_readings, 'current', 'Current (A)', self.colors['accent_light'])
-                temp_fig = self.create_line_chart(recent_readings, 'temperature', 'Temperature (°C)', self.colors['accent_dark'])
-                soc_fig = self.create_line_chart(recent_readings, 'soc', 'State of Charge (%)', self.colors['accent'])
+                if cursor and cursor.get('window', 'live') != 'live':
+                    new_readings = None  # switching back from a history window
+                else:
+                    new_readings = self.readings_after(recent_readings, cursor, source)
+                if new_readings is None:
+                    # First load or a new trip: send whole figures
+                    figures = [self.create_line_chart(recent_readings, field, title, color)
+                               for field, title, color in charts]
+                    extensions = no_figures
+                else:
+                    # Same trip: append the new points, the graphs keep the last chart_points
+                    figures = no_figures
+                    extensions = [self.chart_extension(new_readings, field) if new_readings else no_update
+                                  for field, _, _ in charts]
                 
                 return (status, battery_level, range_remaining, current_phase, health_status,
-                        voltage_fig, current_fig, temp_fig, soc_fig)
+                        *figures, *extensions, new_cursor)
                 
             except Exception as e:
                 print(f"Callback error: {e}")
                 error_fig = self.create_empty_chart("Error Loading Data")
                 return (f"Error: {str(e)}", "Error", "Error", "Error", "Error",
-                       error_fig, error_fig, error_fig, error_fig)
+                       *[error_fig] * len(charts), *no_figures, None)
 
-    def create_line_chart(self, readings, field, title, color):
-        """Create a styled line chart using Flexi-EV theme"""
-        if not readings:
-            return self.create_empty_chart("No Data")
+    def readings_after(self, recent_readings, cursor, source):
+        """Readings newer than the tab's last drawn one, or None if the charts need a full redraw"""
+        if not cursor or cursor.get('source') != source or cursor.get('last_reading') is None:
+            return None
         
-        try:
-            x_data = list(range(len(readings)))
-            y_data = [r.get(field, 0) for r in readings]
-            
+        last_drawn = cursor['last_reading']
+        if recent_readings and recent_readings[-1].get('reading_number', 0) < last_drawn:
+            return None
+        
+        new_readings = [r for r in recent_readings if r.get('reading_number', 0) > last_drawn]
+        if new_readings and new_readings[0].get('reading_number') != last_drawn + 1:
+            # Readings were missed, the drawn points would not be contiguous
+            return None
+        return new_readings
+
+    def chart_extension(self, readings, field):
+        """extendData payload appending readings to a chart's line trace"""
+        x_data = [r.get('reading_number', 0) for r in readings]
+        y_data = [r.get(field, 0) for r in readings]
+        return dict(x=[x_data], y=[y_data]), [0], self.chart_points
+
+    def chart_template(self, field, title, color):
+        """Themed figure for one metric as a plain dict, built (and validated) once"""
+        key = (field, title, color)
+        if key not in self.chart_templates:
             fig = go.Figure()
             
             # Add line trace
             fig.add_trace(go.Scatter(
-                x=x_data,
-                y=y_data,
+                x=[],
+                y=[],
                 mode='lines+markers',
                 line=dict(color=color, width=3, shape='linear'),
                 marker=dict(
@@ -416,7 +612,31 @@ class FlexiEVDashboard:
                 height=300
             )
             
-            return fig
+            self.chart_templates[key] = fig.to_plotly_json()
+        return self.chart_templates[key]
+
+    def create_line_chart(self, readings, field, title, color):
+        """Create a styled line chart using Flexi-EV theme
+
+        Returns a dict figure: the cached template with only the trace x/y
+        replaced, so no plotly objects are built or validated per update.
+        """
+        if not readings:
+            return self.create_empty_chart("No Data")
+        
+        x_data = [r.get('reading_number', i) for i, r in enumerate(readings)]
+        y_data = [r.get(field, 0) for r in readings]
+        return self.series_chart(x_data, y_data, field, title, color)
+
+    def series_chart(self, x_data, y_data, field, title, color):
+        """Themed chart of one series from the cached template"""
+        if not x_data:
+            return self.create_empty_chart("No Data")
+        
+        try:
+            template = self.chart_template(field, title, color)
+            trace = dict(template['data'][0], x=x_data, y=y_data)
+            return {'data': [trace], 'layout': template['layout']}
             
         except Exception as e:
             print(f"Chart creation error: {e}")
@@ -424,28 +644,41 @@ class FlexiEVDashboard:
 
     def create_empty_chart(self, message):
         """Create an empty chart with a message"""
-        fig = go.Figure()
-        fig.add_annotation(
-            text=message,
-            xref="paper", yref="paper",
-            x=0.5, y=0.5,
-            showarrow=False,
-            font=dict(color=self.colors['text_muted'], size=16)
-        )
-        fig.update_layout(
-            paper_bgcolor=self.colors['bg_secondary'],
-            plot_bgcolor=self.colors['bg_secondary'],
-            xaxis=dict(visible=False),
-            yaxis=dict(visible=False),
-            height=300
-        )
-        return fig
+        key = ('empty', message)
+        if key not in self.chart_templates:
+            fig = go.Figure()
+            fig.add_annotation(
+                text=message,
+                xref="paper", yref="paper",
+                x=0.5, y=0.5,
+                showarrow=False,
+                font=dict(color=self.colors['text_muted'], size=16)
+            )
+            fig.update_layout(
+                paper_bgcolor=self.colors['bg_secondary'],
+                plot_bgcolor=self.colors['bg_secondary'],
+                xaxis=dict(visible=False),
+                yaxis=dict(visible=False),
+                height=300
+            )
+            self.chart_templates[key] = fig.to_plotly_json()
+        return self.chart_templates[key]
+
+    def setup_routes(self):
+        """Extra routes on the dashboard's Flask server"""
+        @self.app.server.route('/cache-stats')
+        def cache_stats():
+            """Snapshot cache hit rate and age"""
+            return jsonify(self.live_cache.stats())
+        
+        # /admin/profile and ?profile=1, only with $BATTERY_PROFILING=1
+        install_profiling(self.app.server)
 
     def run(self, debug=False, port=8055):
         """Run the dashboard"""
         print("Starting Flexi-EV Analytics Dashboard...")
         print(f"Dashboard URL: http://127.0.0.1:{port}")
-        print("Auto-updates every 3 seconds")
+        print("Checks for new readings every second, sends only new points")
         print("Live Battery Analytics with Flexi-EV Theme")
         print("="*50)
         
@@ -455,6 +688,10 @@ class FlexiEVDashboard:
             print(f"Error starting dashboard: {e}")
             print("Please ensure port 8055 is available")
 
+def create_server():
+    """WSGI app for multi-worker servers, e.g. gunicorn -w 4 'flexi_ev_dashboard:create_server()'"""
+    return FlexiEVDashboard().app.server
+
 def main():
     """Main function to start the dashboard"""
     dashboard = FlexiEVDashboard()
@@ -165,7 +165,7 @@ Enter your choice (1-5): """
                 print("\n🔄 Starting Live Simulator Only...")
                 if self.start_live_simulator():
                     print("✅ Simulator running in background")
-                    print("📂 Check 'live_trip_data.json' for generated data")
+                    print("📂 Check 'live_trip_data.evlog' for generated data")
                     input("Press Enter to continue...")
                 break
                 
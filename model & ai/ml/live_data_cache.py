@@ -0,0 +1,255 @@
+"""
+Live Data Snapshot Cache
+One parsed, read-only snapshot of the live trip data shared by every callback
+
+A single background thread checks the data version (telemetry log write count
+or JSON mtime/size) and re-parses only when it changed; callbacks just take
+the current snapshot. SharedSnapshotCache extends this to several dashboard
+worker processes: one of them (holding a file lock) parses and publishes the
+snapshot through a memory-mapped file, the others map it and decode it once
+per change.
+"""
+
+import os
+import json
+import mmap
+import time
+import fcntl
+import struct
+import tempfile
+import threading
+from types import MappingProxyType
+from collections import namedtuple
+
+Snapshot = namedtuple('Snapshot', ['version', 'data', 'loaded_at'])
+
+def freeze(data):
+    """Read-only view of a trip data dict, readings as a tuple"""
+    return MappingProxyType({**data, 'readings': tuple(data.get('readings', []))})
+
+class LiveDataCache:
+    """Process-wide snapshot of the live trip data, refreshed by one background thread
+
+    ``load_fn()`` parses the data and ``version_fn()`` returns a cheap key that
+    changes whenever the data does. ``snapshot()`` never touches the file once
+    the first snapshot exists.
+    """
+
+    mode = 'process'
+
+    def __init__(self, load_fn, version_fn, interval=0.5):
+        self.load_fn = load_fn
+        self.version_fn = version_fn
+        self.interval = interval
+
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.last_refresh_ms = 0.0
+
+    def start(self):
+        """Start the background refresher"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='live-data-cache', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                self.errors += 1
+                print(f"Live data refresh error: {e}")
+            self._stop.wait(self.interval)
+
+    def current_version(self):
+        """Version of the source data, or None if it cannot be determined"""
+        try:
+            return self.version_fn()
+        except Exception:
+            return None
+
+    def refresh(self):
+        """Re-parse the data if its version changed and return the current snapshot"""
+        version = self.current_version()
+        current = self._snapshot
+        if current is not None and version is not None and current.version == version:
+            return current
+
+        with self._refresh_lock:
+            current = self._snapshot
+            if current is not None and version is not None and current.version == version:
+                return current
+            start = time.perf_counter()
+            snapshot = Snapshot(version, freeze(self.load_fn()), time.time())
+            self.last_refresh_ms = (time.perf_counter() - start) * 1000
+            self.refreshes += 1
+            self._snapshot = snapshot
+            return snapshot
+
+    def snapshot(self):
+        """Current snapshot; only parses when none has been loaded yet"""
+        snapshot = self._snapshot
+        with self._stats_lock:
+            if snapshot is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return snapshot if snapshot is not None else self.refresh()
+
+    def stats(self):
+        """Hit rate, parse count and age of the current snapshot"""
+        snapshot = self._snapshot
+        reads = self.hits + self.misses
+        return {
+            'mode': self.mode,
+            'reads': reads,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / reads, 4) if reads else None,
+            'refreshes': self.refreshes,
+            'reads_per_refresh': round(reads / self.refreshes, 1) if self.refreshes else None,
+            'errors': self.errors,
+            'last_refresh_ms': round(self.last_refresh_ms, 3),
+            'snapshot_version': snapshot.version if snapshot else None,
+            'snapshot_age_s': round(time.time() - snapshot.loaded_at, 3) if snapshot else None
+        }
+
+    def stop(self):
+        """Stop the background refresher"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+# Shared snapshot file: magic, sequence (odd while being written), payload length, load time
+SHARED_MAGIC = b'EVSNAP01'
+SHARED_HEADER = '<8sQQd'
+SHARED_HEADER_SIZE = 64
+SHARED_SIZE = 8 * 1024 * 1024
+
+def default_shared_path():
+    """Snapshot file location, in /dev/shm when available"""
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'flexi_ev_live_snapshot')
+
+class SharedSnapshotCache(LiveDataCache):
+    """LiveDataCache shared by several worker processes through a memory-mapped file
+
+    The worker holding ``<path>.lock`` parses the data and publishes it as
+    compact JSON under a sequence lock; the others only read the header each
+    interval and decode the payload when the sequence moved. If the publishing
+    worker exits, the next one to take the lock continues.
+    """
+
+    mode = 'shared'
+
+    def __init__(self, load_fn, version_fn, interval=0.5, path=None, size=SHARED_SIZE):
+        super().__init__(load_fn, version_fn, interval)
+        self.path = path or default_shared_path()
+        self.size = size
+        self.is_leader = False
+        self.published_sequence = 0
+        self.publish_errors = 0
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self.mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._lock_file = open(f"{self.path}.lock", 'a')
+
+    def _try_lead(self):
+        """Become the publishing worker if no other process holds the lock"""
+        if not self.is_leader:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self.is_leader = True
+            except OSError:
+                pass
+        return self.is_leader
+
+    def _header(self):
+        return struct.unpack_from(SHARED_HEADER, self.mmap, 0)
+
+    def publish(self, snapshot):
+        """Write a snapshot for the other workers"""
+        payload = json.dumps({'version': snapshot.version, 'data': dict(snapshot.data)},
+                             separators=(',', ':')).encode('utf-8')
+        if SHARED_HEADER_SIZE + len(payload) > self.size:
+            self.publish_errors += 1
+            print(f"Snapshot of {len(payload)} bytes does not fit in {self.path}, not shared")
+            return
+
+        magic, sequence, _, _ = self._header()
+        sequence = sequence + 1 if magic == SHARED_MAGIC else 1
+        if sequence % 2 == 0:
+            sequence += 1
+        # Odd sequence while writing, even once complete
+        struct.pack_into(SHARED_HEADER, self.mmap, 0, SHARED_MAGIC, sequence, len(payload), snapshot.loaded_at)
+        self.mmap[SHARED_HEADER_SIZE:SHARED_HEADER_SIZE + len(payload)] = payload
+        struct.pack_into(SHARED_HEADER, self.mmap, 0, SHARED_MAGIC, sequence + 1, len(payload), snapshot.loaded_at)
+        self.published_sequence = sequence + 1
+
+    def read_shared(self):
+        """Decode the published snapshot if it changed, or None if it did not"""
+        for _ in range(10):
+            magic, sequence, length, loaded_at = self._header()
+            if magic != SHARED_MAGIC or sequence == self.published_sequence:
+                return None
+            if sequence % 2:
+                time.sleep(0.001)
+                continue
+            payload = bytes(self.mmap[SHARED_HEADER_SIZE:SHARED_HEADER_SIZE + length])
+            if self._header()[1] != sequence:
+                continue
+            decoded = json.loads(payload)
+            self.published_sequence = sequence
+            return Snapshot(decoded['version'], freeze(decoded['data']), loaded_at)
+        return None
+
+    def refresh(self):
+        """Publish (leader) or pick up (other workers) the current snapshot"""
+        if self._try_lead():
+            previous = self._snapshot
+            snapshot = super().refresh()
+            if snapshot is not previous:
+                self.publish(snapshot)
+            return snapshot
+
+        with self._refresh_lock:
+            snapshot = self.read_shared()
+            if snapshot is not None:
+                self.refreshes += 1
+                self._snapshot = snapshot
+        if self._snapshot is None:
+            # Nothing published yet: parse locally once
+            return super().refresh()
+        return self._snapshot
+
+    def stats(self):
+        stats = super().stats()
+        stats.update({
+            'leader': self.is_leader,
+            'pid': os.getpid(),
+            'shared_sequence': self.published_sequence,
+            'publish_errors': self.publish_errors
+        })
+        return stats
+
+    def stop(self):
+        super().stop()
+        if self.is_leader:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self.is_leader = False
+        self._lock_file.close()
@@ -4,12 +4,24 @@ import random
 import math
 from datetime import datetime, timedelta
 import threading
+import argparse
 import os
 
+from telemetry_log import TelemetryLog, DEFAULT_LOG_FILE, DEFAULT_RETENTION
+
 class LiveBatterySimulator:
-    def __init__(self):
-        """Initialize live battery data simulator"""
+    def __init__(self, storage="binary", retention=DEFAULT_RETENTION, log_path=None):
+        """Initialize live battery data simulator
+
+        storage: "binary" appends each reading to a memory-mapped telemetry log
+        keeping the last `retention` readings, "json" rewrites live_trip_data.json
+        with the last 50 readings (the original format)
+        """
         self.is_running = False
+        self.storage = storage
+        self.retention = retention
+        self.log_path = log_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), DEFAULT_LOG_FILE)
+        self.telemetry_log = None
         self.trip_data = {
             "name": "Live Highway Trip",
             "start_time": datetime.now().isoformat(),
@@ -126,6 +138,21 @@ class LiveBatterySimulator:
         
         return reading
     
+    def open_telemetry_log(self):
+        """Open (or continue) the binary telemetry log"""
+        self.telemetry_log = TelemetryLog(self.log_path, capacity=self.retention,
+                                          writable=True, name=self.trip_data["name"])
+        self.reading_count = self.telemetry_log.count
+
+    def save_reading(self, reading):
+        """Persist one reading to the configured storage"""
+        if self.storage == "binary":
+            # Append one fixed-size record, no rewrite of earlier readings
+            self.telemetry_log.append(reading)
+        else:
+            self.trip_data["readings"].append(reading)
+            self.save_live_data()
+
     def save_live_data(self):
         """Save current trip data to JSON file"""
         filename = "live_trip_data.json"
@@ -145,6 +172,10 @@ class LiveBatterySimulator:
         print("Generating realistic data every 2 seconds")
         print("Trip phases: Highway -> City -> Parking -> Charging")
         
+        if self.storage == "binary":
+            self.open_telemetry_log()
+            print(f"Telemetry log: {self.log_path} (keeps last {self.retention} readings)")
+
         # Initialize first phase
         self.change_trip_phase()
         
@@ -152,10 +183,9 @@ class LiveBatterySimulator:
             try:
                 # Generate new reading
                 reading = self.generate_reading()
-                self.trip_data["readings"].append(reading)
                 
                 # Save to file
-                self.save_live_data()
+                self.save_reading(reading)
                 
                 # Display current status
                 print(f"Reading #{self.reading_count}: "
@@ -169,6 +199,10 @@ class LiveBatterySimulator:
             except Exception as e:
                 print(f"Simulation error: {e}")
                 time.sleep(2)
+
+        if self.telemetry_log is not None:
+            self.telemetry_log.close()
+            self.telemetry_log = None
     
     def start(self):
         """Start the simulation in background"""
@@ -186,19 +220,62 @@ class LiveBatterySimulator:
             self.simulation_thread.join(timeout=5)
         print("Live simulation stopped!")
 
+def run_fleet(args):
+    """Run the vectorized multi-vehicle simulator until Ctrl+C"""
+    from fleet_simulator import FleetBatterySimulator, make_sink
+
+    print("FLEET BATTERY DATA SIMULATOR")
+    print("="*50)
+
+    simulator = FleetBatterySimulator(n_vehicles=args.vehicles, tick_rate=args.tick_rate,
+                                      sink=make_sink(args.sink), seed=args.seed)
+    try:
+        simulator.start()
+        print(f"Readings sent to: {args.sink}")
+        print("Press Ctrl+C to stop.")
+
+        while True:
+            time.sleep(5)
+            stats = simulator.stats()
+            print(f"Tick {stats['ticks']}: {stats['readings']} readings, "
+                  f"{stats['late_ticks']} late ticks, phases {stats['phase_counts']}")
+
+    except KeyboardInterrupt:
+        print()
+        print("Stopping simulation...")
+        simulator.stop()
+
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Live battery data simulator")
+    parser.add_argument("--storage", choices=["binary", "json"], default="binary",
+                        help="binary telemetry log (default) or live_trip_data.json")
+    parser.add_argument("--retention", type=int, default=DEFAULT_RETENTION,
+                        help="readings kept in the telemetry log")
+    parser.add_argument("--log-file", help=f"telemetry log path (default: {DEFAULT_LOG_FILE} next to this script)")
+    parser.add_argument("--vehicles", type=int, default=0,
+                        help="fleet mode: simulate this many vehicles with NumPy state arrays")
+    parser.add_argument("--tick-rate", type=float, default=0.5, help="fleet mode: ticks per second")
+    parser.add_argument("--sink", default="file:fleet_trip_data.ndjson",
+                        help="fleet mode output: file:PATH, tcp:HOST:PORT or unix:PATH")
+    parser.add_argument("--seed", type=int, help="fleet mode random seed")
+    args = parser.parse_args()
+
+    if args.vehicles > 0:
+        run_fleet(args)
+        return
+
     print("LIVE BATTERY DATA SIMULATOR")
     print("="*50)
     
-    simulator = LiveBatterySimulator()
+    simulator = LiveBatterySimulator(storage=args.storage, retention=args.retention, log_path=args.log_file)
     
     try:
         simulator.start()
         
         print()
         print("Simulation running! Press Ctrl+C to stop.")
-        print("Data saved to: live_trip_data.json")
+        print(f"Data saved to: {simulator.log_path if args.storage == 'binary' else 'live_trip_data.json'}")
         print("Use this data in your dashboard!")
         
         # Keep main thread alive
@@ -0,0 +1,212 @@
+"""
+Hot-path Metrics for the Battery ML API
+Counters and latency histograms rendered in the Prometheus text format
+
+``stage(name)`` times one step of a request (JSON parsing, RF predict, scaler
+transform, tensor creation, RNN forward pass, serialization) into a
+per-route, per-stage histogram and, while a request is being timed, into that
+request's own list of stage timings (returned as a Server-Timing header).
+Recording is a perf_counter pair, a bisect and a short locked update.
+
+Values are per process. Pre-forked workers (prefork_server.py) share them
+through a MetricsDirectory: each worker writes a JSON snapshot every second
+and before answering a scrape, and /metrics renders the sum over all workers
+(gauges get a ``worker`` label), so any worker gives the same totals.
+"""
+
+import os
+import json
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram upper bounds in seconds, 50 µs to 10 s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def format_labels(labels):
+    """Prometheus label set for a tuple of (name, value) pairs"""
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+class Metrics:
+    """Thread-safe counters, gauges and histograms keyed by (name, labels)"""
+
+    def __init__(self, enabled=True, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}  # key -> [count per bucket..., +Inf count, sum]
+        self.descriptions = {}  # name -> (type, help)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @classmethod
+    def from_env(cls):
+        """Metrics switched by $BATTERY_API_METRICS (on unless '0')"""
+        return cls(enabled=os.environ.get('BATTERY_API_METRICS', '1') != '0')
+
+    def describe(self, name, kind, text):
+        """Register the TYPE and HELP lines of a metric"""
+        self.descriptions[name] = (kind, text)
+
+    def inc(self, name, labels=(), value=1):
+        if not self.enabled:
+            return
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, labels=()):
+        self.gauges[(name, labels)] = value
+
+    def observe(self, name, seconds, labels=()):
+        if not self.enabled:
+            return
+        key = (name, labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(self.buckets) + 2)
+            histogram[index] += 1
+            histogram[-1] += seconds
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block as stage ``name`` of the current route"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            route = getattr(self.local, 'route', None) or 'background'
+            self.observe('battery_api_stage_seconds', elapsed, (('route', route), ('stage', name)))
+            timings = getattr(self.local, 'timings', None)
+            if timings is not None:
+                timings.append((name, elapsed))
+
+    def begin_request(self, route):
+        """Start collecting stage timings for a request handled by this thread"""
+        self.local.route = route
+        self.local.timings = []
+        self.local.start = time.perf_counter()
+
+    def timing_request(self):
+        """Whether this thread is inside a timed request"""
+        return getattr(self.local, 'timings', None) is not None
+
+    def end_request(self):
+        """Stop collecting; returns (total seconds, [(stage, seconds), ...])"""
+        start = getattr(self.local, 'start', None)
+        timings = getattr(self.local, 'timings', None) or []
+        self.local.route = self.local.timings = self.local.start = None
+        return (time.perf_counter() - start if start is not None else 0.0), timings
+
+    def snapshot(self):
+        """JSON-serializable copy of all values"""
+        with self.lock:
+            counters = [[name, labels, value] for (name, labels), value in self.counters.items()]
+            histograms = [[name, labels, list(values)] for (name, labels), values in self.histograms.items()]
+        gauges = [[name, labels, value] for (name, labels), value in list(self.gauges.items())]
+        return {'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+    def restore(self, snapshot):
+        """Add the counters and histograms of a snapshot (e.g. of the worker this one replaces)"""
+        with self.lock:
+            for name, labels, value in snapshot.get('counters', []):
+                key = (name, tuple(map(tuple, labels)))
+                self.counters[key] = self.counters.get(key, 0) + value
+            for name, labels, values in snapshot.get('histograms', []):
+                key = (name, tuple(map(tuple, labels)))
+                histogram = self.histograms.setdefault(key, [0] * (len(self.buckets) + 2))
+                for i, value in enumerate(values):
+                    histogram[i] += value
+
+    def render(self, snapshots=None):
+        """All metrics in the Prometheus text exposition format
+
+        ``snapshots`` is a list of (worker, snapshot) to render summed instead
+        of this process's values; gauges keep one series per worker.
+        """
+        if snapshots is None:
+            with self.lock:
+                counters = dict(self.counters)
+                histograms = {key: list(values) for key, values in self.histograms.items()}
+            gauges = dict(self.gauges)
+        else:
+            counters, gauges, histograms = {}, {}, {}
+            for worker, snapshot in snapshots:
+                for name, labels, value in snapshot['counters']:
+                    key = (name, tuple(map(tuple, labels)))
+                    counters[key] = counters.get(key, 0) + value
+                for name, labels, value in snapshot['gauges']:
+                    gauges[(name, tuple(map(tuple, labels)) + (('worker', str(worker)),))] = value
+                for name, labels, values in snapshot['histograms']:
+                    histogram = histograms.setdefault((name, tuple(map(tuple, labels))), [0] * len(values))
+                    for i, value in enumerate(values):
+                        histogram[i] += value
+
+        by_name = {}
+        for kind, series in (('counter', counters), ('gauge', gauges), ('histogram', histograms)):
+            for (name, labels), value in series.items():
+                by_name.setdefault(name, (kind, []))[1].append((labels, value))
+
+        lines = []
+        for name in sorted(by_name):
+            kind, series = by_name[name]
+            kind, text = self.descriptions.get(name, (kind, name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(series, key=lambda item: item[0]):
+                if kind != 'histogram':
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {value[-1]:.9f}")
+                lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+class MetricsDirectory:
+    """Per-worker metric snapshots in a directory shared by pre-forked workers"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def file(self, worker):
+        return os.path.join(self.path, f"worker-{worker}.json")
+
+    def write(self, worker, metrics):
+        """Atomically replace this worker's snapshot"""
+        temp_path = f"{self.file(worker)}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(metrics.snapshot(), f)
+        os.replace(temp_path, self.file(worker))
+
+    def read(self, worker):
+        try:
+            with open(self.file(worker)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def snapshots(self, workers):
+        """(worker, snapshot) for every worker that has written one"""
+        snapshots = ((worker, self.read(worker)) for worker in range(workers))
+        return [(worker, snapshot) for worker, snapshot in snapshots if snapshot is not None]
+
+def server_timing(total, timings):
+    """Server-Timing header value: one entry per stage plus the total, in ms"""
+    entries = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings]
+    entries.append(f"total;dur={total * 1000:.3f}")
+    return ', '.join(entries)
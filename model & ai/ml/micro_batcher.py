@@ -0,0 +1,114 @@
+"""
+Micro-Batching Scheduler for the Battery ML API
+Collects concurrent single-row requests into one model call
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+_STOP = object()
+
+class MicroBatcher:
+    """Run a batch predict function over rows submitted from many threads
+
+    A background thread waits for the first row, then keeps collecting rows
+    until ``window_ms`` has passed or ``max_batch_size`` rows are queued, runs
+    ``predict_fn`` once on the stacked matrix and hands each caller its row of
+    the result. A longer window or bigger batch raises throughput under load at
+    the cost of added latency per request.
+    """
+
+    def __init__(self, predict_fn, window_ms=3.0, max_batch_size=64, name='batcher'):
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.name = name
+
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+
+        self.thread = threading.Thread(target=self._run, name=f"micro-batcher-{name}")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, row, timeout=None):
+        """Queue one feature row and block until its prediction is ready
+
+        The row is converted here, in the caller's thread, so a malformed row
+        raises for its own request instead of failing the whole batch.
+        """
+        row = np.asarray(row, dtype=np.float64)
+        if row.ndim != 1:
+            raise ValueError(f"Expected one feature row, got shape {row.shape}")
+        future = Future()
+        self.queue.put((row, future))
+        return future.result(timeout)
+
+    def _collect(self):
+        """Block for the first row, then gather more until the window closes"""
+        first = self.queue.get()
+        if first is _STOP:
+            return None
+
+        items = [first]
+        deadline = time.perf_counter() + self.window
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self.queue.put(_STOP)
+                break
+            items.append(item)
+        return items
+
+    def _run(self):
+        """Background loop: collect, predict once, fan results back out"""
+        while True:
+            items = self._collect()
+            if items is None:
+                return
+
+            try:
+                features = np.stack([row for row, _ in items])
+                predictions = self.predict_fn(features)
+                for (_, future), prediction in zip(items, predictions):
+                    future.set_result(prediction)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+            with self.lock:
+                self.batches += 1
+                self.rows += len(items)
+                self.largest_batch = max(self.largest_batch, len(items))
+
+    def stats(self):
+        """Return batching counters for /health"""
+        with self.lock:
+            return {
+                'window_ms': round(self.window * 1000, 3),
+                'max_batch_size': self.max_batch_size,
+                'batches': self.batches,
+                'rows': self.rows,
+                'avg_batch_size': round(self.rows / self.batches, 2) if self.batches else 0,
+                'largest_batch': self.largest_batch,
+                'queued': self.queue.qsize()
+            }
+
+    def stop(self):
+        """Stop the background thread after queued rows are served"""
+        self.queue.put(_STOP)
+        self.thread.join(timeout=5)
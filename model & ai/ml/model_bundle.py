@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Model Bundle for the Battery ML API
+All models in one versioned file of raw aligned arrays, memory-mapped on load
+
+Layout: an 8-byte magic, the format version and manifest length (two
+little-endian uint32), a JSON manifest, then the array data with every array
+starting on a 64-byte boundary. The manifest lists each model's type,
+attributes and arrays (dtype, shape, offset into the data section), plus the
+size, mtime and SHA-256 of the file it was converted from: a bundle whose
+source files changed since is not used.
+
+Loading reads the manifest and maps the file copy-on-write, so arrays are
+views of the page cache: no pickle is executed, nothing is parsed or copied,
+and pre-forked workers share the pages. The SOH forest is a CompiledForest,
+the scaler an ArrayScaler and the RUL networks RULNetwork modules.
+
+Usage:
+    python model_bundle.py models/                       # writes models/battery_models.bundle
+    python model_bundle.py --info models/battery_models.bundle
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import argparse
+import logging
+
+import numpy as np
+
+from compiled_forest import CompiledForest, load_soh_model
+from model_sources import source_info, source_changed
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FILE = 'battery_models.bundle'
+MAGIC = b'BATTBNDL'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+HEADER = struct.Struct('<II')
+
+# Bundle entry -> file it is converted from
+SOURCE_FILES = {
+    'soh': 'soh_rf_model.pkl',
+    'rul_scaler': 'rul_scaler.pkl',
+    'rul_gru': 'rul_gru.pth',
+    'rul_gru_norm': 'rul_gru_normalized.pth',
+    'rul_lstm': 'rul_lstm_model.pth',
+}
+
+def bundle_path(models_dir):
+    """Bundle used for a models directory: $BATTERY_MODEL_BUNDLE or <models_dir>/battery_models.bundle
+
+    Returns None when $BATTERY_MODEL_BUNDLE is '0' (bundle disabled).
+    """
+    path = os.environ.get('BATTERY_MODEL_BUNDLE')
+    if path == '0':
+        return None
+    return path or os.path.join(models_dir, BUNDLE_FILE)
+
+def aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+class ArrayScaler:
+    """MinMaxScaler / StandardScaler transform from plain arrays, same results as sklearn"""
+
+    def __init__(self, kind, scale, offset, clip=None):
+        self.kind = kind
+        self.scale = scale
+        self.offset = offset
+        self.clip = clip  # (low, high) for a clipping MinMaxScaler
+        self.n_features_in_ = len(scale)
+
+    @classmethod
+    def from_sklearn(cls, scaler):
+        """Parameters of a fitted MinMaxScaler or StandardScaler"""
+        name = type(scaler).__name__
+        if name == 'MinMaxScaler':
+            clip = tuple(float(v) for v in scaler.feature_range) if scaler.clip else None
+            return cls('minmax', scaler.scale_, scaler.min_, clip)
+        if name == 'StandardScaler':
+            n_features = scaler.n_features_in_
+            mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+            scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+            return cls('standard', scale, mean)
+        raise ValueError(f"Only MinMaxScaler and StandardScaler can be bundled, got {name}")
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the scaler expects {self.n_features_in_}")
+        if self.kind == 'standard':
+            X -= self.offset
+            X /= self.scale
+            return X
+        X *= self.scale
+        X += self.offset
+        if self.clip is not None:
+            np.clip(X, self.clip[0], self.clip[1], out=X)
+        return X
+
+    def to_arrays(self):
+        return {'scale': self.scale, 'offset': self.offset}
+
+    def attrs(self):
+        return {'kind': self.kind, 'clip': self.clip}
+
+def rnn_state_dict(checkpoint):
+    """RNN weights of a RUL checkpoint under their 'gru.'/'lstm.' names"""
+    if isinstance(checkpoint, dict):
+        return checkpoint
+    # Whole RULNetwork modules keep the RNN under 'rnn.'
+    cell = getattr(checkpoint, 'cell', None)
+    if cell not in ('gru', 'lstm'):
+        raise ValueError(f"Only RULNetwork checkpoints or state dicts can be bundled, got {type(checkpoint).__name__}")
+    return {(f"{cell}.{name[4:]}" if name.startswith('rnn.') else name): tensor
+            for name, tensor in checkpoint.state_dict().items()}
+
+class ModelBundle:
+    """Read-only view of a bundle file; ``load(name)`` builds a model from its arrays"""
+
+    def __init__(self, path, manifest, data):
+        self.path = path
+        self.manifest = manifest
+        self.data = data
+
+    @classmethod
+    def open(cls, path):
+        """Check the header, read the manifest and map the arrays"""
+        with open(path, 'rb') as f:
+            magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a model bundle")
+            version, manifest_size = HEADER.unpack(f.read(HEADER.size))
+            if version != FORMAT_VERSION:
+                raise ValueError(f"{path} has bundle format {version}, this code reads format {FORMAT_VERSION}")
+            manifest = json.loads(f.read(manifest_size))
+
+        # Copy-on-write mapping: writable views (torch wants them) that never touch the file
+        data_start = aligned(len(MAGIC) + HEADER.size + manifest_size)
+        data = np.memmap(path, dtype=np.uint8, mode='c', offset=data_start)
+        return cls(path, manifest, data)
+
+    def __contains__(self, name):
+        return name in self.manifest['models']
+
+    def names(self):
+        return list(self.manifest['models'])
+
+    def stale_sources(self, models_dir):
+        """Source files changed since the bundle was written
+
+        Files with their recorded size and mtime are trusted; others (e.g.
+        after a fresh checkout) are hashed.
+        """
+        stale = []
+        for name, entry in self.manifest['models'].items():
+            source = entry.get('source')
+            if not source:
+                continue
+            if source_changed(os.path.join(models_dir, source['file']), source):
+                stale.append(source['file'])
+        return stale
+
+    def arrays(self, name):
+        """Zero-copy views of a model's arrays"""
+        arrays = {}
+        for array_name, spec in self.manifest['models'][name]['arrays'].items():
+            start = spec['offset']
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            arrays[array_name] = self.data[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+        return arrays
+
+    def load(self, name):
+        """Build the model stored as ``name``"""
+        if name not in self:
+            raise KeyError(f"{name} is not in bundle {os.path.basename(self.path)}")
+        entry = self.manifest['models'][name]
+        arrays = self.arrays(name)
+        attrs = entry.get('attrs', {})
+
+        if entry['type'] == 'forest':
+            return CompiledForest.from_arrays(dict(arrays, max_depth=attrs['max_depth'],
+                                                   n_features=attrs['n_features']))
+        if entry['type'] == 'scaler':
+            clip = attrs.get('clip')
+            return ArrayScaler(attrs['kind'], arrays['scale'], arrays['offset'], tuple(clip) if clip else None)
+        if entry['type'] == 'rnn':
+            import torch
+            from rul_network import build_rul_network
+            return build_rul_network({tensor_name: torch.from_numpy(array) for tensor_name, array in arrays.items()})
+        raise ValueError(f"Unknown model type in bundle: {entry['type']}")
+
+def collect_models(models_dir):
+    """Arrays of every convertible artifact in a models directory, keyed by bundle entry"""
+    models = {}
+    for name, file_name in SOURCE_FILES.items():
+        path = os.path.join(models_dir, file_name)
+        if not os.path.exists(path):
+            print(f"⚠️ {file_name} not found, {name} left out")
+            continue
+        try:
+            if name == 'soh':
+                forest = load_soh_model(path)
+                if not isinstance(forest, CompiledForest):
+                    raise ValueError(f"{type(forest).__name__} could not be compiled")
+                arrays = forest.to_arrays()
+                attrs = {'max_depth': int(arrays.pop('max_depth')), 'n_features': int(arrays.pop('n_features'))}
+                models[name] = ('forest', arrays, attrs, path)
+            elif name == 'rul_scaler':
+                import joblib
+                scaler = ArrayScaler.from_sklearn(joblib.load(path))
+                models[name] = ('scaler', scaler.to_arrays(), scaler.attrs(), path)
+            else:
+                import torch
+                state_dict = rnn_state_dict(torch.load(path, map_location='cpu'))
+                arrays = {tensor_name: tensor.detach().cpu().numpy() for tensor_name, tensor in state_dict.items()}
+                models[name] = ('rnn', arrays, {}, path)
+        except Exception as e:
+            print(f"⚠️ {file_name} left out: {e}")
+    return models
+
+def write_bundle(path, models):
+    """Write ``{name: (type, arrays, attrs, source path)}`` as a bundle (atomically replaced)"""
+    manifest = {'format_version': FORMAT_VERSION, 'created': time.time(), 'alignment': ALIGNMENT, 'models': {}}
+    chunks, offset = [], 0
+    for name, (model_type, arrays, attrs, source) in models.items():
+        specs = {}
+        for array_name, array in arrays.items():
+            array = np.asarray(array)
+            array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+            offset = aligned(offset)
+            specs[array_name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            chunks.append((offset, array))
+            offset += array.nbytes
+        manifest['models'][name] = {'type': model_type, 'attrs': attrs, 'arrays': specs,
+                                    'source': source_info(source) if source else None}
+
+    manifest_bytes = json.dumps(manifest, indent=1).encode('utf-8')
+    data_start = aligned(len(MAGIC) + HEADER.size + len(manifest_bytes))
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC + HEADER.pack(FORMAT_VERSION, len(manifest_bytes)) + manifest_bytes)
+        for array_offset, array in chunks:
+            f.seek(data_start + array_offset)
+            f.write(array.tobytes())
+        f.truncate(data_start + aligned(offset))
+    os.replace(temp_path, path)
+    return manifest
+
+def verify(bundle, models_dir, rows=1000):
+    """Compare bundle predictions with the original artifacts; returns the failed entries"""
+    failed = []
+    rng = np.random.default_rng(0)
+    for name in bundle.names():
+        source = os.path.join(models_dir, SOURCE_FILES[name])
+        model = bundle.load(name)
+        if name == 'soh':
+            original = load_soh_model(source)
+            X = rng.normal(size=(rows, model.n_features_in_)) * 50
+            same = np.array_equal(model.predict(X), original.predict(X))
+        elif name == 'rul_scaler':
+            import joblib
+            original = joblib.load(source)
+            X = rng.normal(size=(rows, model.n_features_in_)) * 50
+            same = np.allclose(model.transform(X), original.transform(X), rtol=0, atol=1e-12)
+        else:
+            import torch
+            from rul_network import load_eager_model
+            original = load_eager_model(source)
+            X = torch.tensor(rng.normal(size=(rows, model.rnn.input_size)), dtype=torch.float32)
+            with torch.no_grad():
+                same = torch.equal(model(X), original(X))
+        print(f"{'✅' if same else '❌'} {name}")
+        if not same:
+            failed.append(name)
+    return failed
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Convert the model artifacts into one memory-mappable bundle')
+    parser.add_argument('path', help='models directory to convert (or a bundle with --info)')
+    parser.add_argument('--output', help=f"bundle path (default: <models dir>/{BUNDLE_FILE})")
+    parser.add_argument('--info', action='store_true', help='print the manifest of an existing bundle')
+    parser.add_argument('--no-verify', action='store_true', help='skip comparing predictions with the originals')
+    args = parser.parse_args()
+
+    if args.info:
+        start = time.perf_counter()
+        bundle = ModelBundle.open(args.path)
+        models = {name: bundle.load(name) for name in bundle.names()}
+        load_ms = (time.perf_counter() - start) * 1000
+        print(json.dumps(bundle.manifest, indent=2))
+        print(f"Opened and built {len(models)} models in {load_ms:.1f} ms")
+        return
+
+    output = args.output or os.path.join(args.path, BUNDLE_FILE)
+    models = collect_models(args.path)
+    if not models:
+        print("❌ No convertible models found")
+        sys.exit(1)
+    write_bundle(output, models)
+    print(f"✅ Wrote {len(models)} models ({', '.join(models)}) to {output} ({os.path.getsize(output) / 1024:.0f} KB)")
+
+    if not args.no_verify and verify(ModelBundle.open(output), args.path):
+        os.remove(output)
+        print("❌ Bundle predictions differ from the original models, bundle removed")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Model Registry for the Battery ML API
+Loads each model artifact lazily on first use and tracks load cost
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+def load_joblib(path):
+    """Load a joblib/pickle artifact"""
+    import joblib
+    return joblib.load(path)
+
+def load_forest(path):
+    """Load the SOH forest, compiled to NumPy arrays unless disabled"""
+    from compiled_forest import load_soh_model
+    return load_soh_model(path)
+
+def load_torch(path):
+    """Load a RUL torch checkpoint as a ready-to-run module"""
+    from rul_network import load_rul_model
+    return load_rul_model(path)
+
+def load_torch_eager(path):
+    """Load a RUL checkpoint as an eager module (no TorchScript), for stateful inference"""
+    from rul_network import load_eager_model
+    return load_eager_model(path)
+
+# key -> (file name, loader)
+DEFAULT_ARTIFACTS = {
+    'soh': ('soh_rf_model.pkl', load_forest),
+    'rul_gru': ('rul_gru.pth', load_torch),
+    'rul_gru_norm': ('rul_gru_normalized.pth', load_torch),
+    'rul_lstm': ('rul_lstm_model.pth', load_torch),
+    'rul_scaler': ('rul_scaler.pkl', load_joblib),
+    'rul_gru_eager': ('rul_gru.pth', load_torch_eager),
+    'rul_gru_norm_eager': ('rul_gru_normalized.pth', load_torch_eager),
+    'rul_lstm_eager': ('rul_lstm_model.pth', load_torch_eager),
+}
+
+# key -> model_bundle.py entry holding the same model
+BUNDLE_ENTRIES = {
+    'soh': 'soh',
+    'rul_gru': 'rul_gru',
+    'rul_gru_norm': 'rul_gru_norm',
+    'rul_lstm': 'rul_lstm',
+    'rul_scaler': 'rul_scaler',
+    'rul_gru_eager': 'rul_gru',
+    'rul_gru_norm_eager': 'rul_gru_norm',
+    'rul_lstm_eager': 'rul_lstm',
+}
+
+def estimate_nbytes(obj, _seen=None):
+    """Approximate memory held by a model's arrays and tensors"""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    # torch modules and tensors; frozen TorchScript keeps weights as graph constants
+    if hasattr(obj, 'state_dict') and hasattr(obj, 'parameters'):
+        tensors = list(obj.state_dict().values())
+        if not tensors and hasattr(obj, 'code_with_constants'):
+            tensors = [t for t in obj.code_with_constants[1].const_mapping.values() if hasattr(t, 'numel')]
+        return sum(t.numel() * t.element_size() for t in tensors)
+    if hasattr(obj, 'element_size') and hasattr(obj, 'numel'):
+        return obj.numel() * obj.element_size()
+
+    # numpy arrays
+    if hasattr(obj, 'nbytes') and hasattr(obj, 'dtype'):
+        return int(obj.nbytes)
+
+    # sklearn trees keep their arrays behind tree_.__getstate__()
+    if hasattr(obj, 'tree_') and hasattr(obj.tree_, '__getstate__'):
+        state = obj.tree_.__getstate__()
+        return sum(int(v.nbytes) for v in state.values() if hasattr(v, 'nbytes'))
+
+    if isinstance(obj, dict):
+        return sum(estimate_nbytes(v, _seen) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_nbytes(v, _seen) for v in obj)
+    if hasattr(obj, '__dict__'):
+        return sum(estimate_nbytes(v, _seen) for v in vars(obj).values())
+    return sys.getsizeof(obj)
+
+class ModelRegistry:
+    """Dict-like view of the model artifacts that loads each one on first access
+
+    ``registry['rul_gru']`` loads the artifact once (thread-safe) and caches it.
+    A missing or broken artifact only fails the requests that need it, so the
+    server starts even when some files are absent. Models found in the
+    directory's model bundle (see model_bundle.py) are built from its
+    memory-mapped arrays instead of their pickle/.pth files.
+    """
+
+    def __init__(self, models_dir, artifacts=None):
+        self.models_dir = models_dir
+        self.artifacts = dict(artifacts or DEFAULT_ARTIFACTS)
+        self.models = {}
+        self.info = {key: {'status': 'not_loaded'} for key in self.artifacts}
+        self.locks = {key: threading.Lock() for key in self.artifacts}
+        self.unload_listeners = []
+        self.bundle = self.open_bundle()
+
+    def open_bundle(self):
+        """The directory's model bundle, unless missing, disabled or older than its source files"""
+        from model_bundle import ModelBundle, bundle_path
+        path = bundle_path(self.models_dir)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            bundle = ModelBundle.open(path)
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring model bundle {os.path.basename(path)}: {e}")
+            return None
+        stale = bundle.stale_sources(self.models_dir)
+        if stale:
+            logger.warning(f"⚠️ Ignoring model bundle {os.path.basename(path)}, "
+                           f"changed since it was written: {', '.join(stale)}")
+            return None
+        logger.info(f"📦 Using model bundle {os.path.basename(path)} ({', '.join(bundle.names())})")
+        return bundle
+
+    def load_bundled(self, key, path):
+        """Build a model from the bundle; RUL models still prefer an exported TorchScript file"""
+        if self.artifacts[key][1] is load_torch:
+            from rul_network import load_torchscript
+            model = load_torchscript(path)
+            if model is not None:
+                return model
+        return self.bundle.load(BUNDLE_ENTRIES[key])
+
+    def path(self, key):
+        """Return the artifact path for a model key"""
+        return os.path.join(self.models_dir, self.artifacts[key][0])
+
+    def load(self, key):
+        """Load one artifact if it is not loaded yet and return it"""
+        if key not in self.artifacts:
+            raise KeyError(f"Unknown model: {key}")
+        if key in self.models:
+            return self.models[key]
+
+        with self.locks[key]:
+            if key in self.models:
+                return self.models[key]
+
+            file_name, loader = self.artifacts[key]
+            path = self.path(key)
+            bundled = self.bundle is not None and BUNDLE_ENTRIES.get(key) in self.bundle
+            if bundled:
+                file_name = f"{os.path.basename(self.bundle.path)}:{BUNDLE_ENTRIES[key]}"
+            start = time.perf_counter()
+            try:
+                model = self.load_bundled(key, path) if bundled else loader(path)
+            except Exception as e:
+                self.info[key] = {
+                    'status': 'missing' if not os.path.exists(path) else 'error',
+                    'file': file_name,
+                    'error': str(e)
+                }
+                raise RuntimeError(f"Model '{key}' could not be loaded from {file_name}: {e}") from e
+
+            load_ms = (time.perf_counter() - start) * 1000
+            memory_bytes = estimate_nbytes(model)
+            self.info[key] = {
+                'status': 'loaded',
+                'file': file_name,
+                'type': type(model).__name__,
+                'load_time_ms': round(load_ms, 2),
+                'memory_bytes': memory_bytes,
+                'loaded_at': time.time()
+            }
+            self.models[key] = model
+            logger.info(f"✅ Loaded {key} ({file_name}) in {load_ms:.1f} ms")
+            return model
+
+    def warm_up(self, keys, max_workers=4):
+        """Load several artifacts in parallel threads; failures are logged, not raised"""
+        keys = [key for key in keys if key in self.artifacts]
+        if not keys:
+            return
+
+        def load_quietly(key):
+            try:
+                self.load(key)
+            except Exception as e:
+                logger.warning(f"⚠️ Warm-up of {key} failed: {e}")
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='model-warmup') as pool:
+            list(pool.map(load_quietly, keys))
+
+    def unload(self, key=None):
+        """Drop one cached model (or all of them, re-opening the bundle) so the next access reloads it"""
+        keys = [key] if key is not None else list(self.artifacts)
+        if key is None:
+            self.bundle = self.open_bundle()
+        for k in keys:
+            with self.locks[k]:
+                self.models.pop(k, None)
+                self.info[k] = {'status': 'not_loaded'}
+            for listener in self.unload_listeners:
+                listener(k)
+
+    def add_unload_listener(self, listener):
+        """Call ``listener(key)`` whenever a model is unloaded (e.g. to drop cached predictions)"""
+        self.unload_listeners.append(listener)
+
+    def loaded_keys(self):
+        """Keys of the artifacts currently in memory"""
+        return list(self.models.keys())
+
+    def stats(self):
+        """Per-model load status, time and memory for /health"""
+        return {key: dict(info) for key, info in self.info.items()}
+
+    def __getitem__(self, key):
+        return self.load(key)
+
+    def __contains__(self, key):
+        return key in self.artifacts
+
+    def __len__(self):
+        return len(self.models)
+
+    def keys(self):
+        return self.artifacts.keys()
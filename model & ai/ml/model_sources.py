@@ -0,0 +1,47 @@
+"""
+Model Source Fingerprints
+Detect compiled model artifacts whose source checkpoint changed after export
+
+Exporters (model_bundle.py, compiled_forest.py, export_torchscript.py) record
+``source_info`` of the file they compiled; loaders skip an artifact whose
+source no longer matches and fall back to the source itself.
+"""
+
+import os
+import hashlib
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def source_info(path):
+    """Size, mtime and sha256 of a source file, recorded at export time"""
+    stat = os.stat(path)
+    return {'file': os.path.basename(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_sha256(path)}
+
+def source_changed(path, info):
+    """Whether a source file differs from its recorded ``source_info`` (False if it is gone)
+
+    Files with the recorded size and mtime are trusted; others (e.g. after a
+    fresh checkout) are hashed.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_size != info['size']:
+        return True
+    return stat.st_mtime_ns != info['mtime_ns'] and file_sha256(path) != info['sha256']
+
+def export_is_stale(export_path, source_path, info=None):
+    """Whether an export no longer matches its source: by ``info`` if recorded, else by mtime"""
+    if info is not None:
+        return source_changed(source_path, info)
+    try:
+        return os.path.getmtime(source_path) > os.path.getmtime(export_path)
+    except OSError:
+        return False
@@ -0,0 +1,161 @@
+"""
+Streaming NDJSON Ingestion for the Battery ML API
+Reads a long-lived (chunked) upload of readings in bounded micro-batches
+"""
+
+import json
+import queue
+import threading
+import time
+
+_EOF = object()
+
+class NDJSONStreamReader:
+    """Parse one JSON reading per line of a request body on a background thread
+
+    Parsed lines go into a queue of at most ``max_pending`` readings. When the
+    consumer falls behind, the reader blocks on the full queue and stops
+    reading the socket, so TCP flow control slows the client down instead of
+    the server buffering without limit. ``batches()`` yields lists of
+    ``(line number, reading or error message)``: the first pending line plus
+    whatever else arrives within ``window_ms``, up to ``max_batch_size``.
+
+    If the consumer takes nothing for ``stall_timeout`` seconds while the queue
+    is full (e.g. the client stopped reading the results), the reader gives up
+    and the thread exits instead of waiting forever; ``batches()`` then ends
+    once the queued lines are drained.
+    """
+
+    def __init__(self, stream, max_batch_size=256, window_ms=5.0, max_pending=1024, max_line_bytes=65536,
+                 stall_timeout=60.0):
+        self.stream = stream
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.window = window_ms / 1000.0
+        self.max_line_bytes = max_line_bytes
+        self.stall_timeout = stall_timeout
+
+        self.queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self.closed = threading.Event()
+        self.lines = 0
+        self.errors = 0
+        self.batches_read = 0
+        self.blocked = 0  # times the reader waited for the consumer (backpressure)
+        self.blocked_seconds = 0.0
+        self.stalled = False
+
+        self.thread = threading.Thread(target=self._run, name='ndjson-reader')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _put(self, item):
+        """Queue one item, waiting (and counting it) while the queue is full; False once closed or stalled"""
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+
+        self.blocked += 1
+        start = time.perf_counter()
+        while not self.closed.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                self.blocked_seconds += time.perf_counter() - start
+                return True
+            except queue.Full:
+                if time.perf_counter() - start > self.stall_timeout:
+                    self.stalled = True
+                    self.closed.set()
+        self.blocked_seconds += time.perf_counter() - start
+        return False
+
+    def _get(self):
+        """Next queued item, or _EOF once the reader stopped without queueing it"""
+        while True:
+            try:
+                return self.queue.get(timeout=0.1)
+            except queue.Empty:
+                if self.closed.is_set():
+                    return _EOF
+
+    def _run(self):
+        """Background loop: read lines until EOF, parse and queue them"""
+        try:
+            while not self.closed.is_set():
+                line = self.stream.readline(self.max_line_bytes + 1)
+                if not line:
+                    break
+                self.lines += 1
+                if len(line) > self.max_line_bytes and not line.endswith(b'\n'):
+                    # Skip the rest of an oversized line
+                    while line and not line.endswith(b'\n'):
+                        line = self.stream.readline(self.max_line_bytes)
+                    item = (self.lines, f"Line longer than {self.max_line_bytes} bytes")
+                else:
+                    line = line.strip()
+                    if not line:
+                        self.lines -= 1
+                        continue
+                    try:
+                        reading = json.loads(line)
+                        if not isinstance(reading, dict):
+                            raise ValueError('Expected a JSON object')
+                        item = (self.lines, reading)
+                    except ValueError as e:
+                        item = (self.lines, f"Invalid JSON: {e}")
+
+                if not isinstance(item[1], dict):
+                    self.errors += 1
+                if not self._put(item):
+                    return
+        except Exception as e:
+            self.errors += 1
+            self._put((self.lines + 1, f"Stream read error: {e}"))
+        finally:
+            self._put(_EOF)
+
+    def batches(self):
+        """Yield micro-batches of parsed lines until the body ends"""
+        while True:
+            first = self._get()
+            if first is _EOF:
+                return
+
+            items = [first]
+            deadline = time.perf_counter() + self.window
+            while len(items) < self.max_batch_size:
+                try:
+                    # Take what is already queued, then wait out the window
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self.queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if item is _EOF:
+                    self.batches_read += 1
+                    yield items
+                    return
+                items.append(item)
+
+            self.batches_read += 1
+            yield items
+
+    def close(self):
+        """Stop reading (e.g. the client went away)"""
+        self.closed.set()
+
+    def stats(self):
+        """Line, batch and backpressure counters"""
+        return {
+            'lines': self.lines,
+            'errors': self.errors,
+            'batches': self.batches_read,
+            'avg_batch_size': round(self.lines / self.batches_read, 2) if self.batches_read else 0,
+            'backpressure_waits': self.blocked,
+            'backpressure_seconds': round(self.blocked_seconds, 3),
+            'stalled': self.stalled
+        }
@@ -0,0 +1,117 @@
+"""
+Prediction Cache
+Bounded LRU + TTL cache of model outputs keyed by quantized input features
+
+Repeated readings (a parked vehicle polling every 2 s) map to the same key
+once each feature is rounded to ``resolution``, so they skip inference.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+class PredictionCache:
+    """Thread-safe LRU cache with per-entry expiry
+
+    Keys are ``(model_id, quantized features)``. ``resolution`` is one step
+    for every feature or a sequence with one step per feature position.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=300.0, resolution=0.001):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.resolution = resolution
+        self.entries = OrderedDict()  # key -> (value, expires_at)
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls, max_entries=None, ttl_seconds=None, resolution=None):
+        """Cache configured by $BATTERY_CACHE_SIZE / _TTL / _RESOLUTION (size 0 disables it)"""
+        if max_entries is None:
+            max_entries = int(os.environ.get('BATTERY_CACHE_SIZE', 10000))
+        if ttl_seconds is None:
+            ttl_seconds = float(os.environ.get('BATTERY_CACHE_TTL', 300))
+        if resolution is None:
+            resolution = float(os.environ.get('BATTERY_CACHE_RESOLUTION', 0.001))
+        if max_entries <= 0:
+            return None
+        return cls(max_entries, ttl_seconds, resolution)
+
+    def key(self, model_id, features):
+        """Cache key: model id plus each feature rounded to its resolution step"""
+        if isinstance(self.resolution, (int, float)):
+            steps = [self.resolution] * len(features)
+        else:
+            steps = self.resolution
+        return (model_id,) + tuple(int(round(float(value) / step)) for value, step in zip(features, steps))
+
+    def get(self, model_id, features):
+        """Cached value or None"""
+        key = self.key(model_id, features)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, model_id, features, value):
+        """Store a value, evicting the least recently used entries beyond max_entries"""
+        key = self.key(model_id, features)
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, model_id, features, compute):
+        """Cached value, or ``compute()`` stored under the key"""
+        value = self.get(model_id, features)
+        if value is None:
+            value = compute()
+            self.put(model_id, features, value)
+        return value
+
+    def invalidate(self, model_id=None):
+        """Drop the entries of one model (or all of them)"""
+        with self.lock:
+            if model_id is None:
+                dropped = len(self.entries)
+                self.entries.clear()
+            else:
+                keys = [key for key in self.entries if key[0] == model_id]
+                for key in keys:
+                    del self.entries[key]
+                dropped = len(keys)
+            self.invalidations += dropped
+
+    def stats(self):
+        """Hit/miss/eviction counters for /health"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'resolution': self.resolution,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
@@ -0,0 +1,235 @@
+"""
+Pre-fork Server for the Battery ML API
+Loads the models once, then forks worker processes that share them copy-on-write
+
+The parent warms up every model artifact present, moves all objects into the
+garbage collector's permanent generation (``gc.freeze()``) so collections in
+the workers do not write to, and thereby copy, the shared pages, and forks N
+workers. Model weights (NumPy forest arrays, torch tensor storage) are never
+written after loading, so they stay shared physical memory and each worker
+only pays for its own heap. Each worker serves the Flask app on its own
+SO_REUSEPORT socket (the kernel spreads new connections across them), or on
+one shared listening socket where SO_REUSEPORT is unavailable. Per-worker
+in-flight and handled counters live in shared memory and are reported by
+/health; dead workers are re-forked from the already loaded parent. /metrics
+sums the snapshots every worker writes to a shared MetricsDirectory, so a
+scrape landing on any worker returns the totals of all of them.
+
+Usage:
+    python battery_api_server.py --server prefork --workers 4
+"""
+
+import gc
+import os
+import time
+import shutil
+import signal
+import socket
+import logging
+import tempfile
+import threading
+import multiprocessing
+
+from werkzeug.serving import make_server
+from werkzeug.wsgi import ClosingIterator
+
+from metrics import MetricsDirectory
+
+logger = logging.getLogger(__name__)
+
+def memory_usage(pid):
+    """RSS, proportional (PSS) and private memory of a process in MB (Linux only)"""
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                    usage[name] = int(value.split()[0]) / 1024
+    except OSError:
+        return {}
+    return {
+        'rss_mb': round(usage.get('Rss', 0), 1),
+        'pss_mb': round(usage.get('Pss', 0), 1),
+        'private_mb': round(usage.get('Private_Clean', 0) + usage.get('Private_Dirty', 0), 1)
+    }
+
+class WorkerSlots:
+    """pid, in-flight and handled request counters of every worker, in shared memory
+
+    Each worker only writes its own slot (under a process-local lock), any
+    worker can read all of them.
+    """
+
+    FIELDS = 3
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.values = multiprocessing.Array('q', workers * self.FIELDS, lock=False)
+        self.lock = threading.Lock()
+
+    def reset(self, index, pid):
+        """Claim a slot for a newly forked worker"""
+        base = index * self.FIELDS
+        self.values[base:base + self.FIELDS] = [pid, 0, 0]
+
+    def begin(self, index):
+        with self.lock:
+            self.values[index * self.FIELDS + 1] += 1
+
+    def end(self, index):
+        with self.lock:
+            self.values[index * self.FIELDS + 1] -= 1
+            self.values[index * self.FIELDS + 2] += 1
+
+    def stats(self):
+        """Queue depth (in-flight requests), handled requests and memory per worker"""
+        workers = []
+        for index in range(self.workers):
+            pid, in_flight, handled = self.values[index * self.FIELDS:(index + 1) * self.FIELDS]
+            workers.append(dict({'worker': index, 'pid': pid, 'in_flight': in_flight, 'handled': handled},
+                                **memory_usage(pid)))
+        return workers
+
+class PreforkServer:
+    """Serve a BatteryMLAPI from ``workers`` forked processes sharing its loaded models"""
+
+    def __init__(self, api, host='127.0.0.1', port=5001, workers=None):
+        self.api = api
+        self.host = host
+        self.port = port
+        self.workers = workers or int(os.environ.get('BATTERY_API_WORKERS', os.cpu_count() or 1))
+        self.slots = WorkerSlots(self.workers)
+        self.sockets = []
+        self.children = {}  # pid -> worker index
+        self.stopping = False
+        self.metrics_dir = None
+
+    def share_metrics(self, index):
+        """Publish this worker's metrics for /metrics on every worker, continuing a replaced worker's totals"""
+        api = self.api
+        store = MetricsDirectory(self.metrics_dir)
+        previous = store.read(index)
+        if previous is not None:
+            api.metrics.restore(previous)
+
+        def flush():
+            api.refresh_metrics()
+            store.write(index, api.metrics)
+
+        def flush_periodically():
+            while True:
+                time.sleep(1.0)
+                try:
+                    flush()
+                except Exception as e:
+                    logger.warning(f"⚠️ Worker {index} could not write its metrics: {e}")
+
+        def snapshots():
+            flush()
+            return store.snapshots(self.workers)
+
+        api.metrics_snapshots = snapshots
+        threading.Thread(target=flush_periodically, name='metrics-flush', daemon=True).start()
+
+    def bind(self):
+        """One SO_REUSEPORT listening socket per worker, or one shared socket"""
+        reuse_port = hasattr(socket, 'SO_REUSEPORT')
+        for _ in range(self.workers if reuse_port else 1):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if reuse_port:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.bind((self.host, self.port))
+            sock.listen(128)
+            sock.set_inheritable(True)
+            self.sockets.append(sock)
+
+    def load(self):
+        """Load every available model in the parent and freeze the heap before forking"""
+        models = self.api.models
+        available = [key for key in models.keys() if os.path.exists(models.path(key))]
+        start = time.perf_counter()
+        models.warm_up(available)
+        logger.info(f"📦 Parent loaded {len(models)} models in {(time.perf_counter() - start) * 1000:.0f} ms "
+                    f"({memory_usage(os.getpid()).get('rss_mb', '?')} MB RSS), shared with {self.workers} workers")
+        gc.collect()
+        gc.freeze()
+
+    def spawn(self, index):
+        """Fork one worker for slot ``index``"""
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self.run_worker(index)
+            finally:
+                os._exit(0)
+        self.slots.reset(index, pid)
+        self.children[pid] = index
+
+    def run_worker(self, index):
+        """Worker process: serve requests on this worker's socket until terminated"""
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // self.workers))
+
+        api = self.api
+        if api.micro_batching:
+            # Batcher threads do not survive fork
+            api.setup_batchers()
+        api.server_info = lambda: {'mode': 'prefork', 'worker': index, 'workers': self.slots.stats()}
+        if api.metrics.enabled:
+            self.share_metrics(index)
+
+        slots = self.slots
+        wsgi_app = api.app.wsgi_app
+
+        def counted_app(environ, start_response):
+            slots.begin(index)
+            try:
+                return ClosingIterator(wsgi_app(environ, start_response), lambda: slots.end(index))
+            except Exception:
+                slots.end(index)
+                raise
+
+        sock = self.sockets[index % len(self.sockets)]
+        server = make_server(self.host, self.port, counted_app, threaded=True, fd=sock.fileno())
+        server.serve_forever()
+
+    def stop(self, signum=None, frame=None):
+        """Terminate the workers (signal handler in the parent)"""
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def serve(self):
+        """Bind, load, fork the workers and re-fork any that exit until stopped"""
+        self.bind()
+        self.load()
+        self.metrics_dir = tempfile.mkdtemp(prefix='battery-api-metrics-')
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for index in range(self.workers):
+            self.spawn(index)
+        logger.info(f"🍴 {self.workers} workers serving on {self.host}:{self.port} "
+                    f"({'SO_REUSEPORT' if len(self.sockets) > 1 else 'shared socket'})")
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            index = self.children.pop(pid, None)
+            if index is not None and not self.stopping:
+                logger.warning(f"⚠️ Worker {index} (pid {pid}) exited with status {status}, restarting")
+                self.spawn(index)
+
+        for sock in self.sockets:
+            sock.close()
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
@@ -0,0 +1,147 @@
+"""
+On-demand Profiling for the Battery ML API and the Flexi-EV Dashboard
+CPU profiles of a live process without restarting it, enabled by $BATTERY_PROFILING=1
+
+Two surfaces are added to a Flask app by ``install_profiling``:
+
+- ``GET /admin/profile?seconds=N`` samples the stacks of every thread in the
+  process every few milliseconds for N seconds and returns them as collapsed
+  stacks (one ``frame;frame;frame count`` line per distinct stack, the input
+  of flamegraph.pl and speedscope), or with ``format=top`` a table of the
+  functions seen most often.
+- ``?profile=1`` on any request runs that single request under cProfile and
+  returns the profile instead of the response: a pstats table (sorted by
+  ``sort=``, cumulative time by default), or with ``profile_format=pstats`` a
+  binary dump to open with ``pstats.Stats``.
+
+When the flag is off nothing is registered, so requests pay nothing.
+"""
+
+import os
+import sys
+import io
+import time
+import marshal
+import pstats
+import cProfile
+import threading
+from collections import Counter
+
+from flask import request, g, Response, jsonify
+
+# Longest sampling window accepted by /admin/profile
+MAX_PROFILE_SECONDS = 60
+
+def profiling_enabled():
+    """Whether $BATTERY_PROFILING turns the profiling endpoints on"""
+    return os.environ.get('BATTERY_PROFILING', '0') == '1'
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Periodic sampler of all thread stacks, aggregated as collapsed stacks"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.labels = {}  # code object -> label, so each frame is formatted once
+
+    def sample(self, ignore=()):
+        """Record the current stack of every thread not in ``ignore``"""
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id in ignore:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = self.labels.get(code)
+                if label is None:
+                    label = self.labels[code] = frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, seconds, ignore=()):
+        """Sample for ``seconds`` from the calling thread"""
+        ignore = set(ignore) | {threading.get_ident()}
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            self.sample(ignore)
+            time.sleep(self.interval)
+        return self
+
+    def collapsed(self):
+        """Collapsed stacks, most frequent first"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, limit=40):
+        """Functions by samples on top of the stack (self) and anywhere in it (total)"""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        thread_samples = sum(self.stacks.values()) or 1
+        lines = [f"{self.samples} samples of {thread_samples} thread stacks, every {self.interval * 1000:g} ms",
+                 f"{'self %':>8} {'total %':>8}  function"]
+        for label, count in total.most_common(limit):
+            lines.append(f"{own[label] / thread_samples * 100:>8.1f} {count / thread_samples * 100:>8.1f}  {label}")
+        return '\n'.join(lines) + '\n'
+
+def install_profiling(app, enabled=None):
+    """Register /admin/profile and ?profile=1 on a Flask app if profiling is enabled"""
+    if enabled is None:
+        enabled = profiling_enabled()
+    if not enabled:
+        return False
+
+    sampling = threading.Lock()
+
+    @app.route('/admin/profile', methods=['GET'])
+    def admin_profile():
+        """Sample every thread of this process for ?seconds=N"""
+        try:
+            seconds = float(request.args.get('seconds', 10))
+            interval = float(request.args.get('interval_ms', 5)) / 1000
+        except ValueError:
+            return jsonify({'error': 'seconds and interval_ms must be numbers'}), 400
+        if not 0 < seconds <= MAX_PROFILE_SECONDS or interval <= 0:
+            return jsonify({'error': f"seconds must be in (0, {MAX_PROFILE_SECONDS}] and interval_ms positive"}), 400
+        if not sampling.acquire(blocking=False):
+            return jsonify({'error': 'A profile is already being taken'}), 409
+        try:
+            sampler = StackSampler(interval).run(seconds)
+        finally:
+            sampling.release()
+        if request.args.get('format', 'collapsed') == 'top':
+            return Response(sampler.top(), mimetype='text/plain')
+        return Response(sampler.collapsed(), mimetype='text/plain')
+
+    @app.before_request
+    def start_request_profile():
+        if request.args.get('profile') == '1':
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def finish_request_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        stats = pstats.Stats(profiler)
+        if request.args.get('profile_format') == 'pstats':
+            return Response(marshal.dumps(stats.stats), mimetype='application/octet-stream',
+                            headers={'Content-Disposition': 'attachment; filename=request.pstats'})
+        output = io.StringIO()
+        stats.stream = output
+        sort = request.args.get('sort', 'cumulative')
+        stats.sort_stats(sort if sort in stats.sort_arg_dict_default else 'cumulative').print_stats(60)
+        return Response(f"{request.method} {request.path} -> {response.status}\n{output.getvalue()}",
+                        mimetype='text/plain')
+
+    return True
@@ -2,13 +2,24 @@
 """
 Quick ML Prediction Script for SmartEV Battery Twin
 Called by Express server every 2 seconds
+
+Usage:
+    python quick_predict.py '{"voltage": 3.7, ...}'   # one-shot prediction
+    python quick_predict.py --serve                   # NDJSON worker on stdin/stdout
+    python quick_predict.py --socket /tmp/qp.sock     # NDJSON worker on a Unix socket
 """
 
 import sys
 import json
 import os
+import argparse
+import random
+import time
+import socketserver
+import threading
 import warnings
-import numpy as np
+
+from prediction_cache import PredictionCache
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
@@ -16,17 +27,27 @@ warnings.filterwarnings("ignore")
 def load_models():
     """Load ML models quickly"""
     try:
-        import torch
-        import joblib
-        
         script_dir = os.path.dirname(os.path.abspath(__file__))
         models_dir = os.path.join(script_dir, 'models')
         
-        # Load SOH model
-        soh_model = joblib.load(os.path.join(models_dir, 'soh_rf_model.pkl'))
+        # Prefer the memory-mapped model bundle (no pickle, no sklearn import)
+        bundle = load_bundle(models_dir)
+        if bundle is not None:
+            from rul_network import load_torchscript
+            rul_model = load_torchscript(os.path.join(models_dir, 'rul_gru.pth'))
+            if rul_model is None:
+                rul_model = bundle.load('rul_gru')
+            return bundle.load('soh'), rul_model, bundle.load('rul_scaler')
+        
+        import joblib
+        
+        # Load SOH model (compiled to NumPy arrays)
+        from compiled_forest import load_soh_model
+        soh_model = load_soh_model(os.path.join(models_dir, 'soh_rf_model.pkl'))
         
         # Load RUL model (use GRU)
-        rul_model = torch.load(os.path.join(models_dir, 'rul_gru.pth'), map_location='cpu')
+        from rul_network import load_rul_model
+        rul_model = load_rul_model(os.path.join(models_dir, 'rul_gru.pth'))
         
         # Load scaler
         scaler = joblib.load(os.path.join(models_dir, 'rul_scaler.pkl'))
@@ -35,16 +56,61 @@ def load_models():
     except Exception as e:
         return None, None, None
 
+def load_bundle(models_dir):
+    """The model bundle holding all three models, if present and up to date"""
+    from model_bundle import ModelBundle, bundle_path
+    path = bundle_path(models_dir)
+    if path is None or not os.path.exists(path):
+        return None
+    bundle = ModelBundle.open(path)
+    if any(name not in bundle for name in ('soh', 'rul_gru', 'rul_scaler')) or bundle.stale_sources(models_dir):
+        return None
+    return bundle
+
+# Models are loaded once per process and reused by every prediction
+_models = None
+_models_lock = threading.Lock()
+
+# A failed load is retried after this many seconds; predictions use the fallback meanwhile
+MODEL_RETRY_SECONDS = 30.0
+_models_retry_at = 0.0
+
+def get_models():
+    """Return the process-wide models, loading them on first use (None, None, None if unavailable)"""
+    global _models, _models_retry_at
+    if _models is None and time.monotonic() >= _models_retry_at:
+        with _models_lock:
+            if _models is None and time.monotonic() >= _models_retry_at:
+                models = load_models()
+                if models[0] is None:
+                    _models_retry_at = time.monotonic() + MODEL_RETRY_SECONDS
+                else:
+                    _models = models
+    return _models if _models is not None else (None, None, None)
+
+# Model outputs for repeated readings; fallback estimates are never cached
+_prediction_cache = PredictionCache.from_env()
+
 def predict_battery(voltage, current, temperature, soc):
     """Make quick predictions"""
+    features = (voltage, current, temperature, soc)
+    if _prediction_cache is not None:
+        cached = _prediction_cache.get('soh_rul', features)
+        if cached is not None:
+            return dict(cached)
+    
     try:
-        soh_model, rul_model, scaler = load_models()
+        soh_model, rul_model, scaler = get_models()
         
         if soh_model is None:
             # Fallback calculation
             soh = 90 - (abs(temperature - 25) * 0.2) - (abs(voltage - 3.7) * 5)
-            rul = soh * 15 + np.random.uniform(100, 200)
+            rul = soh * 15 + random.uniform(100, 200)
         else:
+            # numpy and torch are already loaded by the models, only fetched here
+            import numpy as np
+            import torch
+            
             # SOH prediction
             soh_features = np.array([[voltage, current, temperature, 2.5, 150]])
             soh = float(soh_model.predict(soh_features)[0])
@@ -54,7 +120,6 @@ def predict_battery(voltage, current, temperature, soc):
             rul_features = np.array([[voltage, current, temperature, soc, soh]])
             scaled_features = scaler.transform(rul_features)
             
-            import torch
             tensor_features = torch.tensor(scaled_features, dtype=torch.float32)
             rul_model.eval()
             
@@ -62,6 +127,9 @@ def predict_battery(voltage, current, temperature, soc):
                 rul_prediction = rul_model(tensor_features)
                 rul = float(rul_prediction.item())
                 rul = max(100, min(2000, rul))
+            
+            if _prediction_cache is not None:
+                _prediction_cache.put('soh_rul', features, {'soh': round(soh, 1), 'rul': round(rul, 0), 'success': True})
         
         return {
             'soh': round(soh, 1),
@@ -71,8 +139,8 @@ def predict_battery(voltage, current, temperature, soc):
         
     except Exception as e:
         # Fallback calculation on any error
-        soh = 85 + np.random.uniform(-5, 5)
-        rul = soh * 15 + np.random.uniform(100, 300)
+        soh = 85 + random.uniform(-5, 5)
+        rul = soh * 15 + random.uniform(100, 300)
         
         return {
             'soh': round(soh, 1),
@@ -81,12 +149,92 @@ def predict_battery(voltage, current, temperature, soc):
             'fallback': True
         }
 
+def handle_request(input_data):
+    """Run one prediction request and return the result dict"""
+    voltage = input_data.get('voltage', 3.7)
+    current = input_data.get('current', 2.0)
+    temperature = input_data.get('temperature', 25.0)
+    soc = input_data.get('soc', 85.0)
+    
+    return predict_battery(voltage, current, temperature, soc)
+
+def handle_line(line):
+    """Answer one NDJSON request line with one JSON response line"""
+    try:
+        input_data = json.loads(line)
+        result = handle_request(input_data)
+        
+        # Echo the request id so clients can match pipelined responses
+        if 'id' in input_data:
+            result['id'] = input_data['id']
+    except Exception as e:
+        result = {
+            'soh': 85.0,
+            'rul': 1200,
+            'success': False,
+            'error': str(e)
+        }
+    return json.dumps(result)
+
+def serve_stdio():
+    """Worker mode: one JSON request per stdin line, one JSON response per stdout line"""
+    get_models()
+    
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        sys.stdout.write(handle_line(line) + '\n')
+        sys.stdout.flush()
+
+class PredictionRequestHandler(socketserver.StreamRequestHandler):
+    """Serve NDJSON predictions for one Unix socket connection"""
+    
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            self.wfile.write((handle_line(line) + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+def serve_socket(socket_path):
+    """Worker mode: accept NDJSON connections on a Unix domain socket"""
+    get_models()
+    
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    
+    server = socketserver.ThreadingUnixStreamServer(socket_path, PredictionRequestHandler)
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description='SmartEV quick battery prediction')
+    parser.add_argument('input', nargs='?', help='JSON reading for a one-shot prediction')
+    parser.add_argument('--serve', action='store_true',
+                        help='keep models loaded and answer NDJSON requests on stdin/stdout')
+    parser.add_argument('--socket', metavar='PATH',
+                        help='keep models loaded and answer NDJSON requests on a Unix socket')
+    args = parser.parse_args()
+    
+    if args.serve:
+        serve_stdio()
+        return
+    if args.socket:
+        serve_socket(args.socket)
+        return
+    
     try:
         # Get input data from command line argument
-        if len(sys.argv) > 1:
-            input_data = json.loads(sys.argv[1])
+        if args.input:
+            input_data = json.loads(args.input)
         else:
             # Default test data
             input_data = {
@@ -96,13 +244,8 @@ def main():
                 'soc': 85.0
             }
         
-        voltage = input_data.get('voltage', 3.7)
-        current = input_data.get('current', 2.0)
-        temperature = input_data.get('temperature', 25.0)
-        soc = input_data.get('soc', 85.0)
-        
         # Make prediction
-        result = predict_battery(voltage, current, temperature, soc)
+        result = handle_request(input_data)
         
         # Output JSON result
         print(json.dumps(result))
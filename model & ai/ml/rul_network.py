@@ -0,0 +1,121 @@
+"""
+RUL Recurrent Network Definition
+Rebuilds the GRU/LSTM RUL models from their saved state dicts
+"""
+
+import os
+import json
+import logging
+
+import torch
+from torch import nn
+
+from model_sources import export_is_stale
+
+logger = logging.getLogger(__name__)
+
+class RULNetwork(nn.Module):
+    """Stacked GRU/LSTM followed by a linear head, as saved in models/rul_*.pth
+
+    Accepts a (batch, features) matrix, treated as a one-step sequence, or a
+    (batch, steps, features) tensor, and returns one RUL value per row.
+    """
+
+    def __init__(self, cell='gru', input_size=4, hidden_size=64, num_layers=2):
+        super().__init__()
+        self.cell = cell
+        rnn_class = nn.GRU if cell == 'gru' else nn.LSTM
+        self.rnn = rnn_class(input_size, hidden_size, num_layers=num_layers, batch_first=True)
+        self.fc = nn.Linear(hidden_size, 1)
+
+    def forward(self, x):
+        if x.dim() == 2:
+            x = x.unsqueeze(1)
+        out, _ = self.rnn(x)
+        return self.fc(out[:, -1, :])
+
+    def initial_state(self, batch_size=1):
+        """Zero hidden state for ``batch_size`` sequences ((h, c) for an LSTM)"""
+        h = torch.zeros(self.rnn.num_layers, batch_size, self.rnn.hidden_size)
+        return (h, torch.zeros_like(h)) if self.cell == 'lstm' else h
+
+    def step(self, x, state):
+        """Advance ``state`` by one (batch, features) reading; returns (RUL per row, new state)"""
+        out, state = self.rnn(x.unsqueeze(1), state)
+        return self.fc(out[:, -1, :]), state
+
+    def load_checkpoint_state(self, state_dict):
+        """Load a checkpoint whose RNN weights are stored under 'gru.' or 'lstm.'"""
+        renamed = {}
+        for name, tensor in state_dict.items():
+            prefix, _, rest = name.partition('.')
+            renamed[f"rnn.{rest}" if prefix in ('gru', 'lstm') else name] = tensor
+        self.load_state_dict(renamed)
+        return self
+
+def build_rul_network(state_dict):
+    """Create a RULNetwork whose shape matches a saved state dict"""
+    cell = 'lstm' if any(name.startswith('lstm.') for name in state_dict) else 'gru'
+    weight_ih = state_dict[f"{cell}.weight_ih_l0"]
+    weight_hh = state_dict[f"{cell}.weight_hh_l0"]
+    num_layers = len([name for name in state_dict if name.startswith(f"{cell}.weight_ih_l")])
+
+    network = RULNetwork(
+        cell=cell,
+        input_size=weight_ih.shape[1],
+        hidden_size=weight_hh.shape[1],
+        num_layers=num_layers
+    )
+    network.load_checkpoint_state(state_dict)
+    return network.eval()
+
+def compiled_path(path, quantized=False):
+    """Path of the TorchScript artifact exported next to a .pth checkpoint"""
+    stem = os.path.splitext(path)[0]
+    return f"{stem}.int8.ts.pt" if quantized else f"{stem}.ts.pt"
+
+def load_eager_model(path):
+    """Load a RUL checkpoint, rebuilding the module when it was saved as a state dict"""
+    checkpoint = torch.load(path, map_location='cpu')
+    if isinstance(checkpoint, dict):
+        return build_rul_network(checkpoint)
+    return checkpoint
+
+def load_torchscript(path, torchscript=None):
+    """Load the TorchScript export of a .pth checkpoint, or None when there is none
+
+    ``torchscript`` (default: $BATTERY_TORCHSCRIPT or 'auto') is 'auto' to use
+    ``<name>.ts.pt``, 'int8' to prefer the quantized ``<name>.int8.ts.pt``, or
+    'off' to always run the eager checkpoint. An export made from an older
+    version of the checkpoint is skipped.
+    """
+    if torchscript is None:
+        torchscript = os.environ.get('BATTERY_TORCHSCRIPT', 'auto')
+
+    candidates = []
+    if torchscript == 'int8':
+        candidates.append(compiled_path(path, quantized=True))
+    if torchscript in ('auto', 'int8'):
+        candidates.append(compiled_path(path))
+
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            try:
+                extra_files = {'source.json': ''}
+                model = torch.jit.load(candidate, map_location='cpu', _extra_files=extra_files)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not load {os.path.basename(candidate)}, falling back: {e}")
+                continue
+            source = json.loads(extra_files['source.json']) if extra_files['source.json'] else None
+            if not export_is_stale(candidate, path, source):
+                return model
+            logger.warning(f"⚠️ {os.path.basename(candidate)} is older than {os.path.basename(path)}, "
+                           f"skipped (re-run export_torchscript.py to update it)")
+    return None
+
+def load_rul_model(path, torchscript=None):
+    """Load a RUL model, preferring an exported TorchScript artifact when present"""
+    model = load_torchscript(path, torchscript)
+    if model is not None:
+        return model
+    return load_eager_model(path)
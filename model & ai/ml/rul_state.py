@@ -0,0 +1,150 @@
+"""
+Stateful RUL Inference
+Keeps each battery's GRU/LSTM hidden state between readings
+
+The stateless routes run every reading as a one-step sequence from an empty
+hidden state. Here each new reading advances the battery's stored state by
+one step, so the prediction reflects the battery's history at O(1) cost per
+reading instead of replaying a window.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+class RULStateStore:
+    """Bounded per-battery hidden states for the RUL networks
+
+    Entries are keyed by ``(model key, battery id)`` in least recently used
+    order. Batteries idle for more than ``idle_seconds``, or beyond
+    ``max_batteries``, are evicted and start again from a zero state.
+    """
+
+    def __init__(self, max_batteries=10000, idle_seconds=3600.0):
+        self.max_batteries = max_batteries
+        self.idle_seconds = idle_seconds
+        self.entries = OrderedDict()  # key -> [state, steps, last_seen]
+        self.lock = threading.Lock()
+
+        self.steps = 0
+        self.created = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.resets = 0
+
+    @classmethod
+    def from_env(cls, max_batteries=None, idle_seconds=None):
+        """Store configured by $BATTERY_RUL_STATE_SIZE / $BATTERY_RUL_STATE_IDLE"""
+        if max_batteries is None:
+            max_batteries = int(os.environ.get('BATTERY_RUL_STATE_SIZE', 10000))
+        if idle_seconds is None:
+            idle_seconds = float(os.environ.get('BATTERY_RUL_STATE_IDLE', 3600))
+        return cls(max_batteries, idle_seconds)
+
+    @staticmethod
+    def stack(states):
+        """Join single-sequence states along the batch dimension"""
+        import torch
+        if isinstance(states[0], tuple):
+            return tuple(torch.cat(parts, dim=1) for parts in zip(*states))
+        return torch.cat(states, dim=1)
+
+    @staticmethod
+    def select(state, i):
+        """Copy of sequence ``i`` of a batched state"""
+        if isinstance(state, tuple):
+            return tuple(part[:, i:i + 1].clone() for part in state)
+        return state[:, i:i + 1].clone()
+
+    def _entry(self, key, model, now):
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = [model.initial_state(), 0, now]
+            self.entries[key] = entry
+            self.created += 1
+        else:
+            self.entries.move_to_end(key)
+        return entry
+
+    def _expire(self, now):
+        """Drop states not advanced for idle_seconds (oldest first)"""
+        while self.entries:
+            key, entry = next(iter(self.entries.items()))
+            if now - entry[2] <= self.idle_seconds:
+                break
+            del self.entries[key]
+            self.expirations += 1
+
+    def step(self, model_key, model, battery_ids, scaled_features):
+        """Advance each battery's state by its (scaled) reading
+
+        ``model`` is an eager RULNetwork (TorchScript exports only keep the
+        stateless forward). Readings are processed in input order; several
+        batteries are stepped in one forward pass, and a battery appearing
+        more than once is stepped once per reading. Returns (RUL values,
+        steps so far).
+        """
+        if not hasattr(model, 'step'):
+            raise ValueError(f"{type(model).__name__} has no step(); stateful RUL needs a RULNetwork checkpoint")
+        import torch
+        features = torch.tensor(np.asarray(scaled_features), dtype=torch.float32)
+        rul_values = np.empty(len(battery_ids), dtype=np.float64)
+        step_counts = np.empty(len(battery_ids), dtype=np.int64)
+
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+
+            pending = list(range(len(battery_ids)))
+            while pending:
+                # Each pass steps every battery at most once, earliest reading first
+                rows, later, seen = [], [], set()
+                for i in pending:
+                    (later if battery_ids[i] in seen else rows).append(i)
+                    seen.add(battery_ids[i])
+
+                entries = [self._entry((model_key, battery_ids[i]), model, now) for i in rows]
+                with torch.no_grad():
+                    values, state = model.step(features[rows], self.stack([entry[0] for entry in entries]))
+                values = values.reshape(-1).numpy()
+
+                for j, (i, entry) in enumerate(zip(rows, entries)):
+                    entry[0] = self.select(state, j)
+                    entry[1] += 1
+                    entry[2] = now
+                    rul_values[i] = values[j]
+                    step_counts[i] = entry[1]
+                pending = later
+
+            self.steps += len(battery_ids)
+            while len(self.entries) > self.max_batteries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+        return rul_values, step_counts
+
+    def reset(self, battery_id=None, model_key=None):
+        """Drop the state of one battery and/or model (everything if both are None)"""
+        with self.lock:
+            keys = [key for key in self.entries
+                    if (model_key is None or key[0] == model_key) and (battery_id is None or key[1] == battery_id)]
+            for key in keys:
+                del self.entries[key]
+            self.resets += len(keys)
+        return len(keys)
+
+    def stats(self):
+        """Tracked batteries and eviction counters for /health"""
+        return {
+            'batteries': len(self.entries),
+            'max_batteries': self.max_batteries,
+            'idle_seconds': self.idle_seconds,
+            'steps': self.steps,
+            'created': self.created,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'resets': self.resets
+        }
@@ -0,0 +1,242 @@
+"""
+Binary Telemetry Log
+Memory-mapped ring buffer of fixed-size battery readings
+
+File layout:
+    header (256 bytes): magic, version, record size, capacity, write count,
+                        trip start time, trip name
+    records:            capacity x RECORD_DTYPE, written round-robin
+
+Each record carries its own sequence number and the header's write count is
+updated only after the record is in place, so a reader never sees a
+half-written file and can drop any record the writer lapped while it read.
+"""
+
+import os
+import mmap
+import struct
+import time
+from datetime import datetime
+
+import numpy as np
+
+MAGIC = b'EVTLOG01'
+VERSION = 1
+HEADER_SIZE = 256
+HEADER_FORMAT = '<8sIIQQd128s'  # magic, version, record_size, capacity, count, start_time, name
+COUNT_OFFSET = struct.calcsize('<8sIIQ')
+
+DEFAULT_LOG_FILE = 'live_trip_data.evlog'
+DEFAULT_RETENTION = 100000  # ~55 hours of readings at one every 2 seconds
+
+PHASES = ['highway', 'city', 'parking', 'charging']
+CLASSIFICATIONS = ['Excellent', 'Good', 'Fair', 'Poor']
+
+RECORD_DTYPE = np.dtype([
+    ('seq', '<u8'),
+    ('timestamp', '<f8'),
+    ('reading_number', '<u4'),
+    ('cycle_count', '<u4'),
+    ('voltage', '<f4'),
+    ('current', '<f4'),
+    ('temperature', '<f4'),
+    ('soc', '<f4'),
+    ('soh', '<f4'),
+    ('rul', '<f4'),
+    ('phase', 'u1'),
+    ('classification', 'u1'),
+    ('_pad', 'V6'),
+])
+
+def _code(values, value):
+    """Index of a category, or 255 when unknown"""
+    return values.index(value) if value in values else 255
+
+class TelemetryLog:
+    """Append-only ring buffer of readings backed by a memory-mapped file
+
+    Open with ``writable=True`` (the simulator) to create or continue a log
+    holding the last ``capacity`` readings, or read-only (the dashboard) to map
+    an existing log and read the latest records without parsing anything.
+    """
+
+    def __init__(self, path, capacity=DEFAULT_RETENTION, writable=False, name='Live Highway Trip'):
+        self.path = path
+        self.writable = writable
+
+        if writable:
+            self._open_for_write(capacity, name)
+        else:
+            self._open_for_read()
+
+        self.records = np.frombuffer(self.mmap, dtype=RECORD_DTYPE, count=self.capacity, offset=HEADER_SIZE)
+
+    def _open_for_write(self, capacity, name):
+        size = HEADER_SIZE + capacity * RECORD_DTYPE.itemsize
+        existing = self._read_header_from_file() if os.path.exists(self.path) else None
+
+        # Continue an existing log with the same shape, otherwise start fresh.
+        # The new file is swapped in whole so open readers keep a valid mapping
+        if existing is None or existing['capacity'] != capacity:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.truncate(size)
+                f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, RECORD_DTYPE.itemsize, capacity,
+                                    0, time.time(), name.encode('utf-8')[:128]))
+            os.replace(tmp_path, self.path)
+
+        self.file = open(self.path, 'r+b')
+        self.mmap = mmap.mmap(self.file.fileno(), size)
+        self._load_header()
+
+    def _open_for_read(self):
+        self.file = open(self.path, 'rb')
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._load_header()
+
+    def _read_header_from_file(self):
+        with open(self.path, 'rb') as f:
+            raw = f.read(HEADER_SIZE)
+        if len(raw) < HEADER_SIZE:
+            return None
+        header = self._parse_header(raw)
+        if header['magic'] != MAGIC or header['record_size'] != RECORD_DTYPE.itemsize:
+            return None
+        return header
+
+    @staticmethod
+    def _parse_header(raw):
+        magic, version, record_size, capacity, count, start_time, name = struct.unpack_from(HEADER_FORMAT, raw)
+        return {
+            'magic': magic,
+            'version': version,
+            'record_size': record_size,
+            'capacity': capacity,
+            'count': count,
+            'start_time': start_time,
+            'name': name.rstrip(b'\0').decode('utf-8', 'replace')
+        }
+
+    def _load_header(self):
+        header = self._parse_header(self.mmap[:HEADER_SIZE])
+        if header['magic'] != MAGIC or header['record_size'] != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{self.path} is not a telemetry log (version {VERSION})")
+        self.capacity = header['capacity']
+        self.start_time = header['start_time']
+        self.name = header['name']
+
+    @property
+    def count(self):
+        """Total readings ever appended (the newest has seq == count - 1)"""
+        return struct.unpack_from('<Q', self.mmap, COUNT_OFFSET)[0]
+
+    def append(self, reading):
+        """Write one reading dict (live_simulator format) as the next record"""
+        seq = self.count
+        timestamp = reading.get('timestamp')
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp).timestamp()
+
+        self.records[seq % self.capacity] = (
+            seq,
+            timestamp if timestamp is not None else time.time(),
+            reading.get('reading_number', seq + 1),
+            reading.get('cycle_count', 0),
+            reading.get('voltage', 0.0),
+            reading.get('current', 0.0),
+            reading.get('temperature', 0.0),
+            reading.get('soc', 0.0),
+            reading.get('soh', 0.0),
+            reading.get('rul', 0.0),
+            _code(PHASES, reading.get('trip_phase')),
+            _code(CLASSIFICATIONS, reading.get('classification')),
+            b''
+        )
+
+        # Publish the record by bumping the count last
+        struct.pack_into('<Q', self.mmap, COUNT_OFFSET, seq + 1)
+
+    def read_latest(self, n=None):
+        """Return a copy of the latest ``n`` records (all retained ones by default), oldest first
+
+        The records are copied out of the mapped file first and validated
+        afterwards: a record is kept only if the copy still holds the sequence
+        number asked for and the writer, by the header count read again after
+        the copy, cannot have started overwriting its slot during the copy.
+        """
+        count = self.count
+        available = min(count, self.capacity)
+        n = available if n is None else min(n, available)
+        if n <= 0:
+            return self.records[:0].copy()
+
+        first_seq = count - n
+        start = first_seq % self.capacity
+        if start + n <= self.capacity:
+            latest = self.records[start:start + n].copy()
+        else:
+            latest = np.concatenate([self.records[start:], self.records[:start + n - self.capacity]])
+
+        # The writer may be filling the slot of seq count_after - capacity, and
+        # has already replaced every slot before it
+        count_after = self.count
+        expected = np.arange(first_seq, count, dtype=np.uint64)
+        valid = (latest['seq'] == expected) & (expected + self.capacity > count_after)
+        return latest if valid.all() else latest[valid]
+
+    def close(self):
+        """Flush and unmap the file"""
+        self.records = None
+        if self.writable:
+            self.mmap.flush()
+        self.mmap.close()
+        self.file.close()
+
+def log_version(path):
+    """(inode, write count) of a log from its header alone, to detect new readings cheaply"""
+    with open(path, 'rb') as f:
+        inode = os.fstat(f.fileno()).st_ino
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE or raw[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a telemetry log (version {VERSION})")
+    return inode, struct.unpack_from('<Q', raw, COUNT_OFFSET)[0]
+
+def records_to_readings(records):
+    """Convert records to the reading dicts used by live_trip_data.json"""
+    readings = []
+    for record in records.tolist():
+        (seq, timestamp, reading_number, cycle_count, voltage, current,
+         temperature, soc, soh, rul, phase, classification, _) = record
+        soh = round(soh, 1)
+        readings.append({
+            'reading_number': reading_number,
+            'timestamp': datetime.fromtimestamp(timestamp).isoformat(),
+            'voltage': round(voltage, 2),
+            'current': round(current, 1),
+            'temperature': round(temperature, 1),
+            'cycle_count': cycle_count,
+            'soc': round(soc, 1),
+            'soh': soh,
+            'rul': round(rul, 0),
+            'classification': CLASSIFICATIONS[classification] if classification < len(CLASSIFICATIONS) else None,
+            'trip_phase': PHASES[phase] if phase < len(PHASES) else 'unknown'
+        })
+    return readings
+
+def load_trip_data(path, n=None):
+    """Read a log into the live_trip_data.json structure"""
+    log = TelemetryLog(path)
+    try:
+        readings = records_to_readings(log.read_latest(n))
+        total = log.count
+    finally:
+        log.close()
+
+    return {
+        'name': log.name,
+        'start_time': datetime.fromtimestamp(log.start_time).isoformat(),
+        'readings': readings,
+        'last_updated': readings[-1]['timestamp'] if readings else None,
+        'total_readings': total,
+        'current_phase': readings[-1]['trip_phase'] if readings else None
+    }
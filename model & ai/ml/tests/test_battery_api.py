@@ -0,0 +1,20 @@
+"""Request validation of the Battery ML API (no models are loaded)"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battery_api_server import BatteryMLAPI
+
+@pytest.fixture(scope='module')
+def client():
+    return BatteryMLAPI(warmup_models=[]).app.test_client()
+
+@pytest.mark.parametrize('percentiles', [[5, 'a'], [50, 150], [-5], '50', []])
+def test_fleet_simulation_rejects_bad_percentiles(client, percentiles):
+    response = client.post('/simulate/fleet', json={'trips': 10, 'percentiles': percentiles})
+    assert response.status_code == 400
+    assert 'percentiles' in response.get_json()['error']
@@ -0,0 +1,35 @@
+"""Re-ingesting battery data must not duplicate cycles"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battery_store import BatteryStore, COLUMNS
+
+def readings(battery_ids, cycles, soh):
+    columns = {name: np.zeros(len(cycles), dtype=dtype) for name, dtype in COLUMNS.items()}
+    columns.update(battery_id=np.asarray(battery_ids), cycle=np.asarray(cycles), soh=np.asarray(soh, dtype=np.float64))
+    return columns
+
+def test_ingesting_twice_keeps_one_row_per_cycle(tmp_path):
+    data = readings([1, 1, 1, 2, 2], [1, 2, 3, 1, 2], [99.0, 98.0, 97.0, 95.0, 94.0])
+    store = BatteryStore(str(tmp_path))
+    store.append(data)
+    store.append(data)
+
+    reopened = BatteryStore(str(tmp_path))
+    assert reopened.summary()['rows'] == 5
+    assert reopened.history(1)['cycle'].tolist() == [1, 2, 3]
+    assert reopened.partition(2) == {'rows': 2, 'cycle_min': 1, 'cycle_max': 2}
+
+def test_newest_row_of_a_cycle_wins(tmp_path):
+    store = BatteryStore(str(tmp_path))
+    store.append(readings([1, 1], [1, 2], [99.0, 98.0]))
+    store.append(readings([1, 1, 1], [2, 3, 3], [90.0, 89.0, 88.0]))
+
+    history = store.history(1)
+    assert history['cycle'].tolist() == [1, 2, 3]
+    assert history['soh'].tolist() == [99.0, 90.0, 88.0]
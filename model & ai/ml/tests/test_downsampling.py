@@ -0,0 +1,49 @@
+"""Extending a MultiResolutionHistory matches rebuilding it from scratch"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downsampling import MinMaxPyramid, MultiResolutionHistory
+
+def readings(start, stop, rng):
+    x = np.arange(start, stop, dtype=np.float64)
+    return x, x, {'soc': rng.normal(size=len(x)).cumsum()}
+
+def test_extended_pyramid_matches_a_fresh_one():
+    rng = np.random.default_rng(0)
+    timestamps, x, columns = readings(0, 5000, rng)
+    history = MultiResolutionHistory(timestamps, x, columns)
+    history.series('soc', None, max_points=100)  # builds the pyramid
+
+    end = 5000
+    for chunk in rng.integers(1, 900, size=40):
+        timestamps, x, new = readings(end, end + chunk, rng)
+        history.extend(timestamps, x, new, max_length=6000)
+        end += chunk
+
+        assert len(history) == min(end, 6000)
+        assert history.x[-1] == end - 1
+        fresh = MinMaxPyramid(history.x, history.columns['soc'], base=history.start)
+        extended = history.pyramids['soc']
+        for fresh_level, level in zip(fresh.levels, extended.levels):
+            size, first = fresh_level[:2]
+            # The first bucket may still hold dropped readings; every later one must match
+            offset = first - level[1] + 1
+            for fresh_values, values in zip(fresh_level[2:], level[2:]):
+                assert np.array_equal(fresh_values[1:], values[offset:]), size
+
+def test_series_of_extended_history_covers_the_retained_range():
+    rng = np.random.default_rng(1)
+    history = MultiResolutionHistory(*readings(0, 20000, rng))
+    history.series('soc', None, max_points=100)
+    history.extend(*readings(20000, 23000, rng), max_length=20000)
+
+    x, y = history.series('soc', None, max_points=100)
+    bucket = history.pyramids['soc'].levels[-1][0]
+    assert len(x) <= 2 * 100
+    assert x.min() > 3000 - bucket and x.max() > 23000 - bucket
+    assert y.max() >= history.columns['soc'].max() and y.min() <= history.columns['soc'].min()
@@ -0,0 +1,37 @@
+"""A malformed row must only fail its own request in a micro-batch"""
+
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from micro_batcher import MicroBatcher
+
+def test_bad_row_fails_only_its_own_request():
+    batcher = MicroBatcher(lambda features: features.sum(axis=1), window_ms=50, max_batch_size=16)
+    results, errors = {}, {}
+
+    def submit(i, row):
+        try:
+            results[i] = batcher.submit(row, timeout=5)
+        except Exception as e:
+            errors[i] = e
+
+    rows = {i: [3.7, 2.0, 25.0, float(i)] for i in range(8)}
+    rows[3] = [3.7, 'abc', 25.0, 3.0]
+    threads = [threading.Thread(target=submit, args=item) for item in rows.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.stop()
+
+    assert set(errors) == {3} and isinstance(errors[3], ValueError)
+    for i, row in rows.items():
+        if i != 3:
+            assert results[i] == pytest.approx(np.sum(row))
+    assert batcher.stats()['rows'] == 7
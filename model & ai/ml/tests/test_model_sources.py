@@ -0,0 +1,32 @@
+"""Compiled exports are skipped once their source checkpoint changes"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_sources import source_info, export_is_stale
+
+def write(path, data, mtime):
+    with open(path, 'wb') as f:
+        f.write(data)
+    os.utime(path, (mtime, mtime))
+
+def test_recorded_source_detects_retraining(tmp_path):
+    source, export = str(tmp_path / 'model.pth'), str(tmp_path / 'model.ts.pt')
+    write(source, b'weights v1', 1000)
+    write(export, b'compiled', 2000)
+    info = source_info(source)
+
+    write(source, b'weights v1', 3000)  # touched, same content
+    assert not export_is_stale(export, source, info)
+    write(source, b'weights v2', 3000)
+    assert export_is_stale(export, source, info)
+
+def test_exports_without_source_info_fall_back_to_mtime(tmp_path):
+    source, export = str(tmp_path / 'model.pkl'), str(tmp_path / 'model.forest.npz')
+    write(source, b'forest', 1000)
+    write(export, b'compiled', 2000)
+    assert not export_is_stale(export, source)
+    write(source, b'retrained forest', 3000)
+    assert export_is_stale(export, source)
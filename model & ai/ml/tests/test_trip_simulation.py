@@ -0,0 +1,51 @@
+"""Percentile accuracy of the Monte-Carlo trip histograms"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trip_simulation import TripHistogram, histogram_ranges, percentiles_error
+
+PERCENTILES = [5, 25, 50, 75, 95]
+
+def constant_series(n_trips, n_steps, soc, temperature, soh):
+    return {name: np.full((n_trips, n_steps), value)
+            for name, value in (('soc', soc), ('temperature', temperature), ('soh', soh))}
+
+def test_constant_input_gives_exact_percentiles():
+    histogram = TripHistogram(n_steps=3)
+    histogram.add(constant_series(50, 3, soc=90.0, temperature=25.0, soh=87.3))
+
+    for name, value in (('soc', 90.0), ('temperature', 25.0), ('soh', 87.3)):
+        bands = histogram.percentiles(name, PERCENTILES)
+        assert np.array_equal(bands, np.full_like(bands, value)), name
+        assert np.allclose(histogram.means(name), value)
+
+def test_out_of_range_values_are_counted_not_clipped():
+    histogram = TripHistogram(n_steps=1)
+    histogram.add(constant_series(10, 1, soc=-12.5, temperature=25.0, soh=90.0))
+
+    assert histogram.out_of_range() == {'soc': 10, 'temperature': 0, 'soh': 0}
+    assert np.array_equal(histogram.percentiles('soc', PERCENTILES), np.full((len(PERCENTILES), 1), -12.5))
+
+def test_low_initial_soc_widens_the_soc_range():
+    low, high = histogram_ranges(initial_soc=10)['soc']
+    assert low <= 10 - 30 and high >= 100
+
+def test_interpolated_percentiles_track_exact_values():
+    rng = np.random.default_rng(0)
+    soc = rng.uniform(40, 80, size=(20000, 2))
+    histogram = TripHistogram(n_steps=2, bins=100)
+    histogram.add({'soc': soc, 'temperature': np.full_like(soc, 25.0), 'soh': np.full_like(soc, 90.0)})
+
+    bands = histogram.percentiles('soc', PERCENTILES)
+    exact = np.percentile(soc, PERCENTILES, axis=0)
+    assert np.abs(bands - exact).max() < 0.2
+
+def test_invalid_percentiles_are_rejected():
+    assert percentiles_error([5, 50.5, 95]) is None
+    for percentiles in ('50', [], ['a'], [50, 150], [-1], [True], [float('nan')]):
+        assert percentiles_error(percentiles) is not None, percentiles
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Vectorized Trip Simulation
+Generates whole voltage/current/temperature/SOC series as NumPy arrays
+
+Usage:
+    python trip_simulation.py --trips 10000 --type highway   # Monte-Carlo percentile bands
+"""
+
+import numpy as np
+
+# trip type -> voltage mean/std, current mean/std, starting temperature and warm-up per minute
+TRIP_PROFILES = {
+    'highway': {'voltage': (3.6, 0.1), 'current': (3.0, 0.3), 'temp_base': 28, 'temp_rate': 0.1},
+    'city': {'voltage': (3.7, 0.05), 'current': (2.2, 0.5), 'temp_base': 25, 'temp_rate': 0.05},
+    'mixed': {'voltage': (3.65, 0.08), 'current': (2.6, 0.4), 'temp_base': 26, 'temp_rate': 0.08},
+}
+
+# Thermal management keeps multi-day trips from heating without bound
+MAX_TEMPERATURE = 60.0
+
+# SOC consumed over the whole trip (%)
+TRIP_SOC_USAGE = 30
+
+def trip_minutes(duration_minutes, step_minutes=5):
+    """Sample times of a trip: 0, step, 2*step, ... < duration"""
+    return np.arange(0, duration_minutes, step_minutes, dtype=np.float64)
+
+def generate_trip_series(rng, minutes, duration_minutes, trip_type='city', initial_soc=90, n_trips=1,
+                         load_dependent=False):
+    """Generate ``n_trips`` independent trips at once
+
+    Returns a dict of (n_trips, len(minutes)) arrays for voltage, current,
+    temperature and soc. Unknown trip types use the 'mixed' profile.
+
+    With ``load_dependent`` each step's SOC drop and warm-up scale with that
+    step's current relative to the profile mean, so trips drawn with the same
+    parameters spread out (used by the Monte-Carlo simulation). At the mean
+    current this matches the fixed trends.
+    """
+    profile = TRIP_PROFILES.get(trip_type, TRIP_PROFILES['mixed'])
+    shape = (n_trips, len(minutes))
+
+    voltage = profile['voltage'][0] + rng.normal(0, profile['voltage'][1], shape)
+    current = profile['current'][0] + rng.normal(0, profile['current'][1], shape)
+
+    if load_dependent:
+        # Load-weighted minutes elapsed before each sample
+        steps = np.diff(minutes, append=duration_minutes)
+        load = np.clip(current / profile['current'][0], 0, None) * steps
+        elapsed = np.zeros(shape)
+        np.cumsum(load[:, :-1], axis=1, out=elapsed[:, 1:])
+    else:
+        elapsed = np.broadcast_to(minutes, shape)
+
+    temperature = np.minimum(profile['temp_base'] + elapsed * profile['temp_rate'], MAX_TEMPERATURE)
+    soc = initial_soc - (elapsed / duration_minutes) * TRIP_SOC_USAGE
+
+    return {
+        'voltage': voltage,
+        'current': current,
+        'temperature': temperature,
+        'soc': soc
+    }
+
+def predict_trip_soh(soh_model, voltage, current, temperature, capacity=2.5, cycle_count=150):
+    """One SOH prediction over every sample of every trip"""
+    n_samples = voltage.size
+    features = np.empty((n_samples, 5))
+    features[:, 0] = voltage.ravel()
+    features[:, 1] = current.ravel()
+    features[:, 2] = temperature.ravel()
+    features[:, 3] = capacity
+    features[:, 4] = cycle_count
+    return np.asarray(soh_model.predict(features), dtype=np.float64).reshape(voltage.shape)
+
+def simulate_trip(soh_model, duration_minutes=60, trip_type='city', initial_soc=90, step_minutes=5, seed=None):
+    """Simulate one trip; returns the sample times and per-sample series"""
+    rng = np.random.default_rng(seed)
+    minutes = trip_minutes(duration_minutes, step_minutes)
+    series = generate_trip_series(rng, minutes, duration_minutes, trip_type, initial_soc)
+    series['soh'] = predict_trip_soh(soh_model, series['voltage'], series['current'], series['temperature'])
+
+    trip = {name: values[0] for name, values in series.items()}
+    trip['time_minutes'] = minutes
+    return trip
+
+def trip_readings(trip, trip_type):
+    """Convert simulate_trip() arrays into the /simulate/trip readings list"""
+    columns = zip(
+        trip['time_minutes'].tolist(),
+        np.round(trip['voltage'], 2).tolist(),
+        np.round(trip['current'], 2).tolist(),
+        np.round(trip['temperature'], 1).tolist(),
+        np.round(trip['soc'], 1).tolist(),
+        np.round(trip['soh'], 1).tolist()
+    )
+    return [{
+        'time_minutes': int(minute) if float(minute).is_integer() else minute,
+        'voltage': voltage,
+        'current': current,
+        'temperature': temperature,
+        'soc': soc,
+        'soh': soh,
+        'phase': trip_type
+    } for minute, voltage, current, temperature, soc, soh in columns]
+
+# Monte-Carlo summaries keep fixed-size histograms per time step instead of raw
+# trips, so memory depends on trip length and bin count, never on the trip count
+HISTOGRAM_RANGES = {
+    'soc': (0.0, 100.0),
+    'temperature': (0.0, MAX_TEMPERATURE),
+    'soh': (0.0, 100.0),
+}
+HISTOGRAM_BINS = 1000
+
+def histogram_ranges(initial_soc=90):
+    """Histogram ranges covering the values a trip starting at ``initial_soc`` can reach
+
+    Load-dependent trips can use more than TRIP_SOC_USAGE, so SOC gets room
+    below zero; anything still outside is counted in the edge bins.
+    """
+    ranges = dict(HISTOGRAM_RANGES)
+    ranges['soc'] = (min(0.0, initial_soc - 3 * TRIP_SOC_USAGE), max(100.0, float(initial_soc)))
+    return ranges
+
+class TripHistogram:
+    """Per-time-step histograms, sums and min/max for SOC, temperature and SOH
+
+    Each step has ``bins`` regular bins over the range plus an underflow and
+    an overflow bin, so out-of-range values are counted (see out_of_range())
+    instead of being folded into the edge bins.
+    """
+
+    def __init__(self, n_steps, bins=HISTOGRAM_BINS, ranges=None):
+        self.n_steps = n_steps
+        self.bins = bins
+        self.ranges = dict(ranges or HISTOGRAM_RANGES)
+        self.trips = 0
+        self.counts = {name: np.zeros(n_steps * (bins + 2), dtype=np.int64) for name in self.ranges}
+        self.sums = {name: np.zeros(n_steps) for name in self.ranges}
+        self.mins = {name: np.full(n_steps, np.inf) for name in self.ranges}
+        self.maxs = {name: np.full(n_steps, -np.inf) for name in self.ranges}
+
+    def add(self, series):
+        """Add a chunk of trips given as (n_trips, n_steps) arrays"""
+        step_offsets = np.arange(self.n_steps) * (self.bins + 2)
+        for name, (low, high) in self.ranges.items():
+            values = series[name]
+            # Bin 0 is underflow, 1..bins the range, bins + 1 overflow
+            bins = np.floor((values - low) / (high - low) * self.bins).astype(np.int64) + 1
+            np.clip(bins, 0, self.bins + 1, out=bins)
+            self.counts[name] += np.bincount((bins + step_offsets).ravel(), minlength=self.n_steps * (self.bins + 2))
+            self.sums[name] += values.sum(axis=0)
+            np.minimum(self.mins[name], values.min(axis=0), out=self.mins[name])
+            np.maximum(self.maxs[name], values.max(axis=0), out=self.maxs[name])
+        self.trips += len(series['soc'])
+
+    def merge(self, other):
+        """Add another histogram with the same ranges (e.g. from a worker process)"""
+        if other.ranges != self.ranges or other.bins != self.bins:
+            raise ValueError("Cannot merge histograms with different ranges or bins")
+        for name in self.ranges:
+            self.counts[name] += other.counts[name]
+            self.sums[name] += other.sums[name]
+            np.minimum(self.mins[name], other.mins[name], out=self.mins[name])
+            np.maximum(self.maxs[name], other.maxs[name], out=self.maxs[name])
+        self.trips += other.trips
+
+    def percentiles(self, name, percentiles):
+        """(len(percentiles), n_steps) array of percentile values
+
+        Interpolated linearly inside the bin holding the percentile and
+        clamped to the step's observed min/max (so constant values come out
+        exact). The underflow/overflow bins span from the observed min/max to
+        the range edge.
+        """
+        bands = np.full((len(percentiles), self.n_steps), np.nan)
+        if self.trips == 0:
+            return bands
+        low, high = self.ranges[name]
+        width = (high - low) / self.bins
+        counts = self.counts[name].reshape(self.n_steps, self.bins + 2)
+        cumulative = np.cumsum(counts, axis=1)
+        mins, maxs = self.mins[name], self.maxs[name]
+        steps = np.arange(self.n_steps)
+        for i, p in enumerate(percentiles):
+            target = p / 100 * self.trips
+            k = np.minimum((cumulative < target).sum(axis=1), self.bins + 1)
+            before = np.where(k > 0, cumulative[steps, np.maximum(k - 1, 0)], 0)
+            in_bin = counts[steps, k]
+            fraction = np.where(in_bin > 0, (target - before) / np.maximum(in_bin, 1), 0.0)
+            lower = np.where(k == 0, mins, np.where(k == self.bins + 1, high, low + (k - 1) * width))
+            upper = np.where(k == 0, low, np.where(k == self.bins + 1, maxs, low + k * width))
+            bands[i] = np.clip(lower + fraction * (upper - lower), mins, maxs)
+        return bands
+
+    def means(self, name):
+        return self.sums[name] / max(1, self.trips)
+
+    def out_of_range(self):
+        """Values that fell below or above each histogram range"""
+        counts = {}
+        for name in self.ranges:
+            per_step = self.counts[name].reshape(self.n_steps, self.bins + 2)
+            counts[name] = int(per_step[:, 0].sum() + per_step[:, -1].sum())
+        return counts
+
+_worker_model = None
+
+def _init_worker(soh_model):
+    """Process pool initializer: keep the SOH model for every chunk"""
+    global _worker_model
+    _worker_model = soh_model
+
+def _load_worker_model(models_dir):
+    """Process pool initializer: load the SOH model in the worker itself"""
+    global _worker_model
+    from model_registry import ModelRegistry
+    _worker_model = ModelRegistry(models_dir)['soh']
+
+def simulation_pool(workers, models_dir):
+    """Long-lived process pool for monte_carlo_trips(pool=...) inside a server
+
+    Workers are started with 'spawn' (forking a process that runs Flask and
+    torch threads can deadlock) and load the SOH model once, so requests
+    neither start processes nor pickle the model.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_load_worker_model, initargs=(models_dir,))
+
+def simulate_chunk(soh_model, seed_sequence, n_trips, minutes, duration_minutes, trip_type, initial_soc, bins,
+                   ranges=None):
+    """Simulate one chunk of trips and return its histogram"""
+    rng = np.random.default_rng(seed_sequence)
+    series = generate_trip_series(rng, minutes, duration_minutes, trip_type, initial_soc, n_trips,
+                                  load_dependent=True)
+    series['soh'] = predict_trip_soh(soh_model or _worker_model, series['voltage'], series['current'],
+                                     series['temperature'])
+    histogram = TripHistogram(len(minutes), bins, ranges)
+    histogram.add(series)
+    return histogram
+
+def monte_carlo_trips(soh_model, n_trips=1000, duration_minutes=60, trip_type='city', initial_soc=90,
+                      step_minutes=5, seed=None, chunk_size=2000, workers=1, bins=HISTOGRAM_BINS,
+                      on_chunk=None, pool=None):
+    """Simulate ``n_trips`` trips with the same parameters and return a TripHistogram
+
+    Trips are generated ``chunk_size`` at a time, so peak memory is one chunk
+    plus the histograms. Chunks run in ``pool`` (see simulation_pool()) when
+    given, or with ``workers`` > 1 in a process pool created for this call
+    (command line only: it forks and pickles the model). Each chunk gets its
+    own child seed, so a given ``seed`` reproduces the same result for any
+    worker count. ``on_chunk(done, total)`` is called after each chunk.
+    """
+    minutes = trip_minutes(duration_minutes, step_minutes)
+    chunk_sizes = [min(chunk_size, n_trips - start) for start in range(0, n_trips, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    ranges = histogram_ranges(initial_soc)
+    histogram = TripHistogram(len(minutes), bins, ranges)
+
+    def collect(chunk_histogram):
+        histogram.merge(chunk_histogram)
+        if on_chunk:
+            on_chunk(histogram.trips, n_trips)
+
+    def run_in(executor):
+        futures = [executor.submit(simulate_chunk, None, chunk_seed, size, minutes, duration_minutes,
+                                   trip_type, initial_soc, bins, ranges)
+                   for chunk_seed, size in zip(seeds, chunk_sizes)]
+        for future in futures:
+            collect(future.result())
+
+    if pool is not None and len(chunk_sizes) > 1:
+        run_in(pool)
+    elif workers > 1 and len(chunk_sizes) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(soh_model,)) as pool:
+            run_in(pool)
+    else:
+        for chunk_seed, size in zip(seeds, chunk_sizes):
+            collect(simulate_chunk(soh_model, chunk_seed, size, minutes, duration_minutes,
+                                   trip_type, initial_soc, bins, ranges))
+
+    return histogram, minutes
+
+def percentiles_error(percentiles):
+    """Why a requested percentile list cannot be used, or None if it is valid"""
+    if not isinstance(percentiles, list) or not percentiles:
+        return 'percentiles must be a non-empty list of numbers'
+    for p in percentiles:
+        if isinstance(p, bool) or not isinstance(p, (int, float)) or not 0 <= p <= 100:
+            return f"percentiles must be numbers in [0, 100], got {p!r}"
+    return None
+
+def percentile_rows(histogram, minutes, percentiles=(5, 25, 50, 75, 95)):
+    """Yield one percentile-band row per time step"""
+    bands = {name: histogram.percentiles(name, percentiles) for name in histogram.ranges}
+    means = {name: histogram.means(name) for name in histogram.ranges}
+    for step, minute in enumerate(minutes.tolist()):
+        row = {'time_minutes': int(minute) if float(minute).is_integer() else minute}
+        for name in histogram.ranges:
+            row[name] = {f"p{p:g}": round(float(bands[name][i, step]), 2) for i, p in enumerate(percentiles)}
+            row[name]['mean'] = round(float(means[name][step]), 2)
+        yield row
+
+def monte_carlo_summary(histogram, minutes, percentiles=(5, 25, 50, 75, 95)):
+    """Percentile bands over time plus the end-of-trip distribution"""
+    bands = list(percentile_rows(histogram, minutes, percentiles))
+    return {
+        'trips': histogram.trips,
+        'percentiles': list(percentiles),
+        'bands': bands,
+        'final': bands[-1] if bands else None,
+        'out_of_range': histogram.out_of_range()
+    }
+
+def main():
+    """Command-line Monte-Carlo trip simulation"""
+    import os
+    import sys
+    import json
+    import time
+    import argparse
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Monte-Carlo trip simulation with percentile bands')
+    parser.add_argument('--trips', type=int, default=10000)
+    parser.add_argument('--type', default='city', choices=sorted(TRIP_PROFILES))
+    parser.add_argument('--duration-minutes', type=float, default=60)
+    parser.add_argument('--step-minutes', type=float, default=5)
+    parser.add_argument('--initial-soc', type=float, default=90)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    parser.add_argument('--percentiles', type=float, nargs='+', default=[5, 25, 50, 75, 95])
+    parser.add_argument('--stream', action='store_true', help='print one JSON line per time step')
+    parser.add_argument('--models-dir', default=os.environ.get('BATTERY_MODELS_DIR', os.path.join(script_dir, 'models')))
+    args = parser.parse_args()
+
+    from compiled_forest import load_soh_model
+    soh_model = load_soh_model(os.path.join(args.models_dir, 'soh_rf_model.pkl'))
+
+    start = time.perf_counter()
+    histogram, minutes = monte_carlo_trips(
+        soh_model, args.trips, args.duration_minutes, args.type, args.initial_soc,
+        args.step_minutes, args.seed, args.chunk_size, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Simulated {histogram.trips} trips in {elapsed:.2f}s", file=sys.stderr)
+
+    if args.stream:
+        for row in percentile_rows(histogram, minutes, args.percentiles):
+            print(json.dumps(row))
+    else:
+        print(json.dumps(monte_carlo_summary(histogram, minutes, args.percentiles), indent=2))
+
+if __name__ == "__main__":
+    main()
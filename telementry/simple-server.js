@@ -11,6 +11,9 @@ const { spawn } = require("child_process");
 const path = require("path");
 const fs = require("fs");
 
+// A prediction not answered within this restarts the ML worker
+const PREDICTION_TIMEOUT_MS = 5000;
+
 class SmartEVBatteryServer {
   constructor() {
     this.app = express();
@@ -30,6 +33,9 @@ class SmartEVBatteryServer {
       efficiency: 89,
     };
 
+    // Persistent quick_predict.py worker (started on first prediction)
+    this.predictionWorker = null;
+
     this.setupMiddleware();
     this.setupRoutes();
     this.startDataUpdates();
@@ -204,65 +210,106 @@ class SmartEVBatteryServer {
     this.currentBatteryData.timestamp = now.toISOString();
   }
 
-  runMLPrediction() {
-    // Run Python ML prediction script using the virtual environment
+  startPredictionWorker() {
+    // Start one long-lived quick_predict.py worker; models load once
     const mlDir = path.join(__dirname, "model & ai", "ml");
     const pythonScript = path.join(mlDir, "quick_predict.py");
     const venvPython = path.join(mlDir, "mobility", "bin", "python");
 
-    // Create input data for ML model
-    const inputData = {
-      voltage: this.currentBatteryData.voltage,
-      current: this.currentBatteryData.current,
-      temperature: this.currentBatteryData.temperature,
-      soc: this.currentBatteryData.soc,
-    };
-
     // Check if virtual environment python exists
     if (!fs.existsSync(venvPython)) {
       console.log(
         "⚠️  Virtual environment not found, using fallback calculations"
       );
-      this.calculateFallbackPredictions();
-      return;
+      return null;
     }
 
-    // Run Python prediction using virtual environment
-    const pythonProcess = spawn(
-      venvPython,
-      [pythonScript, JSON.stringify(inputData)],
-      {
-        cwd: mlDir,
-        stdio: ["pipe", "pipe", "pipe"],
-      }
-    );
-
-    let result = "";
-    pythonProcess.stdout.on("data", (data) => {
-      result += data.toString();
+    const worker = spawn(venvPython, [pythonScript, "--serve"], {
+      cwd: mlDir,
+      stdio: ["pipe", "pipe", "pipe"],
     });
+    // Timeout timers of the predictions sent and not yet answered, oldest first
+    worker.pending = [];
+
+    // One JSON response per line, in request order
+    let buffer = "";
+    worker.stdout.on("data", (data) => {
+      buffer += data.toString();
+      let newline;
+      while ((newline = buffer.indexOf("\n")) >= 0) {
+        const line = buffer.slice(0, newline).trim();
+        buffer = buffer.slice(newline + 1);
+        if (!line || !worker.pending.length) continue;
+        clearTimeout(worker.pending.shift());
 
-    pythonProcess.on("close", (code) => {
-      if (code === 0 && result.trim()) {
         try {
-          const prediction = JSON.parse(result.trim());
+          const prediction = JSON.parse(line);
           this.updateMLResults(prediction);
         } catch (error) {
           // Use fallback calculation if ML fails
           this.calculateFallbackPredictions();
         }
-      } else {
-        // Use fallback calculation
-        this.calculateFallbackPredictions();
       }
     });
 
-    pythonProcess.stderr.on("data", (data) => {
+    worker.stderr.on("data", (data) => {
       // Ignore warnings, use fallback on errors
       if (!data.toString().includes("WARNING")) {
         this.calculateFallbackPredictions();
       }
     });
+
+    // Spawn failures and EPIPE on a dead worker must not crash the server
+    worker.on("error", () => this.stopPredictionWorker(worker));
+    worker.stdin.on("error", () => this.stopPredictionWorker(worker));
+
+    worker.on("close", () => {
+      // Restart on the next prediction
+      this.stopPredictionWorker(worker);
+    });
+
+    return worker;
+  }
+
+  stopPredictionWorker(worker) {
+    // Fall back for unanswered predictions and kill the worker; the next prediction respawns it
+    if (this.predictionWorker === worker) {
+      this.predictionWorker = null;
+    }
+    const pending = worker.pending.splice(0);
+    pending.forEach(clearTimeout);
+    if (pending.length) {
+      this.calculateFallbackPredictions();
+    }
+    worker.kill();
+  }
+
+  runMLPrediction() {
+    // Send the reading to the persistent Python prediction worker
+    if (!this.predictionWorker) {
+      this.predictionWorker = this.startPredictionWorker();
+      if (!this.predictionWorker) {
+        this.calculateFallbackPredictions();
+        return;
+      }
+    }
+
+    // Create input data for ML model
+    const inputData = {
+      voltage: this.currentBatteryData.voltage,
+      current: this.currentBatteryData.current,
+      temperature: this.currentBatteryData.temperature,
+      soc: this.currentBatteryData.soc,
+    };
+
+    const worker = this.predictionWorker;
+    worker.pending.push(
+      setTimeout(() => {
+        console.log("⚠️  ML prediction timed out, restarting the worker");
+        this.stopPredictionWorker(worker);
+      }, PREDICTION_TIMEOUT_MS)
+    );
+    worker.stdin.write(JSON.stringify(inputData) + "\n");
   }
 
   updateMLResults(prediction) {
@@ -329,8 +376,12 @@ class SmartEVBatteryServer {
     });
 
     // Graceful shutdown
-    process.on("SIGTERM", () => process.exit(0));
-    process.on("SIGINT", () => process.exit(0));
+    const shutdown = () => {
+      if (this.predictionWorker) this.predictionWorker.kill("SIGTERM");
+      process.exit(0);
+    };
+    process.on("SIGTERM", shutdown);
+    process.on("SIGINT", shutdown);
   }
 }
 
@@ -6,7 +6,7 @@
  */
 
 const express = require("express");
-const { exec } = require("child_process");
+const { spawn } = require("child_process");
 const path = require("path");
 const fs = require("fs");
 
@@ -155,12 +155,92 @@ function updateBatteryData() {
   );
 }
 
-function tryMLPrediction() {
+// Persistent quick_predict.py worker; models load once instead of per update
+let predictionWorker = null;
+
+// A prediction not answered within this is treated like the old exec timeout
+const PREDICTION_TIMEOUT_MS = 5000;
+
+function startPredictionWorker() {
   const mlDir = path.join(__dirname, "model & ai", "ml");
   const pythonScript = path.join(mlDir, "quick_predict.py");
   const venvPython = path.join(mlDir, "mobility", "bin", "python");
 
-  if (fs.existsSync(venvPython) && fs.existsSync(pythonScript)) {
+  if (!fs.existsSync(venvPython) || !fs.existsSync(pythonScript)) {
+    return null;
+  }
+
+  const worker = spawn(venvPython, [pythonScript, "--serve"], {
+    cwd: mlDir,
+    stdio: ["pipe", "pipe", "ignore"],
+  });
+  // Timeout timers of the predictions sent and not yet answered, oldest first
+  worker.pending = [];
+
+  // One JSON response per line
+  let buffer = "";
+  worker.stdout.on("data", (data) => {
+    buffer += data.toString();
+    let newline;
+    while ((newline = buffer.indexOf("\n")) >= 0) {
+      const line = buffer.slice(0, newline).trim();
+      buffer = buffer.slice(newline + 1);
+      if (line && worker.pending.length) {
+        clearTimeout(worker.pending.shift());
+        applyMLPrediction(line);
+      }
+    }
+  });
+
+  // Spawn failures and EPIPE on a dead worker must not crash the server
+  worker.on("error", () => stopPredictionWorker(worker));
+  worker.stdin.on("error", () => stopPredictionWorker(worker));
+
+  worker.on("close", () => {
+    // Restart on the next update
+    stopPredictionWorker(worker);
+  });
+
+  return worker;
+}
+
+function stopPredictionWorker(worker) {
+  // Fall back for unanswered predictions and kill the worker; the next update respawns it
+  if (predictionWorker === worker) {
+    predictionWorker = null;
+  }
+  const pending = worker.pending.splice(0);
+  pending.forEach(clearTimeout);
+  if (pending.length) {
+    useFallbackCalculation();
+  }
+  worker.kill();
+}
+
+function applyMLPrediction(line) {
+  try {
+    const result = JSON.parse(line);
+    if (result.success !== false) {
+      batteryData.soh = result.soh || batteryData.soh;
+      batteryData.rul = result.rul || batteryData.rul;
+      batteryData.health_status = getHealthStatus(batteryData.soh);
+      batteryData.range_km = calculateRange();
+      batteryData.efficiency = calculateEfficiency();
+      return; // ML prediction successful
+    }
+  } catch (e) {
+    // JSON parse error, use fallback
+  }
+  // Use fallback on any error
+  useFallbackCalculation();
+}
+
+function tryMLPrediction() {
+  if (!predictionWorker) {
+    predictionWorker = startPredictionWorker();
+  }
+
+  if (predictionWorker) {
     const inputData = JSON.stringify({
       voltage: batteryData.voltage,
       current: batteryData.current,
@@ -168,27 +248,14 @@ function tryMLPrediction() {
       soc: batteryData.soc,
     });
 
-    const command = `cd "${mlDir}" && "${venvPython}" quick_predict.py '${inputData}'`;
-
-    exec(command, { timeout: 5000 }, (error, stdout, stderr) => {
-      if (!error && stdout.trim()) {
-        try {
-          const result = JSON.parse(stdout.trim());
-          if (result.success !== false) {
-            batteryData.soh = result.soh || batteryData.soh;
-            batteryData.rul = result.rul || batteryData.rul;
-            batteryData.health_status = getHealthStatus(batteryData.soh);
-            batteryData.range_km = calculateRange();
-            batteryData.efficiency = calculateEfficiency();
-            return; // ML prediction successful
-          }
-        } catch (e) {
-          // JSON parse error, use fallback
-        }
-      }
-      // Use fallback on any error
-      useFallbackCalculation();
-    });
+    const worker = predictionWorker;
+    worker.pending.push(
+      setTimeout(() => {
+        console.log("⚠️  ML prediction timed out, restarting the worker");
+        stopPredictionWorker(worker);
+      }, PREDICTION_TIMEOUT_MS)
+    );
+    worker.stdin.write(inputData + "\n");
   } else {
     // No ML available, use fallback
     useFallbackCalculation();
@@ -256,5 +323,6 @@ app.listen(port, () => {
 // Graceful shutdown
 process.on("SIGINT", () => {
   console.log("\n🛑 Shutting down server...");
+  if (predictionWorker) predictionWorker.kill("SIGTERM");
   process.exit(0);
 });